@@ -0,0 +1,103 @@
+"""
+Per-request agent setup overhead, before and after the shared AgentRuntime.
+
+"before" rebuilds the LLM client, tool list, memory buffer and FunctionAgent
+for every request (the old `run_agent_async`). "after" only allocates the
+per-request memory buffer and reuses the runtime built at startup.
+
+By default a local MockLLM stands in for Gemini so the benchmark runs offline.
+Pass --gemini to include the real Gemini client construction (needs
+GEMINI_API_KEY and network, since the client fetches model metadata).
+
+Usage (from the rag/ directory):
+    python -m benchmarks.agent_runtime_overhead --iterations 200
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from llama_index.core.agent.workflow import FunctionAgent
+from llama_index.core.llms import MockLLM
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.llms.gemini import Gemini
+
+from config.config import get_config
+from src.agent.agent import (
+    AgentRuntime,
+    GEMINI_MODEL,
+    KnowledgeResponse,
+    MEMORY_TOKEN_LIMIT,
+    SYSTEM_PROMPT,
+)
+from src.agent.tools.get_data_from_md import get_data_from_md_tool
+from src.agent.tools.get_rextro_zones import get_zones_tool
+from src.agent.tools.search_rextro_sessions import search_rextro_sessions_tool
+
+
+def make_llm(use_gemini: bool):
+    if use_gemini:
+        return Gemini(model=GEMINI_MODEL, api_key=get_config().gemini_api_key)
+    return MockLLM()
+
+
+def setup_before(use_gemini: bool):
+    """Replicates the per-request setup of the old run_agent_async."""
+    llm = make_llm(use_gemini)
+    tools = [get_data_from_md_tool, search_rextro_sessions_tool, get_zones_tool]
+    memory = ChatMemoryBuffer.from_defaults(token_limit=MEMORY_TOKEN_LIMIT)
+    return FunctionAgent(
+        tools=tools,
+        llm=llm,
+        memory=memory,
+        system_prompt=SYSTEM_PROMPT,
+        output_cls=KnowledgeResponse,
+    )
+
+
+def setup_after(runtime: AgentRuntime):
+    """Per-request setup with the shared runtime: a fresh memory buffer only."""
+    return runtime.new_memory()
+
+
+def measure(label: str, fn, iterations: int) -> None:
+    fn()  # warm-up: imports, tokenizer and schema caches
+
+    timings = []
+    tracemalloc.start()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{label:<8} mean={statistics.mean(timings):8.3f} ms  "
+        f"p50={statistics.median(timings):8.3f} ms  p95={p95:8.3f} ms  "
+        f"peak_alloc={peak / 1024:8.1f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--gemini", action="store_true", help="construct the real Gemini client")
+    args = parser.parse_args()
+
+    runtime = AgentRuntime(llm=make_llm(args.gemini))
+
+    print(f"Per-request setup overhead over {args.iterations} iterations "
+          f"({'Gemini' if args.gemini else 'MockLLM'}):")
+    measure("before", lambda: setup_before(args.gemini), args.iterations)
+    measure("after", lambda: setup_after(runtime), args.iterations)
+
+
+if __name__ == "__main__":
+    main()
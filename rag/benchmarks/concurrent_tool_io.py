@@ -0,0 +1,152 @@
+"""
+Shows that concurrent /ask requests no longer serialize behind Rextro API tool I/O.
+
+A local stand-in Rextro API answers every request after a fixed delay, and a
+scripted mock LLM makes each /ask call `get_zones` once. N concurrent /ask
+requests are driven through `main.app` over ASGI, first with the old blocking
+`requests.get` tool and then with the async tool on the shared pooled client.
+
+FunctionTool runs the blocking tool on asyncio's default executor, so the
+loop stays free but the upstream waits go min(32, CPUs + 4) at a time: the
+baseline takes about ceil(N / threads) upstream delays. With the async tool
+all waits overlap. A calibration run of the async tool with a zero upstream
+delay gives the agent's own time, and the async run must add at most
+--max-upstream-delays delays on top of it.
+
+The exit status is 1 when a request fails or the async run exceeds that
+limit.
+
+Usage (from the rag/ directory):
+    python -m benchmarks.concurrent_tool_io --requests 64 --delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+
+from benchmarks.standin_rextro_api import start_standin_api
+
+SERVER, BASE_URL = None, None
+
+
+def blocking_get_zones(page: int = 1, limit: int = 10, sortBy: str = "createdAt", sortOrder: str = "desc") -> str:
+    """The pre-async tool: a synchronous requests.get with no shared session."""
+    import requests
+
+    params = {"page": page, "limit": limit, "sortBy": sortBy, "sortOrder": sortOrder}
+    response = requests.get(f"{BASE_URL}/zones", headers={"accept": "application/json"}, params=params, verify=False)
+    response.raise_for_status()
+    return json.dumps(response.json(), indent=2)
+
+
+async def max_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Largest delay seen by a 5 ms ticker while the requests run."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def drive(app, count: int) -> tuple:
+    import httpx
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(max_loop_lag(stop))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        # One client address per request, so admission control's per-client queue limit doesn't shed them
+        responses = await asyncio.gather(*[
+            client.post("/ask", json={"query": f"where is zone {i}"},
+                        headers={"X-Forwarded-For": f"100.64.{i // 250 % 250}.{i % 250 + 1}"})
+            for i in range(count)
+        ])
+        elapsed = time.perf_counter() - start
+    stop.set()
+    failures = sum(1 for response in responses if response.status_code != 200)
+    return elapsed, await lag_task, failures
+
+
+async def main_async(args) -> int:
+    from llama_index.core.tools import FunctionTool
+
+    import main
+    import src.agent.agent as agent_module
+    from benchmarks.mock_llm import MockFunctionCallingLLM
+    from src.agent.tools.get_data_from_md import get_data_from_md_tool
+    from src.agent.tools.get_rextro_zones import get_zones_tool
+    from src.agent.tools.search_rextro_sessions import search_rextro_sessions_tool
+
+    blocking_tool = FunctionTool.from_defaults(fn=blocking_get_zones, name="get_zones")
+    blocking_tools = [get_data_from_md_tool, search_rextro_sessions_tool, blocking_tool]
+    async_tools = [get_data_from_md_tool, search_rextro_sessions_tool, get_zones_tool]
+
+    async def run(tools, delay: float) -> tuple:
+        SERVER.RequestHandlerClass.delay_seconds = delay
+        agent_module._runtime = agent_module.AgentRuntime(llm=MockFunctionCallingLLM(), tools=tools)
+        await main.answer_cache.invalidate()
+        main.limiter.reset()
+        return await drive(main.app, args.requests)
+
+    threads = min(32, (os.cpu_count() or 1) + 4)
+    print(f"{args.requests} concurrent /ask requests, upstream delay {args.delay * 1000:.0f} ms, "
+          f"{threads} executor threads for the blocking tool "
+          f"(~{math.ceil(args.requests / threads) * args.delay:.1f} s of upstream waits)")
+
+    # Warm-up and calibration: the agent's own time, no upstream wait
+    await run(async_tools, 0.0)
+    agent_wall, _, calibration_failures = await run(async_tools, 0.0)
+    print(f"{'agent only (no delay)':<24} wall={agent_wall:6.2f} s")
+
+    failures = calibration_failures
+    results = {}
+    for label, tools in (("blocking requests.get", blocking_tools), ("async pooled client", async_tools)):
+        elapsed, lag, failed = await run(tools, args.delay)
+        results[label] = elapsed
+        failures += failed
+        print(f"{label:<24} wall={elapsed:6.2f} s  upstream={max(0.0, elapsed - agent_wall) / args.delay:5.1f} delays  "
+              f"max_loop_lag={lag * 1000:7.1f} ms  failures={failed}")
+
+    upstream_delays = (results["async pooled client"] - agent_wall) / args.delay
+    status = 0
+    if failures:
+        print(f"FAIL: {failures} requests failed")
+        status = 1
+    if upstream_delays > args.max_upstream_delays:
+        print(f"FAIL: async tool waits took {upstream_delays:.1f} upstream delays > {args.max_upstream_delays}")
+        status = 1
+    return status
+
+
+def main() -> None:
+    global SERVER, BASE_URL
+    parser = argparse.ArgumentParser(description="Concurrent /ask requests vs tool I/O")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--delay", type=float, default=0.5, help="stand-in API delay in seconds")
+    parser.add_argument("--max-connections", type=int, default=100, help="pool size of the async client")
+    parser.add_argument("--max-upstream-delays", type=float, default=2.0,
+                        help="upstream delays the async run may add to the agent's own time")
+    args = parser.parse_args()
+
+    SERVER, BASE_URL = start_standin_api(args.delay)
+    os.environ["REXTRO_API_BASE_URL"] = BASE_URL
+    os.environ["REXTRO_API_MAX_CONNECTIONS"] = str(args.max_connections)
+    os.environ["REXTRO_API_MAX_KEEPALIVE_CONNECTIONS"] = str(args.max_connections)
+    # Every request is admitted at once: the benchmark measures tool I/O, not load shedding
+    os.environ["ADMISSION_MAX_INFLIGHT"] = str(max(args.requests, 16))
+    os.environ["ADMISSION_MAX_QUEUE"] = str(max(args.requests, 64))
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    try:
+        status = asyncio.run(main_async(args))
+    finally:
+        SERVER.shutdown()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
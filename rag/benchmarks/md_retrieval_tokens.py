@@ -0,0 +1,70 @@
+"""
+Prompt tokens added per get_data_from_md call, before and after section retrieval.
+
+"before" is the old tool output (the whole markdown file on every call);
+"after" is the top-k BM25 sections the tool returns now. Tokens are counted
+with tiktoken's cl100k_base encoding as a proxy for Gemini's tokenizer, or
+estimated at 4 characters per token when the encoding can't be loaded.
+
+Usage (from the rag/ directory):
+    python -m benchmarks.md_retrieval_tokens
+"""
+import asyncio
+import statistics
+import time
+
+import tiktoken
+
+from src.agent.tools.get_data_from_md import MD_FILE_PATH, get_data_from_md, markdown_index
+
+QUERIES = [
+    "When is the event and what are the opening hours?",
+    "Where is the venue?",
+    "How much is a student ticket?",
+    "Who are the speakers?",
+    "What happens on day 2?",
+    "Which hotels have discounts?",
+    "Is there parking at the venue?",
+    "How do I contact the organizers?",
+    "What workshops are available for beginners?",
+    "What are the COVID safety measures?",
+]
+
+
+def token_counter():
+    try:
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception as e:
+        print(f"tiktoken encoding unavailable ({type(e).__name__}), estimating 4 chars/token\n")
+        return lambda text: (len(text) + 3) // 4
+
+
+async def run() -> None:
+    count_tokens = token_counter()
+    with open(MD_FILE_PATH, "r", encoding="utf-8") as f:
+        before_output = f"Full content of {MD_FILE_PATH}:\n\n{f.read()}"
+    before_tokens = count_tokens(before_output)
+
+    markdown_index.refresh()
+    after_counts, latencies = [], []
+    print(f"{'query':<52} {'before':>7} {'after':>7}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        output = await get_data_from_md(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        after_counts.append(count_tokens(output))
+        print(f"{query:<52} {before_tokens:>7} {after_counts[-1]:>7}")
+
+    mean_after = statistics.mean(after_counts)
+    print(f"\nmean tokens per call: before={before_tokens}  after={mean_after:.0f}  "
+          f"({100 * (1 - mean_after / before_tokens):.0f}% fewer)")
+    print(f"mean retrieval latency: {statistics.mean(latencies):.3f} ms")
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
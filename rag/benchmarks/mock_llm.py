@@ -0,0 +1,163 @@
+"""
+Scripted, offline stand-in for the Gemini LLM used by the benchmarks.
+
+MockFunctionCallingLLM speaks the FunctionCallingLLM interface the
+FunctionAgent needs. On the first turn of a query it requests the tools
+chosen by `tool_plan`, after tool results arrive it writes a final answer,
+and it fills the structured-output pass with the same answer. Every call
+sleeps `latency_seconds`, plus `token_latency_seconds` per generated word
+(between chunks when streamed, up front otherwise), to model Gemini
+round-trips without the network.
+"""
+import asyncio
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    CompletionResponse,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.llms.callbacks import llm_chat_callback
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import ToolSelection
+
+AGENT_TOOL_NAMES = {"get_data_from_md", "search_knowledge_base", "get_zones", "search_rextro_sessions"}
+
+
+def default_tool_plan(query: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Picks tools from keywords, roughly as Gemini does for typical visitor questions."""
+    query = query.lower()
+    if any(word in query for word in ("zone", "booth", "where")):
+        return [("get_zones", {})]
+    if any(word in query for word in ("session", "talk", "workshop")):
+        return [("search_rextro_sessions", {"query": query})]
+    return [("get_data_from_md", {"query_text": query})]
+
+
+class MockFunctionCallingLLM(FunctionCallingLLM):
+    latency_seconds: float = Field(default=0.0)
+    token_latency_seconds: float = Field(default=0.0)
+    answer: str = Field(default="Here is what I found about the **Rextro Exhibition**.")
+    tool_plan: Callable[[str], List[Tuple[str, Dict[str, Any]]]] = Field(
+        default=default_tool_plan, exclude=True
+    )
+    calls: int = Field(default=0)
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(is_function_calling_model=True, model_name="mock-gemini")
+
+    def _prepare_chat_with_tools(
+        self,
+        tools: Sequence[Any],
+        user_msg: Optional[Any] = None,
+        chat_history: Optional[List[ChatMessage]] = None,
+        verbose: bool = False,
+        allow_parallel_tool_calls: bool = False,
+        tool_required: bool = False,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        messages = list(chat_history or [])
+        if user_msg is not None:
+            if isinstance(user_msg, str):
+                user_msg = ChatMessage(role="user", content=user_msg)
+            messages.append(user_msg)
+        return {"messages": messages, "tools": tools}
+
+    def _respond(self, messages: Sequence[ChatMessage], tools: Optional[Sequence[Any]]) -> ChatResponse:
+        self.calls += 1
+        tool_names = [tool.metadata.name for tool in tools or []]
+
+        # Structured-output pass: the only tool offered is the output class
+        if tool_names and not AGENT_TOOL_NAMES.intersection(tool_names):
+            return self._tool_call_response([(tool_names[0], {"answer": self.answer})])
+
+        if tool_names and messages and messages[-1].role == "user":
+            plan = [(name, kwargs) for name, kwargs in self.tool_plan(messages[-1].content or "")
+                    if name in tool_names]
+            if plan:
+                return self._tool_call_response(plan)
+
+        return ChatResponse(message=ChatMessage(role="assistant", content=self.answer))
+
+    def _tool_call_response(self, plan: List[Tuple[str, Dict[str, Any]]]) -> ChatResponse:
+        tool_calls = [
+            {"id": f"call-{self.calls}-{index}", "name": name, "args": kwargs}
+            for index, (name, kwargs) in enumerate(plan)
+        ]
+        return ChatResponse(
+            message=ChatMessage(role="assistant", content="", additional_kwargs={"tool_calls": tool_calls})
+        )
+
+    def get_tool_calls_from_response(
+        self, response: ChatResponse, error_on_no_tool_call: bool = True, **kwargs: Any
+    ) -> List[ToolSelection]:
+        tool_calls = response.message.additional_kwargs.get("tool_calls", [])
+        if not tool_calls and error_on_no_tool_call:
+            raise ValueError("Expected at least one tool call")
+        return [
+            ToolSelection(tool_id=call["id"], tool_name=call["name"], tool_kwargs=call["args"])
+            for call in tool_calls
+        ]
+
+    @staticmethod
+    def _output_words(response: ChatResponse) -> int:
+        """Words the model generates for a response: its text plus string tool arguments."""
+        words = len((response.message.content or "").split())
+        for call in response.message.additional_kwargs.get("tool_calls", []):
+            words += sum(len(value.split()) for value in call["args"].values() if isinstance(value, str))
+        return words
+
+    # Decorated like the Gemini client, so instrumentation events fire the same way
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        response = self._respond(messages, kwargs.get("tools"))
+        # Not streamed: the whole output is generated before anything comes back
+        await asyncio.sleep(self.latency_seconds + self.token_latency_seconds * self._output_words(response))
+        return response
+
+    @llm_chat_callback()
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> AsyncGenerator[ChatResponse, None]:
+        await asyncio.sleep(self.latency_seconds)
+        response = self._respond(messages, kwargs.get("tools"))
+
+        async def gen() -> AsyncGenerator[ChatResponse, None]:
+            tokens = (response.message.content or "").split(" ")
+            text = ""
+            for token in tokens:
+                await asyncio.sleep(self.token_latency_seconds)
+                delta = token if not text else f" {token}"
+                text += delta
+                yield ChatResponse(
+                    message=ChatMessage(
+                        role="assistant",
+                        content=text,
+                        additional_kwargs=response.message.additional_kwargs,
+                    ),
+                    delta=delta,
+                )
+
+        return gen()
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self._respond(messages, kwargs.get("tools"))
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> Any:
+        raise NotImplementedError("Use astream_chat")
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=self.answer)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> Any:
+        raise NotImplementedError("Use astream_chat")
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        await asyncio.sleep(self.latency_seconds)
+        return self.complete(prompt)
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> Any:
+        raise NotImplementedError("Use astream_chat")
@@ -0,0 +1,97 @@
+"""
+/ask latency in the two agent output modes (AGENT_OUTPUT_MODE).
+
+"structured" runs FunctionAgent with output_cls=KnowledgeResponse: after the
+agent's final markdown turn, the LLM is called once more to fill the
+KnowledgeResponse, which regenerates the whole answer as a function-call
+argument. "text" returns the final turn's markdown as the answer.
+
+A scripted mock LLM stands in for Gemini: every call waits --llm-latency,
+plus --token-latency per generated word. Each query calls get_data_from_md
+(local, no network). Queries run one at a time, so the figures are
+per-request latency. The mock also counts LLM calls, and process CPU time
+is measured per request.
+
+Usage (from the rag/ directory):
+    python -m benchmarks.output_mode_latency --queries 30 --llm-latency 0.4 --token-latency 0.01
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from benchmarks.mock_llm import MockFunctionCallingLLM
+from src.agent.agent import OUTPUT_MODES, AgentRuntime
+from src.agent.tools.get_data_from_md import get_data_from_md_tool
+
+ANSWER_WORDS = (
+    "The **Rextro Exhibition** runs in the main hall and the engineering faculty grounds. "
+    "Zones cover robotics, AI, IoT and sustainable energy; sessions run every hour from 9:00. "
+)
+
+
+def percentile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def measure(output_mode: str, args) -> dict:
+    words = ANSWER_WORDS.split()
+    answer = " ".join(words[i % len(words)] for i in range(args.answer_words))
+    llm = MockFunctionCallingLLM(latency_seconds=args.llm_latency, token_latency_seconds=args.token_latency, answer=answer)
+    runtime = AgentRuntime(llm=llm, tools=[get_data_from_md_tool], output_mode=output_mode)
+
+    # Warm-up: first-run imports and caches
+    await runtime.run("What is the Rextro Exhibition?")
+    llm.calls = 0
+
+    latencies, answer_lengths = [], set()
+    cpu_start = time.process_time()
+    for i in range(args.queries):
+        start = time.perf_counter()
+        response = await runtime.run(f"Tell me about the exhibition opening hours ({i})")
+        latencies.append(time.perf_counter() - start)
+        answer_lengths.add(len(response.answer))
+    cpu = time.process_time() - cpu_start
+
+    latencies.sort()
+    return {
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "llm_calls": llm.calls / args.queries,
+        "cpu_ms": cpu / args.queries * 1000,
+        "same_answer": answer_lengths == {len(answer)},
+    }
+
+
+async def main_async(args) -> None:
+    print(f"{args.queries} queries one at a time; mock LLM {args.llm_latency * 1000:.0f} ms per call "
+          f"+ {args.token_latency * 1000:.0f} ms per word, answers of {args.answer_words} words")
+    print(f"{'mode':<11} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'LLM calls':>10} {'CPU ms/req':>11} {'answer ok':>10}")
+    results = {}
+    for output_mode in OUTPUT_MODES:
+        result = results[output_mode] = await measure(output_mode, args)
+        print(f"{output_mode:<11} {result['mean'] * 1000:>8.0f} {result['p50'] * 1000:>8.0f} {result['p95'] * 1000:>8.0f} "
+              f"{result['llm_calls']:>10.1f} {result['cpu_ms']:>11.1f} {str(result['same_answer']):>10}")
+    structured, text = results["structured"], results["text"]
+    print(f"text mode saves {(structured['mean'] - text['mean']) * 1000:.0f} ms "
+          f"({(1 - text['mean'] / structured['mean']) * 100:.0f}%) and "
+          f"{structured['cpu_ms'] - text['cpu_ms']:.1f} ms CPU per request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Structured vs text agent output latency")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="mock LLM seconds per call")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="mock LLM seconds per generated word")
+    parser.add_argument("--answer-words", type=int, default=120, help="length of the final answer")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
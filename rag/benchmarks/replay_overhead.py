@@ -0,0 +1,292 @@
+"""
+Server overhead per request, replaying recorded conversations through main.app.
+
+Record once (CASSETTE_MODE=record): scripted multi-turn conversations are
+sent through the app in process, against in-process stand-in Gemini and
+Rextro APIs (or, with --live, the APIs configured in the environment), and
+every Gemini call and Rextro API request lands in the cassette with its
+timing. Replay (CASSETTE_MODE=replay) needs no network: --conversations
+copies of the scripts run through the ASGI interface, --concurrency at a
+time, each in its own server-issued conversation from its own client address, and the
+cassette serves the upstream calls with their recorded latency (--latency
+original) or none (--latency zero).
+
+Reports, per request:
+- latency percentiles, and server overhead: latency minus the replayed
+  upstream wait, i.e. the time spent in the app itself (equal to latency
+  with --latency zero)
+- CPU milliseconds and generation-0 garbage collections
+- allocations from a second, smaller tracemalloc pass: peak bytes and bytes
+  still held after the run, divided by the requests
+- event-loop lag: how late a 5 ms ticker wakes up while the load runs
+
+The --max-* options turn a run into a check: the exit status is 1 when a
+limit is exceeded or the cassette misses a call, so CI catches overhead
+regressions without network. benchmarks/cassettes/conversations.jsonl is
+recorded from the stand-ins and replays as is.
+
+Usage (from the rag/ directory):
+    python -m benchmarks.replay_overhead --record
+    python -m benchmarks.replay_overhead --conversations 200 --concurrency 50 --latency zero
+    python -m benchmarks.replay_overhead --latency zero --max-overhead-p95-ms 80 --max-cpu-ms 25
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(__file__), "cassettes", "conversations.jsonl")
+
+# Each conversation is a list of (endpoint, query) turns; the first starts it, the rest send back its conversation_id
+SCRIPTS = [
+    [("/ask", "Which sessions are about robotics?"),
+     ("/ask", "Where is the first one held?"),
+     ("/ask/stream", "Are there any workshops on the same day?")],
+    [("/ask", "What zones are there at the exhibition?"),
+     ("/ask/stream", "How do I get to the engineering zone?")],
+    [("/ask/stream", "Tell me about the Rextro exhibition"),
+     ("/ask", "Who can visit it?"),
+     ("/ask", "Is there a schedule for the AI talks?")],
+    [("/ask", "When does the exhibition open?"),
+     ("/ask", "Which sessions cover healthcare?")],
+]
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def answered(endpoint: str, response: httpx.Response) -> bool:
+    if response.status_code != 200:
+        return False
+    if endpoint == "/ask/stream":
+        return "event: answer" in response.text
+    return not response.json()["answer"].startswith("I encountered")
+
+
+def conversation_id_of(endpoint: str, response: httpx.Response) -> str:
+    """The conversation_id the server returned with a turn's answer."""
+    if endpoint == "/ask/stream":
+        data = response.text.split("event: answer\ndata: ", 1)[1].split("\n", 1)[0]
+        return json.loads(data)["conversation_id"]
+    return response.json()["conversation_id"]
+
+
+class LoopLagMonitor:
+    """Measures how late a `interval`-second sleep wakes up on the running loop."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+async def run_conversations(client: httpx.AsyncClient, conversations: int, concurrency: int) -> dict:
+    """Runs the scripts `conversations` times, `concurrency` conversations at a time."""
+    from src.replay.cassette import replayed_wait
+
+    latencies, overheads, failures = [], [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def conversation(n: int) -> None:
+        script = SCRIPTS[n % len(SCRIPTS)]
+        headers = {"X-Forwarded-For": f"100.64.{n // 250 % 250}.{n % 250 + 1}"}
+        async with semaphore:
+            turn = {"new_conversation": True}
+            for endpoint, query in script:
+                waited = [0.0]
+                token = replayed_wait.set(waited)
+                start = time.perf_counter()
+                try:
+                    response = await client.post(endpoint, headers=headers,
+                                                 json={"query": query, **turn})
+                finally:
+                    replayed_wait.reset(token)
+                elapsed = time.perf_counter() - start
+                if not answered(endpoint, response):
+                    failures.append(f"{endpoint} {query!r}: {response.status_code} {response.text[:200]}")
+                    break
+                turn = {"conversation_id": conversation_id_of(endpoint, response)}
+                latencies.append(elapsed)
+                overheads.append(max(0.0, elapsed - waited[0]))
+
+    await asyncio.gather(*(conversation(n) for n in range(conversations)))
+    latencies.sort()
+    overheads.sort()
+    return {"latencies": latencies, "overheads": overheads, "failures": failures}
+
+
+def client_for(app) -> httpx.AsyncClient:
+    # The app runs in the calling task, so replayed_wait reaches the cassette
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay", timeout=120)
+
+
+async def record(args) -> None:
+    import main
+
+    await main.startup_event()
+    try:
+        async with client_for(main.app) as client:
+            result = await run_conversations(client, len(SCRIPTS), 1)
+    finally:
+        await main.shutdown_event()
+    for failure in result["failures"]:
+        print(f"  failed: {failure}")
+    from src.replay.cassette import get_cassette
+    print(f"Recorded {get_cassette().recorded} calls from {len(result['latencies'])} turns to {args.cassette}")
+
+
+async def replay(args) -> int:
+    import main
+    from src.replay.cassette import get_cassette
+
+    await main.startup_event()
+    cassette = get_cassette()
+    try:
+        async with client_for(main.app) as client:
+            # Warm-up: imports, first-call caches and pydantic schemas, not measured
+            await run_conversations(client, len(SCRIPTS), len(SCRIPTS))
+
+            gc.collect()
+            gc_before = gc.get_stats()[0]["collections"]
+            cpu_before = time.process_time()
+            monitor = LoopLagMonitor()
+            monitor.start()
+            wall_start = time.perf_counter()
+            result = await run_conversations(client, args.conversations, args.concurrency)
+            wall = time.perf_counter() - wall_start
+            await monitor.stop()
+            cpu = time.process_time() - cpu_before
+            gc0 = gc.get_stats()[0]["collections"] - gc_before
+
+            # Allocation pass: tracemalloc slows everything down, so it runs separately
+            gc.collect()
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            traced = await run_conversations(client, args.alloc_conversations, args.concurrency)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0] - baseline
+            tracemalloc.stop()
+    finally:
+        await main.shutdown_event()
+
+    requests = len(result["latencies"])
+    traced_requests = max(1, len(traced["latencies"]))
+    latencies, overheads, lags = result["latencies"], result["overheads"], sorted(monitor.lags)
+    report = {
+        "overhead_p95_ms": percentile(overheads, 0.95) * 1000,
+        "cpu_ms": cpu / max(1, requests) * 1000,
+        "alloc_peak_kb": peak / traced_requests / 1024,
+        "loop_lag_p99_ms": percentile(lags, 0.99) * 1000,
+    }
+
+    print(f"{requests} requests in {args.conversations} conversations, concurrency {args.concurrency}, "
+          f"latency {cassette.latency}: {requests / wall:.1f} req/s")
+    print(f"  latency      p50 {percentile(latencies, 0.50) * 1000:8.2f} ms   p95 {percentile(latencies, 0.95) * 1000:8.2f} ms"
+          f"   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms")
+    print(f"  overhead     p50 {percentile(overheads, 0.50) * 1000:8.2f} ms   p95 {report['overhead_p95_ms']:8.2f} ms"
+          f"   p99 {percentile(overheads, 0.99) * 1000:8.2f} ms")
+    print(f"  cpu          {report['cpu_ms']:8.2f} ms/request   gen0 collections {gc0 / max(1, requests):.2f}/request")
+    print(f"  allocations  peak {report['alloc_peak_kb']:8.1f} KiB/request   retained {retained / traced_requests / 1024:8.1f} KiB/request"
+          f"   ({len(traced['latencies'])} traced requests)")
+    print(f"  loop lag     p50 {percentile(lags, 0.50) * 1000:8.2f} ms   p99 {report['loop_lag_p99_ms']:8.2f} ms"
+          f"   max {(lags[-1] if lags else 0) * 1000:8.2f} ms")
+    print(f"  cassette     {cassette.replayed} calls replayed, {cassette.misses} misses")
+
+    failed = []
+    for failure in result["failures"][:5] + traced["failures"][:5]:
+        print(f"  failed: {failure}")
+    if result["failures"] or traced["failures"] or cassette.misses:
+        failed.append("failed requests or cassette misses")
+    for name, limit in [("overhead_p95_ms", args.max_overhead_p95_ms), ("cpu_ms", args.max_cpu_ms),
+                        ("alloc_peak_kb", args.max_alloc_kb), ("loop_lag_p99_ms", args.max_loop_lag_ms)]:
+        if limit is not None and report[name] > limit:
+            failed.append(f"{name} {report[name]:.2f} > {limit}")
+    for reason in failed:
+        print(f"FAIL: {reason}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--record", action="store_true", help="record the cassette instead of replaying it")
+    parser.add_argument("--live", action="store_true", help="record against the configured APIs, not the stand-ins")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="stand-in Gemini seconds per call (recording)")
+    parser.add_argument("--rextro-latency", type=float, default=0.05, help="stand-in Rextro seconds per request (recording)")
+    parser.add_argument("--latency", default="original", choices=["original", "zero"], help="replayed upstream latency")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--alloc-conversations", type=int, default=40, help="conversations in the tracemalloc pass")
+    parser.add_argument("--max-overhead-p95-ms", type=float)
+    parser.add_argument("--max-cpu-ms", type=float)
+    parser.add_argument("--max-alloc-kb", type=float, help="peak traced KiB per request")
+    parser.add_argument("--max-loop-lag-ms", type=float, help="p99 event-loop lag")
+    args = parser.parse_args()
+
+    servers = []
+    if args.record and not args.live:
+        from benchmarks.standin_gemini_api import start_standin_gemini
+        from benchmarks.standin_rextro_api import start_standin_api
+
+        gemini, gemini_url = start_standin_gemini(args.llm_latency, token_latency_seconds=0.02,
+                                                  jitter_seconds=args.llm_latency / 4)
+        rextro, rextro_url = start_standin_api(args.rextro_latency)
+        servers = [gemini, rextro]
+        os.environ.update(GEMINI_API_BASE=gemini_url, GEMINI_TRANSPORT="rest", REXTRO_API_BASE_URL=rextro_url)
+    if args.record and os.path.exists(args.cassette):
+        os.remove(args.cassette)
+
+    os.environ.update(
+        CASSETTE_MODE="record" if args.record else "replay",
+        CASSETTE_PATH=args.cassette,
+        CASSETTE_LATENCY=args.latency,
+        # Every turn is an agent run: no precomputed or cached answers, no shortcuts
+        FAQ_STORE_ENABLED="false",
+        REXTRO_MIRROR_ENABLED="false",
+        TOOL_PREFETCH_ENABLED="false",
+        STATE_BACKEND="memory",
+        ADMISSION_MAX_INFLIGHT=str(max(args.concurrency, 16)),
+        ADMISSION_MAX_QUEUE=str(max(args.concurrency, 64)),
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    try:
+        if args.record:
+            asyncio.run(record(args))
+            status = 0
+        else:
+            status = asyncio.run(replay(args))
+    finally:
+        for server in servers:
+            server.shutdown()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Local Rextro mirror: sync from the stand-in API, check lookups against the
+API, and compare tool latency with and without the mirror.
+
+1. A full sync copies the stand-in's sessions and zones (small pages, so it
+   really pages).
+2. Session searches and zone listings from the mirror are checked against
+   the stand-in API's own results (all pages, and page by page as the tools
+   return them), for several queries, tags and sort orders.
+3. The stand-in's data is changed: one session updated, one added. A delta
+   sync must pick both up with one request per collection. Then a session
+   is deleted, which the delta notices from the total and turns into a
+   full sync.
+4. search_rextro_sessions and get_zones are timed with the tool response
+   cache off, calling the API (--delay per request) and answered from the
+   mirror.
+
+Usage (from the rag/ directory):
+    python -m benchmarks.rextro_mirror --delay 0.05 --calls 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks import standin_rextro_api
+from benchmarks.standin_rextro_api import start_standin_api
+
+SESSION_SEARCHES = [
+    {},
+    {"query": "robotics"},
+    {"query": "workshop"},
+    {"query": "healthcare"},
+    {"tags": ["ai"]},
+    {"tags": ["robotics", "business"]},
+    {"query": "workshop", "tags": ["ai"]},
+]
+SORTS = [("time", "desc"), ("time", "asc"), ("title", "asc")]
+
+
+async def api_all(client, path: str, params: dict) -> list:
+    """Every item the API returns for `params`, across all pages."""
+    items, page = [], 1
+    while True:
+        body = await client.fetch_json(path, {**params, "page": page, "limit": 3})
+        items.extend(body["data"])
+        if page * 3 >= body["pagination"]["total"]:
+            return items
+        page += 1
+
+
+def ids(items: list) -> list:
+    return [item["_id"] for item in items]
+
+
+async def check_pages(client, path: str, params: dict, matches: list, limit: int = 3) -> None:
+    """Each page the tools build from the mirror holds the same items and pagination as the API's page."""
+    from src.retrieval.rextro_mirror import paged
+
+    for page in range(1, len(matches) // limit + 2):
+        body = await client.fetch_json(path, {**params, "page": page, "limit": limit})
+        got = paged(matches, page, limit)
+        assert ids(got["data"]) == ids(body["data"]), f"{path} {params} page {page}: mirror != API"
+        assert got["pagination"] == body["pagination"], f"{path} {params} page {page}: {got['pagination']}"
+
+
+async def check_against_api(client, mirror) -> int:
+    from src.agent.tools.search_rextro_sessions import session_search_params
+
+    checked = 0
+    for search in SESSION_SEARCHES:
+        for sort_by, sort_order in SORTS:
+            params = session_search_params(sortBy=sort_by, sortOrder=sort_order, **search)
+            params.pop("page"), params.pop("limit")
+            expected = ids(await api_all(client, "/sessions/search", params))
+            matches = mirror.sessions.search(search.get("query"), search.get("tags"), sort_by, sort_order)
+            got = ids(matches)
+            assert got == expected, f"sessions {search} {sort_by} {sort_order}: mirror {got} != API {expected}"
+            await check_pages(client, "/sessions/search", params, matches)
+            checked += 1
+    for sort_by, sort_order in [("name", "asc"), ("name", "desc")]:
+        expected = ids(await api_all(client, "/zones", {"sortBy": sort_by, "sortOrder": sort_order}))
+        matches = mirror.zones.search(sort_by=sort_by, sort_order=sort_order)
+        got = ids(matches)
+        assert got == expected, f"zones {sort_by} {sort_order}: mirror {got} != API {expected}"
+        await check_pages(client, "/zones", {"sortBy": sort_by, "sortOrder": sort_order}, matches)
+        checked += 1
+    return checked
+
+
+async def sync_and_report(mirror, fetch, label: str, full: bool = False) -> None:
+    before = {c.name: c.requests for c in mirror.collections}
+    results = await mirror.sync(fetch, full=full)
+    for result in results:
+        requests = mirror.sessions.requests if result["collection"] == "sessions" else mirror.zones.requests
+        print(f"  {label:<16} {result['collection']:<9} mode={result['mode']:<5} changed={result['changed']} "
+              f"items={result['items']} requests={requests - before[result['collection']]}")
+
+
+async def time_tool(fn, calls: int, **kwargs) -> float:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await fn(**kwargs)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+async def main_async(args) -> None:
+    from src.agent.tools.get_rextro_zones import get_zones
+    from src.agent.tools.rextro_api_client import close_rextro_client, init_rextro_client
+    from src.agent.tools.search_rextro_sessions import search_rextro_sessions
+    from src.retrieval.rextro_mirror import rextro_mirror as mirror
+
+    client = init_rextro_client()
+    fetch = client.fetch_json
+    mirror.sessions.page_size = mirror.zones.page_size = 4
+
+    print("sync:")
+    await sync_and_report(mirror, fetch, "initial")
+    await sync_and_report(mirror, fetch, "no change")
+    print(f"mirror matches API for {await check_against_api(client, mirror)} searches")
+
+    sessions = standin_rextro_api.SESSIONS
+    sessions[1] = {**sessions[1], "title": "Advanced Robotics Workshop", "updatedAt": "2025-10-05T08:00:00.000Z"}
+    sessions.append({**sessions[2], "_id": "session-new", "title": "Healthcare Robotics Panel",
+                     "tags": ["robotics", "talk"], "time": "2025-10-12T17:00:00.000Z",
+                     "createdAt": "2025-10-05T09:00:00.000Z", "updatedAt": "2025-10-05T09:00:00.000Z"})
+    await sync_and_report(mirror, fetch, "update + add")
+    assert "session-new" in ids(mirror.sessions.search("panel"))
+    assert ids(mirror.sessions.search("advanced")) == ["session-1"]
+    del sessions[4]
+    await sync_and_report(mirror, fetch, "delete")
+    print(f"mirror matches API for {await check_against_api(client, mirror)} searches after changes")
+
+    print(f"\ntool latency (median of {args.calls}), API delay {args.delay * 1000:.0f} ms:")
+    for label, fn, kwargs in [
+        ("search_rextro_sessions", search_rextro_sessions, {"query": "robotics"}),
+        ("get_zones", get_zones, {}),
+    ]:
+        mirror.enabled = False
+        api = await time_tool(fn, args.calls, **kwargs)
+        mirror.enabled = True
+        local = await time_tool(fn, args.calls, **kwargs)
+        print(f"  {label:<24} API {api * 1000:8.2f} ms   mirror {local * 1000:8.3f} ms")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        mirror.sessions.search("robotics workshop", ["robotics"], "time", "desc")
+    print(f"  mirror lookup alone        {(time.perf_counter() - start) / 10000 * 1e6:.1f} µs")
+    await close_rextro_client()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rextro mirror sync, correctness and lookup latency")
+    parser.add_argument("--delay", type=float, default=0.05, help="stand-in Rextro API delay in seconds")
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    server, base_url = start_standin_api(args.delay)
+    os.environ["REXTRO_API_BASE_URL"] = base_url
+    # Time the API path itself, not the tool response cache
+    os.environ["TOOL_CACHE_ZONES_TTL_SECONDS"] = "0"
+    os.environ["TOOL_CACHE_SESSIONS_TTL_SECONDS"] = "0"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
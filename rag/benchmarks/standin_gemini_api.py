@@ -0,0 +1,223 @@
+"""
+Local stand-in for the Gemini REST API (generateContent / streamGenerateContent).
+
+Plays the same script as MockFunctionCallingLLM, but over HTTP so the real
+Gemini client, its REST transport and the whole app run unmodified: on a
+user turn it calls the tools picked by `default_tool_plan`, after tool
+results it writes the final answer, and for the structured-output pass (the
+only function offered is the output class) it fills `answer`.
+
+Every call waits `latency` (+/- `jitter`) before the first byte; streamed
+answers are sent as a chunked JSON array, one chunk of `chunk_words` words
+every `token_latency` seconds. A fraction `error_rate` of calls fail with
+503 UNAVAILABLE, which the agent treats as transient.
+
+Point the app at it with:
+    GEMINI_API_BASE=http://127.0.0.1:9200 GEMINI_TRANSPORT=rest
+
+Usage as a standalone server:
+    python -m benchmarks.standin_gemini_api --port 9200 --latency 0.4 --token-latency 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from .mock_llm import AGENT_TOOL_NAMES, default_tool_plan
+
+MODEL_METADATA = {
+    "name": "models/gemini-2.5-flash",
+    "version": "standin",
+    "displayName": "Gemini 2.5 Flash (stand-in)",
+    "inputTokenLimit": 1048576,
+    "outputTokenLimit": 65536,
+    "supportedGenerationMethods": ["generateContent", "countTokens"],
+}
+
+ANSWER_WORDS = (
+    "The **Rextro Exhibition** at the University of Ruhuna showcases student and industry "
+    "projects across engineering departments, with guided zones, live demonstrations, "
+    "technical sessions and workshops open to all visitors throughout the event days."
+).split()
+
+
+def _last_text(content: Dict[str, Any]) -> str:
+    # The client folds the system prompt into the first user content; the query is the last part
+    texts = [part["text"] for part in content.get("parts", []) if "text" in part]
+    return texts[-1] if texts else ""
+
+
+def _declared_functions(body: Dict[str, Any]) -> List[str]:
+    return [
+        declaration["name"]
+        for tool in body.get("tools", [])
+        for declaration in tool.get("functionDeclarations", [])
+    ]
+
+
+def _answers_tool_call(contents: List[Dict[str, Any]]) -> bool:
+    """True when the trailing non-model contents are results for the model's last function calls."""
+    for content in reversed(contents):
+        parts = content.get("parts", [])
+        if any("functionResponse" in part for part in parts):
+            return True
+        if content.get("role") == "model":
+            return any("functionCall" in part for part in parts)
+    return False
+
+
+def _candidate(parts: List[Dict[str, Any]], finish: bool = True) -> Dict[str, Any]:
+    candidate: Dict[str, Any] = {"content": {"role": "model", "parts": parts}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0},
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    # The app opens many connections at once under load; the default backlog is 5
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class StandinGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    latency_seconds = 0.0
+    jitter_seconds = 0.0
+    token_latency_seconds = 0.0
+    chunk_words = 4
+    answer_words = 40
+    error_rate = 0.0
+
+    def _answer(self) -> str:
+        words = (ANSWER_WORDS * (self.answer_words // len(ANSWER_WORDS) + 1))[:self.answer_words]
+        return " ".join(words) + "."
+
+    def _turn(self, body: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Returns the model parts for this request and whether they are answer text (streamable)."""
+        functions = _declared_functions(body)
+        contents = body.get("contents", [])
+        last = contents[-1] if contents else {}
+
+        # Structured-output pass: the only function offered is the output class
+        if functions and not AGENT_TOOL_NAMES.intersection(functions):
+            return [{"functionCall": {"name": functions[0], "args": {"answer": self._answer()}}}], False
+
+        if functions and not _answers_tool_call(contents):
+            plan = [(name, args) for name, args in default_tool_plan(_last_text(last)) if name in functions]
+            if plan:
+                return [{"functionCall": {"name": name, "args": args}} for name, args in plan], False
+
+        return [{"text": self._answer()}], True
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, parts: List[Dict[str, Any]], is_text: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        if is_text:
+            words = parts[0]["text"].split(" ")
+            pieces = [" ".join(words[i:i + self.chunk_words]) + " " for i in range(0, len(words), self.chunk_words)]
+            pieces[-1] = pieces[-1].rstrip()
+        else:
+            pieces = [None]
+
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(self.token_latency_seconds)
+            last = index == len(pieces) - 1
+            response = _candidate([{"text": piece}] if piece is not None else parts, finish=last)
+            self._send_chunk((("[" if index == 0 else ",") + json.dumps(response) + ("]" if last else "")).encode())
+        self._send_chunk(b"")
+
+    def do_GET(self):
+        if urlparse(self.path).path.startswith("/v1beta/models/"):
+            self._send_json(200, MODEL_METADATA)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        time.sleep(max(0.0, self.latency_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds)))
+        if random.random() < self.error_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}})
+            return
+
+        parts, is_text = self._turn(body)
+        if path.endswith(":streamGenerateContent"):
+            self._stream(parts, is_text)
+        elif path.endswith(":generateContent"):
+            self._send_json(200, _candidate(parts))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin_gemini(
+    latency_seconds: float = 0.0,
+    token_latency_seconds: float = 0.0,
+    port: int = 0,
+    jitter_seconds: float = 0.0,
+    chunk_words: int = 4,
+    answer_words: int = 40,
+    error_rate: float = 0.0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the stand-in Gemini API on a background thread and returns (server, base_url)."""
+    handler = type("Handler", (StandinGeminiHandler,), {
+        "latency_seconds": latency_seconds,
+        "jitter_seconds": jitter_seconds,
+        "token_latency_seconds": token_latency_seconds,
+        "chunk_words": max(1, chunk_words),
+        "answer_words": max(1, answer_words),
+        "error_rate": error_rate,
+    })
+    server = _Server(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds before the first byte of each call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds of uniform jitter on --latency")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--chunk-words", type=int, default=4, help="words per streamed chunk")
+    parser.add_argument("--answer-words", type=int, default=40, help="length of the final answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    args = parser.parse_args()
+
+    server, base_url = start_standin_gemini(
+        args.latency, args.token_latency, args.port,
+        jitter_seconds=args.jitter, chunk_words=args.chunk_words,
+        answer_words=args.answer_words, error_rate=args.error_rate,
+    )
+    print(f"Stand-in Gemini API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,273 @@
+"""
+Local stand-in for Redis, covering the commands the Redis state backend
+(src/state/store.py, STATE_BACKEND=redis) and redis-py use: PING, GET, SET
+(EX/PX/NX/XX), DEL, INCR/INCRBY, EXPIRE/PEXPIRE, TTL/PTTL, SCAN, MULTI/EXEC
+and a few housekeeping commands. Data lives in memory; commands run one at
+a time under a lock, so MULTI/EXEC blocks are atomic.
+
+Lets multi-node setups (several app instances sharing rate limits and
+caches) be exercised on one machine without a Redis server. Not a
+replacement for Redis in production.
+
+Usage as a standalone server:
+    python -m benchmarks.standin_redis --port 6399
+    REDIS_URL=redis://127.0.0.1:6399/0 STATE_BACKEND=redis python main.py
+"""
+import argparse
+import re
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class RedisError(Exception):
+    pass
+
+
+def _glob_to_regex(pattern: str) -> "re.Pattern":
+    """Redis MATCH glob (*, ?, [...], backslash escapes) as a compiled regex."""
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        if c == "*":
+            out.append(".*")
+        elif c == "?":
+            out.append(".")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                out.append("[^" + body[1:] + "]" if body.startswith("^") else "[" + body + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile("".join(out) + r"\Z", re.DOTALL)
+
+
+class Keyspace:
+    """The stand-in's data: key -> (bytes value, expires_at monotonic or None)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    def _live(self, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def execute(self, args: List[bytes]):
+        name = args[0].decode().upper()
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise RedisError(f"ERR unknown command '{name}'")
+        return handler(*args[1:])
+
+    # --- Commands (called with the lock held) ---
+    def cmd_ping(self, message: bytes = None):
+        return message if message is not None else "PONG"
+
+    def cmd_echo(self, message: bytes):
+        return message
+
+    def cmd_select(self, db: bytes):
+        return "OK"
+
+    def cmd_client(self, *args: bytes):
+        # CLIENT SETINFO / SETNAME sent by clients on connect
+        return "OK"
+
+    def cmd_get(self, key: bytes):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def cmd_set(self, key: bytes, value: bytes, *options: bytes):
+        expires_at, nx, xx, i = None, False, False, 0
+        while i < len(options):
+            option = options[i].decode().upper()
+            if option in ("EX", "PX"):
+                amount = int(options[i + 1])
+                expires_at = time.monotonic() + (amount if option == "EX" else amount / 1000)
+                i += 1
+            elif option == "NX":
+                nx = True
+            elif option == "XX":
+                xx = True
+            else:
+                raise RedisError("ERR syntax error")
+            i += 1
+        exists = self._live(key) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._data[key] = (value, expires_at)
+        return "OK"
+
+    def cmd_del(self, *keys: bytes):
+        return sum(1 for key in keys if self._live(key) is not None and self._data.pop(key, None) is not None)
+
+    def cmd_exists(self, *keys: bytes):
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    def cmd_incrby(self, key: bytes, amount: bytes):
+        entry = self._live(key)
+        try:
+            value = (int(entry[0]) if entry else 0) + int(amount)
+        except ValueError:
+            raise RedisError("ERR value is not an integer or out of range")
+        self._data[key] = (str(value).encode(), entry[1] if entry else None)
+        return value
+
+    def cmd_incr(self, key: bytes):
+        return self.cmd_incrby(key, b"1")
+
+    def cmd_pexpire(self, key: bytes, milliseconds: bytes):
+        entry = self._live(key)
+        if entry is None:
+            return 0
+        self._data[key] = (entry[0], time.monotonic() + int(milliseconds) / 1000)
+        return 1
+
+    def cmd_expire(self, key: bytes, seconds: bytes):
+        return self.cmd_pexpire(key, str(int(seconds) * 1000).encode())
+
+    def cmd_pttl(self, key: bytes):
+        entry = self._live(key)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return max(0, int((entry[1] - time.monotonic()) * 1000))
+
+    def cmd_ttl(self, key: bytes):
+        milliseconds = self.cmd_pttl(key)
+        return milliseconds if milliseconds < 0 else milliseconds // 1000
+
+    def cmd_scan(self, cursor: bytes, *options: bytes):
+        # One pass over everything: cursor 0 back means the scan is complete
+        pattern = None
+        for option, value in zip(options[::2], options[1::2]):
+            if option.decode().upper() == "MATCH":
+                pattern = _glob_to_regex(value.decode())
+        keys = [key for key in list(self._data) if self._live(key) is not None
+                and (pattern is None or pattern.match(key.decode(errors="replace")))]
+        return [b"0", keys]
+
+    def cmd_dbsize(self):
+        return sum(1 for key in list(self._data) if self._live(key) is not None)
+
+    def cmd_flushdb(self, *args: bytes):
+        self._data.clear()
+        return "OK"
+
+    cmd_flushall = cmd_flushdb
+
+
+class RedisProtocolHandler(socketserver.StreamRequestHandler):
+    """One client connection: reads RESP commands and writes RESP replies."""
+
+    keyspace: Keyspace = None
+    # Replies to pipelined commands are written one by one; don't let Nagle hold them back
+    disable_nagle_algorithm = True
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command (e.g. from telnet / redis-cli -e)
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _encode(self, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, RedisError):
+            return f"-{reply}\r\n".encode()
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, bool) or isinstance(reply, int):
+            return f":{int(reply)}\r\n".encode()
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+
+    def handle(self):
+        queued: Optional[List[List[bytes]]] = None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            name = args[0].decode().upper()
+            if name == "QUIT":
+                self.wfile.write(b"+OK\r\n")
+                return
+            if name == "MULTI":
+                queued = []
+                reply = "OK"
+            elif name == "DISCARD":
+                queued, reply = None, "OK"
+            elif name == "EXEC":
+                if queued is None:
+                    reply = RedisError("ERR EXEC without MULTI")
+                else:
+                    with self.keyspace.lock:
+                        reply = [self._run(command) for command in queued]
+                    queued = None
+            elif queued is not None:
+                queued.append(args)
+                reply = "QUEUED"
+            else:
+                with self.keyspace.lock:
+                    reply = self._run(args)
+            self.wfile.write(self._encode(reply))
+
+    def _run(self, args: List[bytes]):
+        try:
+            return self.keyspace.execute(args)
+        except RedisError as e:
+            return e
+        except (TypeError, ValueError, IndexError):
+            return RedisError(f"ERR wrong arguments for '{args[0].decode()}' command")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def start_standin_redis(port: int = 0) -> Tuple[socketserver.ThreadingTCPServer, str]:
+    """Starts the stand-in on a background thread and returns (server, redis_url)."""
+    handler = type("Handler", (RedisProtocolHandler,), {"keyspace": Keyspace()})
+    server = _Server(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://127.0.0.1:{server.server_address[1]}/0"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Redis")
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+
+    server, url = start_standin_redis(args.port)
+    print(f"Stand-in Redis listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
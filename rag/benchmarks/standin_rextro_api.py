@@ -0,0 +1,123 @@
+"""
+Local stand-in for the Rextro API (/zones and /sessions/search).
+
+Serves a small fixed dataset from a background thread with an artificial
+per-request delay, so benchmarks can exercise the tool HTTP path offline.
+
+Usage as a standalone server:
+    python -m benchmarks.standin_rextro_api --port 9100 --delay 0.2
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+ZONES = [
+    {
+        "_id": f"zone-{i}",
+        "name": f"Zone {chr(ord('A') + i)}",
+        "description": f"Exhibits for department {i + 1}, ground floor block {i + 1}.",
+        "location": f"Block {i + 1}",
+        "createdAt": "2025-10-01T08:00:00.000Z",
+        "updatedAt": "2025-10-01T08:00:00.000Z",
+        "__v": 0,
+    }
+    for i in range(8)
+]
+
+SESSIONS = [
+    {
+        "_id": f"session-{i}",
+        "title": title,
+        "description": f"{title} at the Rextro Exhibition.",
+        "tags": tags,
+        "time": f"2025-10-{10 + i % 3:02d}T{9 + i:02d}:00:00.000Z",
+        "zone": ZONES[i % len(ZONES)]["name"],
+        "createdAt": "2025-10-01T08:00:00.000Z",
+        "updatedAt": "2025-10-01T08:00:00.000Z",
+        "__v": 0,
+    }
+    for i, (title, tags) in enumerate([
+        ("Opening Ceremony", ["general"]),
+        ("Robotics Workshop", ["robotics", "workshop"]),
+        ("AI in Healthcare Talk", ["ai", "talk"]),
+        ("Drone Racing Demo", ["robotics", "demo"]),
+        ("Startup Pitch Session", ["business"]),
+        ("Machine Learning Bootcamp", ["ai", "workshop"]),
+    ])
+]
+
+
+def _paginate(items, params):
+    page = int(params.get("page", ["1"])[0])
+    limit = int(params.get("limit", ["10"])[0])
+    sort_by = params.get("sortBy", [None])[0]
+    if sort_by:
+        reverse = params.get("sortOrder", ["desc"])[0] == "desc"
+        items = sorted(items, key=lambda item: str(item.get(sort_by, "")), reverse=reverse)
+    start = (page - 1) * limit
+    return {
+        "data": items[start:start + limit],
+        "pagination": {"page": page, "limit": limit, "total": len(items)},
+    }
+
+
+class StandinRextroHandler(BaseHTTPRequestHandler):
+    delay_seconds = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        time.sleep(self.delay_seconds)
+
+        if url.path == "/zones":
+            body = _paginate(ZONES, params)
+        elif url.path == "/sessions/search":
+            sessions = SESSIONS
+            query = params.get("query", [""])[0].lower()
+            if query:
+                sessions = [s for s in sessions if query in (s["title"] + " " + s["description"]).lower()]
+            tags = [t for t in params.get("tags", [""])[0].split(",") if t]
+            if tags:
+                sessions = [s for s in sessions if set(tags) & set(s["tags"])]
+            body = _paginate(sessions, params)
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin_api(delay_seconds: float = 0.0, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the stand-in API on a background thread and returns (server, base_url)."""
+    handler = type("Handler", (StandinRextroHandler,), {"delay_seconds": delay_seconds})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Rextro API")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to sleep per request")
+    args = parser.parse_args()
+
+    server, base_url = start_standin_api(args.delay, args.port)
+    print(f"Stand-in Rextro API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,107 @@
+"""
+Per-request latency when one LLM turn needs several tools.
+
+A scripted mock LLM answers each query with one turn that calls get_zones,
+search_rextro_sessions (schedule listing) and get_data_from_md, then writes
+the answer and fills the structured-output pass. Every LLM call takes
+--llm-latency and every stand-in Rextro API request takes --delay; the tool
+response cache is off so each run really fetches. Queries run one at a time,
+in three setups:
+
+- serial tools: tool calls of a turn run one after another (emulated with a
+  lock shared by the tools), the behaviour being replaced
+- concurrent tools: the calls of a turn run together (the runtime default)
+- concurrent + prefetch: TOOL_PREFETCH_ENABLED, so the Rextro API calls the
+  query implies start alongside the first LLM turn
+
+Usage (from the rag/ directory):
+    python -m benchmarks.tool_overlap --queries 20 --delay 0.3 --llm-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.standin_rextro_api import start_standin_api
+
+
+def serialized(tool, lock: asyncio.Lock):
+    """A copy of `tool` that holds `lock` while it runs."""
+    from llama_index.core.tools import FunctionTool
+
+    async def call(**kwargs):
+        async with lock:
+            return await tool.acall(**kwargs)
+
+    return FunctionTool.from_defaults(async_fn=call, name=tool.metadata.name, description=tool.metadata.description,
+                                      fn_schema=tool.metadata.fn_schema)
+
+
+def tool_plan(query: str):
+    return [("get_zones", {}), ("search_rextro_sessions", {}), ("get_data_from_md", {"query_text": query})]
+
+
+async def measure(runtime, queries: int) -> list:
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        await runtime.run(f"Where is the schedule for the robotics zone? ({i})")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main_async(args) -> None:
+    from benchmarks.mock_llm import MockFunctionCallingLLM
+    from src.agent.agent import AgentRuntime
+    from src.agent.tools.get_data_from_md import get_data_from_md_tool
+    from src.agent.tools.get_rextro_zones import get_zones_tool
+    from src.agent.tools.rextro_api_client import close_rextro_client, init_rextro_client
+    from src.agent.tools.search_rextro_sessions import search_rextro_sessions_tool
+
+    init_rextro_client()
+    tools = [get_data_from_md_tool, search_rextro_sessions_tool, get_zones_tool]
+    lock = asyncio.Lock()
+    scenarios = [
+        ("serial tools", [serialized(tool, lock) for tool in tools], False),
+        ("concurrent tools", tools, False),
+        ("concurrent + prefetch", tools, True),
+    ]
+
+    floor = 3 * args.llm_latency
+    print(f"{args.queries} queries, LLM {args.llm_latency * 1000:.0f} ms/call (3 calls), "
+          f"Rextro API {args.delay * 1000:.0f} ms/request (2 per query)")
+    print(f"lower bounds: serial {(floor + 2 * args.delay) * 1000:.0f} ms, concurrent {(floor + args.delay) * 1000:.0f} ms, "
+          f"prefetched {(floor + max(0.0, args.delay - args.llm_latency)) * 1000:.0f} ms")
+    for label, scenario_tools, prefetch in scenarios:
+        llm = MockFunctionCallingLLM(latency_seconds=args.llm_latency, tool_plan=tool_plan)
+        runtime = AgentRuntime(llm=llm, tools=scenario_tools, prefetch=prefetch)
+        latencies = await measure(runtime, args.queries)
+        print(f"{label:<22} mean={statistics.mean(latencies) * 1000:7.0f} ms  "
+              f"p50={statistics.median(latencies) * 1000:7.0f} ms  max={max(latencies) * 1000:7.0f} ms  "
+              f"prefetch={runtime.prefetcher.stats()['used']}/{runtime.prefetcher.stats()['started']} used")
+    await close_rextro_client()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tool concurrency and speculative prefetch vs per-request latency")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.3, help="stand-in Rextro API delay in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="mock LLM seconds per call")
+    args = parser.parse_args()
+
+    server, base_url = start_standin_api(args.delay)
+    os.environ["REXTRO_API_BASE_URL"] = base_url
+    # Every run fetches from the API; cached responses would hide the overlap
+    os.environ["TOOL_CACHE_ZONES_TTL_SECONDS"] = "0"
+    os.environ["TOOL_CACHE_SESSIONS_TTL_SECONDS"] = "0"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+/ask throughput of the production server (python main.py) by worker count.
+
+Starts the stand-in Gemini and Rextro APIs, then for each worker count runs
+`python main.py` with SERVER_WORKERS=n and a shared state backend. After a
+warm-up, it drives /ask at a fixed number of concurrent clients for a fixed
+time and finally stops the server with SIGTERM. Every query is unique, so each
+request is a full agent run (CPU in llama-index, the LLM client and pydantic)
+rather than an answer-cache hit. Requests carry distinct X-Forwarded-For
+addresses so the shared rate limiter doesn't throttle the load generator.
+
+Reports requests/s, speedup over the first worker count, latency percentiles,
+errors and how long the graceful shutdown took. Scaling tops out at the
+number of free cores: leave one for the load generator and the stand-ins.
+
+Usage (from the rag/ directory):
+    python -m benchmarks.worker_scaling --workers 1,2,4 --concurrency 64 --duration 20
+    python -m benchmarks.worker_scaling --workers 1,4 --state-backend redis   # via a stand-in Redis
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import httpx
+
+TOPICS = ["AI", "cloud", "security", "APIs", "robotics", "IoT", "data", "design", "startups", "research"]
+
+
+def wait_until_up(url: str, timeout_seconds: float, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} did not come up: process exited with {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"{url} did not come up within {timeout_seconds}s")
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def drive(base_url: str, concurrency: int, duration: float, run_id: str) -> dict:
+    """Closed-loop load: `concurrency` clients each send /ask back to back for `duration` seconds."""
+    latencies, errors, counter = [], 0, 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def user():
+            nonlocal errors, counter
+            while time.monotonic() < deadline:
+                counter += 1
+                n = counter
+                query = f"Which sessions are about {TOPICS[n % len(TOPICS)]}? ({run_id}-{n})"
+                headers = {"X-Forwarded-For": f"100.64.{n // 250 % 250}.{n % 250 + 1}"}
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/ask", json={"query": query}, headers=headers)
+                    ok = response.status_code == 200 and not response.json()["answer"].startswith("I encountered")
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def run_server(workers: int, args, env: dict) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "main.py"],
+        env=dict(env, SERVER_WORKERS=str(workers)),
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"{base_url}/readyz", 180, server)
+        # Warm-up: every worker finishes startup and sees traffic before we measure
+        asyncio.run(drive(base_url, args.concurrency, args.warmup, f"warmup{workers}"))
+        result = asyncio.run(drive(base_url, args.concurrency, args.duration, f"w{workers}"))
+    finally:
+        stop_start = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutdown_seconds = time.perf_counter() - stop_start
+    result["shutdown_s"] = shutdown_seconds
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before each run")
+    parser.add_argument("--state-backend", default="shm", choices=["memory", "shm", "redis"])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stand-in Gemini seconds per call")
+    parser.add_argument("--rextro-latency", type=float, default=0.01, help="stand-in Rextro API seconds per request")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--gemini-port", type=int, default=9201)
+    parser.add_argument("--rextro-port", type=int, default=9101)
+    parser.add_argument("--redis-port", type=int, default=6399)
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    gemini_url = f"http://127.0.0.1:{args.gemini_port}"
+    rextro_url = f"http://127.0.0.1:{args.rextro_port}"
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="benchmark",
+        GEMINI_API_KEY="benchmark",
+        GEMINI_API_BASE=gemini_url,
+        GEMINI_TRANSPORT="rest",
+        REXTRO_API_BASE_URL=rextro_url,
+        SERVER_HOST="127.0.0.1",
+        SERVER_PORT=str(args.port),
+        STATE_BACKEND=args.state_backend,
+        STATE_SHM_PATH=os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else "/tmp", f"rag-bench-{os.getpid()}.sqlite3"),
+        REDIS_URL=f"redis://127.0.0.1:{args.redis_port}/0",
+        # Measure the workers, not admission control
+        ADMISSION_MAX_INFLIGHT="1000",
+        ADMISSION_MAX_QUEUE="1000",
+        PYTHONUNBUFFERED="1",
+    )
+
+    helpers = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.standin_gemini_api", "--port", str(args.gemini_port),
+                          "--latency", str(args.llm_latency), "--token-latency", "0"], stdout=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, "-m", "benchmarks.standin_rextro_api", "--port", str(args.rextro_port),
+                          "--delay", str(args.rextro_latency)], stdout=subprocess.DEVNULL),
+    ]
+    if args.state_backend == "redis":
+        helpers.append(subprocess.Popen([sys.executable, "-m", "benchmarks.standin_redis", "--port", str(args.redis_port)],
+                                        stdout=subprocess.DEVNULL))
+    try:
+        wait_until_up(f"{gemini_url}/v1beta/models/gemini-2.5-flash", 30, helpers[0])
+        wait_until_up(f"{rextro_url}/zones", 30, helpers[1])
+
+        print(f"/ask, {args.concurrency} concurrent clients, {args.duration:.0f} s per run, "
+              f"state backend {args.state_backend}, {os.process_cpu_count()} CPUs")
+        print(f"{'workers':>7} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'shutdown s':>11}")
+        baseline = None
+        for workers in worker_counts:
+            result = run_server(workers, args, env)
+            baseline = baseline or result["rps"]
+            print(f"{workers:>7} {result['rps']:>8.1f} {result['rps'] / baseline:>7.2f}x "
+                  f"{result['p50'] * 1000:>8.0f} {result['p95'] * 1000:>8.0f} {result['p99'] * 1000:>8.0f} "
+                  f"{result['errors']:>7} {result['shutdown_s']:>11.1f}")
+    finally:
+        for helper in reversed(helpers):
+            helper.terminate()
+            helper.wait(timeout=10)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(env["STATE_SHM_PATH"] + suffix)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,133 @@ class Config:
             
             self._openai_api_key = self._get_required_env('OPENAI_API_KEY')
             self._gemini_api_key = self._get_required_env('GEMINI_API_KEY')
+            # Alternative Gemini endpoint (e.g. a local stand-in) and transport ("rest", "grpc")
+            self._gemini_api_base = os.getenv('GEMINI_API_BASE', '')
+            self._gemini_transport = os.getenv('GEMINI_TRANSPORT', '')
+            # Cheaper/faster model used while the primary one fails or its circuit is open ('' = none)
+            self._gemini_fallback_model = os.getenv('GEMINI_FALLBACK_MODEL', '')
+
+            # "structured" (extra LLM pass returning a KnowledgeResponse) or "text" (last turn's markdown)
+            self._agent_output_mode = os.getenv('AGENT_OUTPUT_MODE', 'structured').lower()
+
+            # Agent run deadlines: whole request, each attempt, and attempts per request
+            self._agent_deadline_seconds = float(os.getenv('AGENT_DEADLINE_SECONDS', '90'))
+            self._agent_attempt_timeout_seconds = float(os.getenv('AGENT_ATTEMPT_TIMEOUT_SECONDS', '45'))
+            self._agent_max_attempts = int(os.getenv('AGENT_MAX_ATTEMPTS', '2'))
+            # Each Gemini call: deadline per attempt (first chunk / gap between chunks when
+            # streaming), attempts, and delay before a hedged second attempt (0 = no hedging)
+            self._llm_call_timeout_seconds = float(os.getenv('LLM_CALL_TIMEOUT_SECONDS', '20'))
+            self._llm_max_attempts = int(os.getenv('LLM_MAX_ATTEMPTS', '2'))
+            self._llm_hedge_delay_seconds = float(os.getenv('LLM_HEDGE_DELAY_SECONDS', '0'))
+            # Circuit breakers for Gemini models and Rextro API endpoints
+            self._breaker_failure_threshold = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+            self._breaker_reset_seconds = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+
+            # Answer cache in front of the agent
+            self._answer_cache_max_entries = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '512'))
+            self._answer_cache_ttl_seconds = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '600'))
+            # Expired answers are kept this much longer as the last known good answer for degraded mode
+            self._answer_cache_stale_seconds = float(os.getenv('ANSWER_CACHE_STALE_SECONDS', '86400'))
+
+            # Rextro API client used by the session and zone tools
+            self._rextro_api_base_url = os.getenv('REXTRO_API_BASE_URL', 'https://rextro-api.internalbuildtools.online')
+            self._rextro_api_max_connections = int(os.getenv('REXTRO_API_MAX_CONNECTIONS', '20'))
+            self._rextro_api_max_keepalive_connections = int(os.getenv('REXTRO_API_MAX_KEEPALIVE_CONNECTIONS', '10'))
+            self._rextro_api_timeout_seconds = float(os.getenv('REXTRO_API_TIMEOUT_SECONDS', '10'))
+            self._rextro_api_connect_timeout_seconds = float(os.getenv('REXTRO_API_CONNECT_TIMEOUT_SECONDS', '5'))
+            self._rextro_api_verify_ssl = os.getenv('REXTRO_API_VERIFY_SSL', 'false').lower() == 'true'
+
+            # Rextro API response cache (TTL 0 disables caching for an endpoint)
+            self._tool_cache_zones_ttl_seconds = float(os.getenv('TOOL_CACHE_ZONES_TTL_SECONDS', '300'))
+            self._tool_cache_sessions_ttl_seconds = float(os.getenv('TOOL_CACHE_SESSIONS_TTL_SECONDS', '60'))
+            self._tool_cache_stale_seconds = float(os.getenv('TOOL_CACHE_STALE_SECONDS', '600'))
+            self._tool_cache_max_entries = int(os.getenv('TOOL_CACHE_MAX_ENTRIES', '1024'))
+            # Start likely Rextro API calls (picked from the query) alongside the first LLM turn
+            self._tool_prefetch_enabled = os.getenv('TOOL_PREFETCH_ENABLED', 'false').lower() == 'true'
+            # Local mirror of Rextro sessions and zones answering the tools without API calls
+            self._rextro_mirror_enabled = os.getenv('REXTRO_MIRROR_ENABLED', 'false').lower() == 'true'
+            self._rextro_mirror_sync_seconds = float(os.getenv('REXTRO_MIRROR_SYNC_SECONDS', '60'))
+            self._rextro_mirror_full_sync_seconds = float(os.getenv('REXTRO_MIRROR_FULL_SYNC_SECONDS', '900'))
+            self._rextro_mirror_page_size = int(os.getenv('REXTRO_MIRROR_PAGE_SIZE', '100'))
+            # Precomputed FAQ answers (built with `python -m src.cache.faq_store`) served before the agent
+            self._faq_store_enabled = os.getenv('FAQ_STORE_ENABLED', 'true').lower() == 'true'
+            self._faq_store_path = os.getenv('FAQ_STORE_PATH', './data/faq/faq_store.json')
+            self._faq_match_threshold = float(os.getenv('FAQ_MATCH_THRESHOLD', '0.8'))
+            # Record (or replay) Gemini and Rextro API calls to a cassette: off, record or replay
+            self._cassette_mode = os.getenv('CASSETTE_MODE', 'off').lower()
+            self._cassette_path = os.getenv('CASSETTE_PATH', './data/cassettes/default.jsonl')
+            # Replay with the recorded latencies (original) or none (zero)
+            self._cassette_latency = os.getenv('CASSETTE_LATENCY', 'original').lower()
+
+            # Token caps for tool output added to the LLM context
+            self._tool_output_max_tokens = int(os.getenv('TOOL_OUTPUT_MAX_TOKENS', '1200'))
+            self._request_tool_token_budget = int(os.getenv('REQUEST_TOOL_TOKEN_BUDGET', '4000'))
+
+            # Readiness probe of the Rextro API (cached between load balancer polls). Reported in the
+            # /readyz body; only fails the probe when required, since every replica shares the upstream
+            self._readiness_require_upstream = os.getenv('READINESS_REQUIRE_UPSTREAM', 'false').lower() == 'true'
+            self._readiness_upstream_interval_seconds = float(os.getenv('READINESS_UPSTREAM_INTERVAL_SECONDS', '10'))
+            self._readiness_upstream_timeout_seconds = float(os.getenv('READINESS_UPSTREAM_TIMEOUT_SECONDS', '2'))
+
+            # Opt-in synthetic load endpoint for capacity calibration
+            self._synthetic_load_enabled = os.getenv('SYNTHETIC_LOAD_ENABLED', 'false').lower() == 'true'
+            self._synthetic_load_max_cpu_ms = int(os.getenv('SYNTHETIC_LOAD_MAX_CPU_MS', '5000'))
+            self._synthetic_load_max_memory_mb = int(os.getenv('SYNTHETIC_LOAD_MAX_MEMORY_MB', '512'))
+            self._synthetic_load_max_io_ms = int(os.getenv('SYNTHETIC_LOAD_MAX_IO_MS', '10000'))
+
+            # Admin profiling endpoints (sampling profiler, tracemalloc); also need ADMIN_TOKEN
+            self._profiling_enabled = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+            self._profiling_max_seconds = float(os.getenv('PROFILING_MAX_SECONDS', '60'))
+            # Event-loop lag metrics and stacks of coroutines blocking the loop, from startup
+            self._loop_watchdog_enabled = os.getenv('LOOP_WATCHDOG_ENABLED', 'false').lower() == 'true'
+            self._loop_watchdog_interval_seconds = float(os.getenv('LOOP_WATCHDOG_INTERVAL_SECONDS', '0.05'))
+            self._loop_watchdog_threshold_seconds = float(os.getenv('LOOP_WATCHDOG_THRESHOLD_SECONDS', '0.1'))
+
+            # Server-side conversation sessions for /ask with a conversation_id
+            self._session_max_sessions = int(os.getenv('SESSION_MAX_SESSIONS', '2000'))
+            self._session_max_total_tokens = int(os.getenv('SESSION_MAX_TOTAL_TOKENS', '4000000'))
+            self._session_token_budget = int(os.getenv('SESSION_TOKEN_BUDGET', '3000'))
+            self._session_idle_timeout_seconds = float(os.getenv('SESSION_IDLE_TIMEOUT_SECONDS', '1800'))
+
+            # Admission control for agent runs
+            self._admission_max_inflight = int(os.getenv('ADMISSION_MAX_INFLIGHT', '16'))
+            self._admission_max_queue = int(os.getenv('ADMISSION_MAX_QUEUE', '64'))
+            self._admission_max_queued_per_client = int(os.getenv('ADMISSION_MAX_QUEUED_PER_CLIENT', '8'))
+            self._admission_queue_timeout_seconds = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '20'))
+            # Proxies whose X-Forwarded-For header is trusted (IPs or CIDR ranges). Loopback only by
+            # default: any other peer could set its own rate-limit key; deployments name their proxy
+            self._trusted_proxies = os.getenv('TRUSTED_PROXIES', '127.0.0.1,::1')
+
+            # /ask/batch: max queries per request and concurrent agent runs per batch
+            self._batch_max_items = int(os.getenv('BATCH_MAX_ITEMS', '50'))
+            self._batch_max_parallelism = int(os.getenv('BATCH_MAX_PARALLELISM', '4'))
+
+            # Production server (python main.py): worker processes (0 = available CPUs),
+            # seconds to let in-flight requests finish on shutdown, dev auto-reload
+            self._server_host = os.getenv('SERVER_HOST', '0.0.0.0')
+            self._server_port = int(os.getenv('SERVER_PORT', '8000'))
+            self._server_workers = int(os.getenv('SERVER_WORKERS', '0'))
+            self._server_graceful_shutdown_seconds = float(os.getenv('SERVER_GRACEFUL_SHUTDOWN_SECONDS', '30'))
+            self._server_reload = os.getenv('SERVER_RELOAD', 'false').lower() == 'true'
+            # Directory where the workers share /metrics snapshots; python main.py creates one
+            # when it starts several workers, empty = this process's metrics only
+            self._metrics_multiprocess_dir = os.getenv('METRICS_MULTIPROCESS_DIR', '')
+
+            # State shared by workers (rate limits, answer and tool caches, conversations): "memory" (per process),
+            # "shm" (SQLite on tmpfs, one host) or "redis" (any host). Unset, python main.py
+            # picks shm when it starts several workers
+            self._state_backend = os.getenv('STATE_BACKEND', 'memory').lower()
+            shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            self._state_shm_path = os.getenv('STATE_SHM_PATH', os.path.join(shm_dir, 'rag-state.sqlite3'))
+            self._redis_url = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
+            # Key prefix, so deployments can share one Redis
+            self._state_namespace = os.getenv('STATE_NAMESPACE', 'rag')
+
+            # Answer greetings and prompt-injection attempts without calling the LLM
+            self._fast_path_enabled = os.getenv('FAST_PATH_ENABLED', 'true').lower() == 'true'
+
+            # Token for admin-only endpoints; admin endpoints are disabled when unset
+            self._admin_token = os.getenv('ADMIN_TOKEN')
 
             Config._initialized = True
 
@@ -39,6 +166,298 @@ class Config:
     def gemini_api_key(self) -> str:
         return self._gemini_api_key
 
+    @property
+    def gemini_api_base(self) -> str:
+        return self._gemini_api_base
+
+    @property
+    def gemini_transport(self) -> str:
+        return self._gemini_transport
+
+    @property
+    def gemini_fallback_model(self) -> str:
+        return self._gemini_fallback_model
+
+    @property
+    def agent_output_mode(self) -> str:
+        return self._agent_output_mode
+
+    @property
+    def agent_deadline_seconds(self) -> float:
+        return self._agent_deadline_seconds
+
+    @property
+    def agent_attempt_timeout_seconds(self) -> float:
+        return self._agent_attempt_timeout_seconds
+
+    @property
+    def agent_max_attempts(self) -> int:
+        return self._agent_max_attempts
+
+    @property
+    def llm_call_timeout_seconds(self) -> float:
+        return self._llm_call_timeout_seconds
+
+    @property
+    def llm_max_attempts(self) -> int:
+        return self._llm_max_attempts
+
+    @property
+    def llm_hedge_delay_seconds(self) -> float:
+        return self._llm_hedge_delay_seconds
+
+    @property
+    def breaker_failure_threshold(self) -> int:
+        return self._breaker_failure_threshold
+
+    @property
+    def breaker_reset_seconds(self) -> float:
+        return self._breaker_reset_seconds
+
+    @property
+    def answer_cache_max_entries(self) -> int:
+        return self._answer_cache_max_entries
+
+    @property
+    def answer_cache_ttl_seconds(self) -> float:
+        return self._answer_cache_ttl_seconds
+
+    @property
+    def answer_cache_stale_seconds(self) -> float:
+        return self._answer_cache_stale_seconds
+
+    @property
+    def rextro_api_base_url(self) -> str:
+        return self._rextro_api_base_url
+
+    @property
+    def rextro_api_max_connections(self) -> int:
+        return self._rextro_api_max_connections
+
+    @property
+    def rextro_api_max_keepalive_connections(self) -> int:
+        return self._rextro_api_max_keepalive_connections
+
+    @property
+    def rextro_api_timeout_seconds(self) -> float:
+        return self._rextro_api_timeout_seconds
+
+    @property
+    def rextro_api_connect_timeout_seconds(self) -> float:
+        return self._rextro_api_connect_timeout_seconds
+
+    @property
+    def rextro_api_verify_ssl(self) -> bool:
+        return self._rextro_api_verify_ssl
+
+    @property
+    def tool_cache_zones_ttl_seconds(self) -> float:
+        return self._tool_cache_zones_ttl_seconds
+
+    @property
+    def tool_cache_sessions_ttl_seconds(self) -> float:
+        return self._tool_cache_sessions_ttl_seconds
+
+    @property
+    def tool_cache_stale_seconds(self) -> float:
+        return self._tool_cache_stale_seconds
+
+    @property
+    def tool_cache_max_entries(self) -> int:
+        return self._tool_cache_max_entries
+
+    @property
+    def tool_prefetch_enabled(self) -> bool:
+        return self._tool_prefetch_enabled
+
+    @property
+    def rextro_mirror_enabled(self) -> bool:
+        return self._rextro_mirror_enabled
+
+    @property
+    def rextro_mirror_sync_seconds(self) -> float:
+        return self._rextro_mirror_sync_seconds
+
+    @property
+    def rextro_mirror_full_sync_seconds(self) -> float:
+        return self._rextro_mirror_full_sync_seconds
+
+    @property
+    def rextro_mirror_page_size(self) -> int:
+        return self._rextro_mirror_page_size
+
+    @property
+    def faq_store_enabled(self) -> bool:
+        return self._faq_store_enabled
+
+    @property
+    def faq_store_path(self) -> str:
+        return self._faq_store_path
+
+    @property
+    def faq_match_threshold(self) -> float:
+        return self._faq_match_threshold
+
+    @property
+    def cassette_mode(self) -> str:
+        return self._cassette_mode
+
+    @property
+    def cassette_path(self) -> str:
+        return self._cassette_path
+
+    @property
+    def cassette_latency(self) -> str:
+        return self._cassette_latency
+
+    @property
+    def tool_output_max_tokens(self) -> int:
+        return self._tool_output_max_tokens
+
+    @property
+    def request_tool_token_budget(self) -> int:
+        return self._request_tool_token_budget
+
+    @property
+    def readiness_require_upstream(self) -> bool:
+        return self._readiness_require_upstream
+
+    @property
+    def readiness_upstream_interval_seconds(self) -> float:
+        return self._readiness_upstream_interval_seconds
+
+    @property
+    def readiness_upstream_timeout_seconds(self) -> float:
+        return self._readiness_upstream_timeout_seconds
+
+    @property
+    def synthetic_load_enabled(self) -> bool:
+        return self._synthetic_load_enabled
+
+    @property
+    def profiling_enabled(self) -> bool:
+        return self._profiling_enabled
+
+    @property
+    def profiling_max_seconds(self) -> float:
+        return self._profiling_max_seconds
+
+    @property
+    def loop_watchdog_enabled(self) -> bool:
+        return self._loop_watchdog_enabled
+
+    @property
+    def loop_watchdog_interval_seconds(self) -> float:
+        return self._loop_watchdog_interval_seconds
+
+    @property
+    def loop_watchdog_threshold_seconds(self) -> float:
+        return self._loop_watchdog_threshold_seconds
+
+    @property
+    def synthetic_load_max_cpu_ms(self) -> int:
+        return self._synthetic_load_max_cpu_ms
+
+    @property
+    def synthetic_load_max_memory_mb(self) -> int:
+        return self._synthetic_load_max_memory_mb
+
+    @property
+    def synthetic_load_max_io_ms(self) -> int:
+        return self._synthetic_load_max_io_ms
+
+    @property
+    def session_max_sessions(self) -> int:
+        return self._session_max_sessions
+
+    @property
+    def session_max_total_tokens(self) -> int:
+        return self._session_max_total_tokens
+
+    @property
+    def session_token_budget(self) -> int:
+        return self._session_token_budget
+
+    @property
+    def session_idle_timeout_seconds(self) -> float:
+        return self._session_idle_timeout_seconds
+
+    @property
+    def admission_max_inflight(self) -> int:
+        return self._admission_max_inflight
+
+    @property
+    def admission_max_queue(self) -> int:
+        return self._admission_max_queue
+
+    @property
+    def admission_max_queued_per_client(self) -> int:
+        return self._admission_max_queued_per_client
+
+    @property
+    def admission_queue_timeout_seconds(self) -> float:
+        return self._admission_queue_timeout_seconds
+
+    @property
+    def trusted_proxies(self) -> str:
+        return self._trusted_proxies
+
+    @property
+    def batch_max_items(self) -> int:
+        return self._batch_max_items
+
+    @property
+    def batch_max_parallelism(self) -> int:
+        return self._batch_max_parallelism
+
+    @property
+    def server_host(self) -> str:
+        return self._server_host
+
+    @property
+    def server_port(self) -> int:
+        return self._server_port
+
+    @property
+    def server_workers(self) -> int:
+        return self._server_workers
+
+    @property
+    def server_graceful_shutdown_seconds(self) -> float:
+        return self._server_graceful_shutdown_seconds
+
+    @property
+    def server_reload(self) -> bool:
+        return self._server_reload
+
+    @property
+    def metrics_multiprocess_dir(self) -> str:
+        return self._metrics_multiprocess_dir
+
+    @property
+    def state_backend(self) -> str:
+        return self._state_backend
+
+    @property
+    def state_shm_path(self) -> str:
+        return self._state_shm_path
+
+    @property
+    def redis_url(self) -> str:
+        return self._redis_url
+
+    @property
+    def state_namespace(self) -> str:
+        return self._state_namespace
+
+    @property
+    def fast_path_enabled(self) -> bool:
+        return self._fast_path_enabled
+
+    @property
+    def admin_token(self) -> Optional[str]:
+        return self._admin_token
+
    
 
     
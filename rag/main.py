@@ -1,13 +1,46 @@
 import asyncio
-from fastapi import FastAPI, Request
-from pydantic import BaseModel
+import glob
+import json
+import secrets
+import tempfile
+import time
+from typing import List, Optional
+from fastapi import FastAPI, Request, Header, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
 from config.config import get_config
-from src.agent.agent import run_agent_async
+from src.agent.agent import run_agent_async, init_agent_runtime, get_agent_runtime, agent_runtime_ready, FALLBACK_ANSWERS, DEGRADABLE_ANSWERS, BUSY_ANSWER, MEMORY_TOKEN_LIMIT
+from src.agent.router import FastPathRouter
+from src.agent.sessions import SessionStore, ConversationSession
+from src.agent.tools.get_data_from_md import markdown_index
+from src.agent.tools.search_knowledge_base import vector_index
+from src.retrieval.vector_index import build_index
+from src.agent.tools.rextro_api_client import init_rextro_client, get_rextro_client, close_rextro_client, rextro_client_open
+from src.cache.answer_cache import AnswerCache, AnswerCacheUnavailable
+from src.cache.faq_store import FaqStore
+from src.cache.batch_memo import batch_scope
+from src.health.readiness import ReadinessProbe, UpstreamProbe
+from src.admission.client_key import ClientKeyResolver, parse_networks
+from src.admission.controller import AdmissionController, AdmissionRejected, admission_rejected_handler
+from src.observability.metrics import (
+    registry, render_multiprocess, write_snapshot, DEGRADED_ANSWERS, SNAPSHOT_INTERVAL_SECONDS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+)
+from src.observability.middleware import RequestMetricsMiddleware
+from src.observability.tracing import install_llm_instrumentation
+from src.health.synthetic_load import run_synthetic_load
+from src.state.store import get_state_store, shared_state_store, close_state_store
+from src.state.limits_storage import STORAGE_URI as STATE_LIMITS_STORAGE_URI
+from src.resilience.circuit_breaker import breaker_stats
+from src.retrieval.rextro_mirror import rextro_mirror
+from src.replay.cassette import get_cassette
+from src.observability.profiling import (
+    sampling_profiler, allocation_tracker, loop_watchdog, collapsed, top_frames, ProfilerBusy, AllocationTrackingOff,
+)
 import os
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 # --- Configuration ---
@@ -15,8 +48,119 @@ config = get_config()
 os.environ["OPENAI_API_KEY"] = config.openai_api_key
 os.environ["GEMINI_API_KEY"] = config.gemini_api_key
 
+# --- Shared State Setup ---
+# Rate limits and caches; shared by all workers unless STATE_BACKEND=memory
+state_store = get_state_store()
+
+# --- Answer Cache Setup ---
+answer_cache = AnswerCache(
+    max_entries=config.answer_cache_max_entries,
+    ttl_seconds=config.answer_cache_ttl_seconds,
+    stale_seconds=config.answer_cache_stale_seconds,
+    store=shared_state_store(),
+)
+
+# --- FAQ Store Setup ---
+# Precomputed answers for the common questions, built with `python -m src.cache.faq_store`
+faq_store = FaqStore(config.faq_store_path, threshold=config.faq_match_threshold)
+
+def faq_answer(query: str) -> Optional[str]:
+    """The FAQ store's answer for `query`, if it has a current one."""
+    return faq_store.lookup(query) if config.faq_store_enabled else None
+
+# --- Conversation Session Store Setup ---
+sessions = SessionStore(
+    max_sessions=config.session_max_sessions,
+    max_total_tokens=config.session_max_total_tokens,
+    session_token_budget=config.session_token_budget,
+    idle_timeout_seconds=config.session_idle_timeout_seconds,
+    memory_token_limit=MEMORY_TOKEN_LIMIT,
+    store=shared_state_store(),
+)
+
+# --- Fast-Path Router Setup ---
+router = FastPathRouter()
+
+# --- Readiness Probe Setup ---
+def cache_details() -> dict:
+    tool_cache = get_rextro_client().cache if rextro_client_open() else None
+    return {"caches": {
+        "state_backend": state_store.backend,
+        "answer_cache_entries": answer_cache.stats()["entries"],
+        "tool_cache_entries": tool_cache.stats()["entries"] if tool_cache else None,
+    }}
+
+readiness = ReadinessProbe(
+    checks={
+        "agent_runtime": agent_runtime_ready,
+        "markdown_index": lambda: markdown_index.loaded,
+        "vector_index": lambda: vector_index.loaded,
+        "rextro_client": rextro_client_open,
+    },
+    # Uncached one-item page: cheap, and proves the API answers right now
+    upstream=UpstreamProbe(
+        lambda: get_rextro_client().fetch_json("/zones", params={"page": 1, "limit": 1}),
+        interval_seconds=config.readiness_upstream_interval_seconds,
+        timeout_seconds=config.readiness_upstream_timeout_seconds,
+    ),
+    require_upstream=config.readiness_require_upstream,
+    details=cache_details,
+)
+
+# --- Admission Control Setup ---
+# Proxy-aware client identity, shared by the rate limiter and the fair queue
+client_key = ClientKeyResolver(parse_networks(config.trusted_proxies))
+admission = AdmissionController(
+    max_inflight=config.admission_max_inflight,
+    max_queue=config.admission_max_queue,
+    max_queued_per_client=config.admission_max_queued_per_client,
+    queue_timeout_seconds=config.admission_queue_timeout_seconds,
+)
+
+# --- Metrics Setup ---
+# Scrape-time gauges over state the components already track
+registry.gauge("rag_agent_runs_in_flight", "Agent runs holding an admission slot",
+               function=lambda: admission.inflight)
+registry.gauge("rag_admission_queue_depth", "Requests waiting for an admission slot",
+               function=lambda: admission.stats()["queued"])
+registry.gauge("rag_conversation_sessions", "Conversation sessions held in memory",
+               function=lambda: sessions.stats()["sessions"])
+registry.gauge("rag_conversation_session_bytes", "Approximate bytes of conversation history held",
+               function=lambda: sessions.total_bytes)
+registry.gauge("rag_answer_cache_entries", "Entries in the answer cache",
+               function=lambda: answer_cache.stats()["entries"])
+
+async def write_metrics_snapshots():
+    """Shares this worker's metrics with the others (METRICS_MULTIPROCESS_DIR) until cancelled."""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            await answer_cache.count_entries()
+            await asyncio.to_thread(write_snapshot, config.metrics_multiprocess_dir, registry.snapshot())
+        except OSError as e:
+            print(f"Metrics snapshot not written: {e}")
+
+metrics_snapshot_task: Optional[asyncio.Task] = None
+
 # --- Rate Limiter Setup ---
-limiter = Limiter(key_func=get_remote_address)
+# Counters live in the state store; if a shared backend is unreachable, limits are
+# skipped (with a warning) until it recovers instead of failing requests
+limiter = Limiter(
+    key_func=client_key,
+    storage_uri=STATE_LIMITS_STORAGE_URI,
+    storage_options={"store": state_store},
+    in_memory_fallback_enabled=state_store.backend != "memory",
+)
+
+async def check_rate_limit(request: Request):
+    """
+    Runs the route's @limiter.limit check before the handler, on a worker
+    thread when the state store does I/O (shm, redis), so counter round
+    trips don't block the event loop; the decorator then skips its own check.
+    """
+    if limiter.enabled and state_store.blocking:
+        await asyncio.to_thread(limiter._check_request_limit, request, request.scope["endpoint"], False)
+        request.state._rate_limiting_complete = True
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
@@ -28,6 +172,7 @@ app = FastAPI(
 # --- Add Rate Limiter to App ---
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -38,31 +183,193 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Request Id + Latency Middleware (outermost, so it times everything) ---
+app.add_middleware(RequestMetricsMiddleware)
+
 # --- Pydantic Models ---
 class QueryRequest(BaseModel):
     query: str
+    # Starts a conversation; the response carries the id the server issued for it
+    new_conversation: bool = False
+    # A server-issued id; turns sharing it see the earlier turns of the conversation
+    conversation_id: Optional[str] = Field(default=None, min_length=1, max_length=128, pattern=r"^[A-Za-z0-9_-]+$")
 
 class QueryResponse(BaseModel):
     answer: str
+    conversation_id: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1)
+    # Concurrent agent runs for this batch; capped by BATCH_MAX_PARALLELISM
+    parallelism: Optional[int] = Field(default=None, ge=1)
+
+class BatchItemResult(BaseModel):
+    index: int
+    query: str
+    ok: bool
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    # "fast_path", "faq", "cache", "agent" or "stale_cache" (last known good answer while the agent is failing)
+    source: Optional[str] = None
+    elapsed_ms: float
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+    elapsed_ms: float
+    # Rextro API fetches made by the batch, and identical ones served from them
+    rextro_fetches: int
+    rextro_fetches_deduplicated: int
+
+class InvalidateRequest(BaseModel):
+    query: Optional[str] = None
+
+# --- Admin Access ---
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Allows admin endpoints only when ADMIN_TOKEN is configured and matches."""
+    if not config.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, config.admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+def require_synthetic_load():
+    """Hides the synthetic load endpoint unless it is explicitly enabled."""
+    if not config.synthetic_load_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+def require_profiling():
+    """Hides the profiling endpoints unless PROFILING_ENABLED is set."""
+    if not config.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
 
 # --- Event Handlers ---
 @app.on_event("startup")
 async def startup_event():
-    pass
+    # Time every LLM round-trip through llama_index instrumentation events
+    install_llm_instrumentation()
+    # Several workers: publish this worker's metrics for /metrics on any of them
+    global metrics_snapshot_task
+    if config.metrics_multiprocess_dir:
+        metrics_snapshot_task = asyncio.create_task(write_metrics_snapshots())
+    # Measure event-loop lag and catch coroutines that block the loop
+    if config.loop_watchdog_enabled:
+        loop_watchdog.start(config.loop_watchdog_interval_seconds, config.loop_watchdog_threshold_seconds)
+    # Build the LLM client, tool registry and agent once for all requests
+    init_agent_runtime()
+    # Open the pooled keep-alive client shared by the Rextro API tools
+    init_rextro_client()
+    # Mirror sessions and zones in memory; the tools use the API until the first sync lands
+    if config.rextro_mirror_enabled:
+        rextro_mirror.start(
+            get_rextro_client().fetch_json,
+            interval_seconds=config.rextro_mirror_sync_seconds,
+            full_sync_seconds=config.rextro_mirror_full_sync_seconds,
+        )
+    # Index the markdown knowledge base before the first query needs it
+    markdown_index.refresh()
+    faq_store.refresh()
+    # Re-embed only changed documents, then memory-map the vector index
+    build_stats = await asyncio.to_thread(build_index)
+    print(f"Vector index: {build_stats['embedded']} files embedded, {build_stats['reused']} reused")
+    vector_index.refresh()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Runs after in-flight requests drained (or SERVER_GRACEFUL_SHUTDOWN_SECONDS passed)
+    await rextro_mirror.stop()
+    await loop_watchdog.stop()
+    await close_rextro_client()
+    close_state_store()
+    if metrics_snapshot_task is not None:
+        metrics_snapshot_task.cancel()
+        # Final values, so this worker's counters still count after it exits
+        try:
+            write_snapshot(config.metrics_multiprocess_dir, registry.snapshot())
+        except OSError as e:
+            print(f"Metrics snapshot not written: {e}")
+
+# --- Degraded Mode ---
+async def last_good_answer(query: str, answer: str) -> Optional[str]:
+    """
+    When `answer` is a failure apology (Gemini or another upstream down),
+    returns the query's last known good answer from the answer cache, even
+    if expired. None when the answer is fine or nothing was ever cached.
+    """
+    if answer not in DEGRADABLE_ANSWERS:
+        return None
+    stale = await answer_cache.last_good(query)
+    DEGRADED_ANSWERS.inc(source="last_good" if stale is not None else "none")
+    return stale
+
+
+async def open_session(query_request: QueryRequest) -> Optional[ConversationSession]:
+    """
+    The request's conversation: the one its conversation_id names, or a new
+    one under a server-issued id. None for a standalone question. An id the
+    server did not issue, or that expired, is a 404.
+    """
+    if query_request.conversation_id:
+        session = await sessions.resume(query_request.conversation_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired conversation_id; start a new conversation")
+        return session
+    if query_request.new_conversation:
+        return sessions.start()
+    return None
+
 
 # --- Endpoints ---
-@app.post("/ask", response_model=QueryResponse)
+@app.post("/ask", response_model=QueryResponse, response_model_exclude_none=True, dependencies=[Depends(check_rate_limit)])
 @limiter.limit("100/5seconds")
 async def ask_agent(request: Request, query_request: QueryRequest):
     """Endpoint to interact with the RAG agent. Limited to 5 requests per 2 seconds."""
     
+    client = client_key(request)
+    session = await open_session(query_request)
+
+    async def compute_answer() -> str:
+        async with admission.slot(client):
+            response_data = await run_agent_async(query_request.query)
+        return response_data.answer if hasattr(response_data, 'answer') else str(response_data)
+
     try:
-        response_data = await run_agent_async(query_request.query)
-        
-        answer = response_data.answer if hasattr(response_data, 'answer') else str(response_data)
-        
+        if config.fast_path_enabled:
+            decision = router.classify(query_request.query)
+            if decision.short_circuit:
+                if session is None:
+                    return {"answer": decision.answer}
+                if not query_request.conversation_id:
+                    # Shares the new conversation, so its next turn can resume it on any worker
+                    async with session.lock:
+                        await sessions.commit(session)
+                return {"answer": decision.answer, "conversation_id": session.id}
+
+        if session is not None:
+            # Follow-ups depend on the conversation, so they bypass the shared answer cache
+            async with session.lock, admission.slot(client):
+                await sessions.load(session)
+                response_data = await get_agent_runtime().run(query_request.query, memory=session.memory)
+                await sessions.commit(session)
+            return {"answer": response_data.answer, "conversation_id": session.id}
+
+        faq = faq_answer(query_request.query)
+        if faq is not None:
+            return {"answer": faq}
+
+        answer = await answer_cache.get_or_compute(
+            query_request.query,
+            compute_answer,
+            cacheable=lambda answer: answer not in FALLBACK_ANSWERS,
+        )
+        answer = await last_good_answer(query_request.query, answer) or answer
+
         result = {"answer": answer}
         return result
+
+    except AdmissionRejected:
+        # Shed load: answered as 503 + Retry-After by the exception handler
+        raise
         
     except Exception as e:
         import traceback
@@ -73,37 +380,371 @@ async def ask_agent(request: Request, query_request: QueryRequest):
         return error_response
 
 
-def heavy_cpu_task():
-    """CPU-heavy computation (e.g., sum modulo)"""
-    result = 0
-    for i in range(10_000_000):
-        result += i % 7
-    return result
+def format_sse(event: str, data: dict) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-def heavy_memory_task():
-    """Memory-heavy task (allocate a large list)"""
-    big_list = [0] * 50_000_000  # ~400MB
-    return sum(big_list)
 
+@app.post("/ask/stream", dependencies=[Depends(check_rate_limit)])
+@limiter.limit("100/5seconds")
+async def ask_agent_stream(request: Request, query_request: QueryRequest):
+    """
+    Streaming variant of /ask using Server-Sent Events. Emits `token`,
+    `tool_call` and `tool_result` events while the agent runs and always
+    ends with an `answer` event carrying the same payload as /ask.
+    """
+    query = query_request.query
+    client = client_key(request)
+    session = await open_session(query_request)
 
+    decision = router.classify(query) if config.fast_path_enabled else None
+    short_circuit = decision is not None and decision.short_circuit
+    cached = None if short_circuit or session is not None else (faq_answer(query) or await answer_cache.lookup(query))
+    if not short_circuit and cached is None:
+        # Shed before the stream starts, so a full queue is a plain 503
+        admission.check(client)
 
-@app.get("/")
-async def health_check():
-    """Health check with combined CPU + memory + I/O stress"""
-    # Simulate network / I/O delay
-    await asyncio.sleep(5)
+    async def agent_events():
+        if session is not None:
+            async with session.lock, admission.slot(client):
+                await sessions.load(session)
+                async for event in get_agent_runtime().stream(query, memory=session.memory):
+                    if event["event"] == "answer":
+                        await sessions.commit(session)
+                        event["data"]["conversation_id"] = session.id
+                    yield event
+            return
+
+        async with admission.slot(client):
+            async for event in get_agent_runtime().stream(query):
+                if event["event"] == "answer":
+                    answer = event["data"]["answer"]
+                    if answer not in FALLBACK_ANSWERS:
+                        await answer_cache.set(query, answer)
+                    else:
+                        event["data"]["answer"] = await last_good_answer(query, answer) or answer
+                yield event
+
+    async def event_stream():
+        if short_circuit:
+            if session is None:
+                yield format_sse("answer", {"answer": decision.answer})
+                return
+            if not query_request.conversation_id:
+                # Shares the new conversation, so its next turn can resume it on any worker
+                async with session.lock:
+                    await sessions.commit(session)
+            yield format_sse("answer", {"answer": decision.answer, "conversation_id": session.id})
+            return
+
+        if cached is not None:
+            yield format_sse("answer", {"answer": cached})
+            return
 
-    # Run CPU-heavy task in thread pool
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, heavy_cpu_task)
+        try:
+            async for event in agent_events():
+                yield format_sse(event["event"], event["data"])
+        except AdmissionRejected as e:
+            # Timed out in the queue after the stream had started
+            yield format_sse("error", {"message": "busy", "retry_after": e.retry_after})
+            yield format_sse("answer", {"answer": BUSY_ANSWER})
 
-    # Run memory-heavy task in thread pool
-    await loop.run_in_executor(None, heavy_memory_task)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Stop reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    response = {"status": "ok", "message": "API running with heavy combined task"}
-    return response
+
+async def answer_batch_item(query: str, client: str) -> tuple:
+    """Answers one batch query like /ask does; returns (answer, source)."""
+    if config.fast_path_enabled:
+        decision = router.classify(query)
+        if decision.short_circuit:
+            return decision.answer, "fast_path"
+
+    faq = faq_answer(query)
+    if faq is not None:
+        return faq, "faq"
+
+    cached = await answer_cache.lookup(query)
+    if cached is not None:
+        return cached, "cache"
+
+    async def compute_answer() -> str:
+        async with admission.slot(client):
+            response_data = await run_agent_async(query)
+        return response_data.answer
+
+    answer = await answer_cache.get_or_compute(
+        query,
+        compute_answer,
+        cacheable=lambda answer: answer not in FALLBACK_ANSWERS,
+    )
+    stale = await last_good_answer(query, answer)
+    if stale is not None:
+        return stale, "stale_cache"
+    return answer, "agent"
+
+
+@app.post("/ask/batch", response_model=BatchQueryResponse, response_model_exclude_none=True, dependencies=[Depends(check_rate_limit)])
+@limiter.limit("20/minute")
+async def ask_agent_batch(request: Request, batch_request: BatchQueryRequest):
+    """
+    Answers a list of queries concurrently (at most `parallelism` agent runs
+    at a time). Identical Rextro API calls made by different items share one
+    fetch. Items fail independently: each result has `ok` and either an
+    `answer` or an `error`.
+    """
+    queries = batch_request.queries
+    if len(queries) > config.batch_max_items:
+        raise HTTPException(status_code=422, detail=f"At most {config.batch_max_items} queries per batch")
+    parallelism = min(batch_request.parallelism or config.batch_max_parallelism, config.batch_max_parallelism)
+    semaphore = asyncio.Semaphore(parallelism)
+    client = client_key(request)
+    batch_start = time.perf_counter()
+
+    async def run_item(index: int, query: str) -> BatchItemResult:
+        start = time.perf_counter()
+        answer, source, error = None, None, None
+        try:
+            async with semaphore:
+                answer, source = await answer_batch_item(query, client)
+            if answer in FALLBACK_ANSWERS:
+                error = "busy" if answer == BUSY_ANSWER else "agent_error"
+        except AdmissionRejected:
+            error = "busy"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            error = str(e) or type(e).__name__
+        return BatchItemResult(
+            index=index,
+            query=query,
+            ok=error is None,
+            answer=answer if error is None else None,
+            error=error,
+            source=source,
+            elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+
+    # Item tasks inherit the memo through their context
+    with batch_scope() as memo:
+        results = await asyncio.gather(*(run_item(i, query) for i, query in enumerate(queries)))
+
+    succeeded = sum(1 for result in results if result.ok)
+    return BatchQueryResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        elapsed_ms=round((time.perf_counter() - batch_start) * 1000, 1),
+        rextro_fetches=memo.fetched,
+        rextro_fetches_deduplicated=memo.deduplicated,
+    )
+
+
+@app.get("/stats")
+async def get_stats():
+    """Fast-path routing counts, tool prefetch usage, admission control, session store usage, hit/miss counters for the FAQ store and the answer and Rextro API caches, Rextro mirror freshness, circuit breaker states, and cassette record/replay counts when CASSETTE_MODE is on."""
+    tool_cache = get_rextro_client().cache
+    await answer_cache.count_entries()
+    return {
+        "router": router.stats(),
+        "tool_prefetch": get_agent_runtime().prefetcher.stats() if agent_runtime_ready() else None,
+        "admission": admission.stats(),
+        "sessions": sessions.stats(),
+        "faq_store": faq_store.stats(),
+        "answer_cache": answer_cache.stats(),
+        "tool_cache": tool_cache.stats() if tool_cache else None,
+        "rextro_mirror": rextro_mirror.stats(),
+        "state": state_store.stats(),
+        "circuit_breakers": breaker_stats(),
+        "cassette": get_cassette().stats() if get_cassette() else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition of the latency histograms, counters and
+    gauges; merged over all workers when they share METRICS_MULTIPROCESS_DIR.
+    """
+    await answer_cache.count_entries()
+    if config.metrics_multiprocess_dir:
+        body = await asyncio.to_thread(render_multiprocess, config.metrics_multiprocess_dir, registry.snapshot())
+    else:
+        body = registry.render()
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
+
+
+@app.post("/admin/cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_answer_cache(invalidate_request: InvalidateRequest):
+    """Drops one cached answer, or the whole answer cache when no query is given."""
+    try:
+        removed = await answer_cache.invalidate(invalidate_request.query)
+    except AnswerCacheUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"invalidated": removed}
+
+
+@app.post("/admin/rextro-mirror/sync", dependencies=[Depends(require_admin)])
+async def sync_rextro_mirror():
+    """Runs the Rextro mirror's next sync now, e.g. from a webhook when sessions or zones change."""
+    rextro_mirror.wake()
+    return {"sync_requested": rextro_mirror.enabled}
+
+
+# --- Profiling (PROFILING_ENABLED and ADMIN_TOKEN) ---
+PROFILING = [Depends(require_profiling), Depends(require_admin)]
+
+
+@app.post("/admin/profile/cpu", dependencies=PROFILING)
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=config.profiling_max_seconds),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    include_idle: bool = False,
+    output: str = Query("collapsed", alias="format", pattern="^(collapsed|json)$"),
+):
+    """
+    Samples every thread's stack for `seconds` and returns collapsed stacks
+    (text for flamegraph.pl or speedscope), or with format=json the sample
+    counts and the top frames by self time. Threads that are only waiting
+    are left out unless include_idle is set.
+    """
+    try:
+        profile = await sampling_profiler.profile(seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if output == "collapsed":
+        return Response(collapsed(profile["stacks"]), media_type="text/plain; charset=utf-8",
+                        headers={"X-Profile-Samples": str(profile["samples"])})
+    return {"samples": profile["samples"], "seconds": profile["seconds"], "top": top_frames(profile["stacks"])}
+
+
+@app.post("/admin/profile/allocations/start", dependencies=PROFILING)
+async def start_allocation_tracking(frames: int = Query(1, ge=1, le=64)):
+    """Starts tracemalloc, keeping `frames` frames per allocation. Tracing slows every allocation down."""
+    return allocation_tracker.start(frames)
+
+
+@app.get("/admin/profile/allocations", dependencies=PROFILING)
+async def allocation_snapshot(
+    top: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+):
+    """Top allocation sites now, and the sites that grew most since the previous snapshot."""
+    try:
+        return await asyncio.to_thread(allocation_tracker.snapshot, top, group_by)
+    except AllocationTrackingOff as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/admin/profile/allocations/stop", dependencies=PROFILING)
+async def stop_allocation_tracking():
+    """Stops tracemalloc and frees what it traced."""
+    return allocation_tracker.stop()
+
+
+@app.get("/admin/profile/loop", dependencies=PROFILING)
+async def loop_report():
+    """Event-loop lag percentiles and the stacks of the latest loop blocks."""
+    return loop_watchdog.stats()
+
+
+@app.post("/admin/profile/loop/start", dependencies=PROFILING)
+async def start_loop_watchdog(
+    interval_seconds: float = Query(config.loop_watchdog_interval_seconds, gt=0, le=5),
+    threshold_seconds: float = Query(config.loop_watchdog_threshold_seconds, gt=0, le=60),
+):
+    """Starts the event-loop watchdog without a restart (it runs from startup with LOOP_WATCHDOG_ENABLED)."""
+    loop_watchdog.start(interval_seconds, threshold_seconds)
+    return loop_watchdog.stats()
+
+
+@app.post("/admin/profile/loop/stop", dependencies=PROFILING)
+async def stop_loop_watchdog():
+    await loop_watchdog.stop()
+    return loop_watchdog.stats()
+
+
+@app.get("/healthz")
+async def liveness():
+    """Liveness probe: the process is up and its event loop is responsive."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Readiness probe: agent runtime built, knowledge-base indexes loaded,
+    Rextro API client open and the Rextro API reachable. Returns 503 when
+    the instance should not receive traffic.
+    """
+    ready, body = await readiness.report()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/synthetic-load", dependencies=[Depends(require_synthetic_load)])
+async def synthetic_load(
+    cpu_ms: int = Query(0, ge=0, le=config.synthetic_load_max_cpu_ms),
+    memory_mb: int = Query(0, ge=0, le=config.synthetic_load_max_memory_mb),
+    io_ms: int = Query(0, ge=0, le=config.synthetic_load_max_io_ms),
+):
+    """
+    Synthetic request cost for capacity calibration: waits `io_ms`, burns
+    `cpu_ms` of CPU and touches `memory_mb` MiB. Disabled unless
+    SYNTHETIC_LOAD_ENABLED is set.
+    """
+    return await run_synthetic_load(cpu_ms=cpu_ms, memory_mb=memory_mb, io_ms=io_ms)
+
+
+@app.get("/")
+async def health_check():
+    """Basic health check; see /healthz and /readyz for probes."""
+    return {"status": "ok", "message": "Agentic RAG API is running"}
+
+def available_cpus() -> int:
+    """CPUs this process may run on, capped by a cgroup v2 CPU quota when in a container."""
+    cpus = os.process_cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
 
 # --- Main Execution ---
 if __name__ == "__main__":
-  
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    if config.server_reload:
+        # Development: one process, restarted on code changes
+        uvicorn.run("main:app", host=config.server_host, port=config.server_port, reload=True)
+    else:
+        workers = config.server_workers or available_cpus()
+        state_backend = config.state_backend
+        if workers > 1 and state_backend == "memory":
+            if os.getenv("STATE_BACKEND"):
+                raise SystemExit(
+                    "STATE_BACKEND=memory keeps rate limits, caches and conversations per worker; "
+                    "use shm or redis with several workers, or set SERVER_WORKERS=1"
+                )
+            # Unset: the workers (which inherit the environment) share state on this host
+            os.environ["STATE_BACKEND"] = state_backend = "shm"
+        if workers > 1:
+            # /metrics on any worker merges the snapshots every worker writes here
+            metrics_dir = config.metrics_multiprocess_dir or tempfile.mkdtemp(prefix="rag-metrics-")
+            os.makedirs(metrics_dir, exist_ok=True)
+            for stale in glob.glob(os.path.join(metrics_dir, "*.json")):
+                os.remove(stale)
+            os.environ["METRICS_MULTIPROCESS_DIR"] = metrics_dir
+        print(f"Starting {workers} worker(s) on {config.server_host}:{config.server_port} (state backend: {state_backend})")
+        # SIGTERM / SIGINT: stop accepting connections, let in-flight requests finish, then exit
+        uvicorn.run(
+            "main:app",
+            host=config.server_host,
+            port=config.server_port,
+            workers=workers,
+            timeout_graceful_shutdown=config.server_graceful_shutdown_seconds,
+        )
\ No newline at end of file
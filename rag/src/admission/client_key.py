@@ -0,0 +1,44 @@
+import ipaddress
+from typing import List, Union
+
+from starlette.requests import Request
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(spec: str) -> List[IPNetwork]:
+    """Parses a comma-separated list of IPs / CIDR ranges, e.g. "127.0.0.1,10.0.0.0/8"."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+class ClientKeyResolver:
+    """
+    Proxy-aware client identity for rate limiting and fair queuing.
+
+    X-Forwarded-For is only believed when the direct peer is a trusted proxy;
+    the client is then the right-most address in the chain that is not a
+    trusted proxy itself, so a client cannot spoof its key by sending its
+    own X-Forwarded-For header.
+    """
+
+    def __init__(self, trusted_proxies: List[IPNetwork]):
+        self.trusted_proxies = trusted_proxies
+
+    def is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def __call__(self, request: Request) -> str:
+        peer = request.client.host if request.client else "unknown"
+        if not self.is_trusted(peer):
+            return peer
+
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        for address in reversed(forwarded):
+            if not self.is_trusted(address):
+                return address
+        # Every hop is a trusted proxy: the left-most one is the origin
+        return forwarded[0] if forwarded else peer
@@ -0,0 +1,180 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from src.observability.metrics import ADMISSION_SHED, ADMISSION_WAIT_SECONDS
+
+
+class AdmissionRejected(Exception):
+    """Raised when an agent run is shed instead of admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "The assistant is busy right now. Please try again shortly.", "reason": exc.reason},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+class AdmissionController:
+    """
+    Global concurrency limit for agent runs with a bounded, fair wait queue.
+
+    At most `max_inflight` runs execute at once. Further requests wait in
+    per-client FIFO queues that are served round-robin, so a client with
+    many queued requests gets one slot per round like everyone else. A
+    request is shed with AdmissionRejected (503 + Retry-After) when the
+    queue is full, when its client already has `max_queued_per_client`
+    waiting, or when it waited `queue_timeout_seconds` without a slot.
+
+    The limits are per process: with several workers each has its own
+    slots and queues, and the kernel spreads connections between them.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 16,
+        max_queue: int = 64,
+        max_queued_per_client: int = 8,
+        queue_timeout_seconds: float = 20.0,
+    ):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_queued_per_client = max_queued_per_client
+        self.queue_timeout_seconds = queue_timeout_seconds
+
+        self.inflight = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        # Moving average of run time, used for Retry-After
+        self._avg_run_seconds = 5.0
+
+        self.admitted = 0
+        self.admitted_after_wait = 0
+        self.shed: Dict[str, int] = {"queue_full": 0, "client_queue_full": 0, "queue_timeout": 0}
+        self.max_wait_seconds = 0.0
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new request."""
+        estimate = self._avg_run_seconds * (self._queued + 1) / self.max_inflight
+        return min(max(math.ceil(estimate), 1), 60)
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.shed[reason] += 1
+        ADMISSION_SHED.inc(reason=reason)
+        return AdmissionRejected(reason, self.retry_after())
+
+    def check(self, client: str) -> None:
+        """Raises AdmissionRejected if a request from `client` could not even be queued."""
+        if self.inflight < self.max_inflight and not self._queued:
+            return
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full")
+        if len(self._queues.get(client, ())) >= self.max_queued_per_client:
+            raise self._reject("client_queue_full")
+
+    async def acquire(self, client: str) -> None:
+        """Takes a run slot, waiting in `client`'s queue if none is free."""
+        if self.inflight < self.max_inflight and not self._queued:
+            self.inflight += 1
+            self.admitted += 1
+            ADMISSION_WAIT_SECONDS.observe(0.0, outcome="admitted")
+            return
+
+        try:
+            self.check(client)
+        except AdmissionRejected as e:
+            ADMISSION_WAIT_SECONDS.observe(0.0, outcome=e.reason)
+            raise
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(future)
+        self._queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout_seconds)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                self._remove_waiter(client, future)
+            outcome = "queue_timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled"
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start, outcome=outcome)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("queue_timeout") from None
+            raise
+
+        waited = time.monotonic() - start
+        ADMISSION_WAIT_SECONDS.observe(waited, outcome="admitted")
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.admitted += 1
+        self.admitted_after_wait += 1
+
+    def _remove_waiter(self, client: str, future: asyncio.Future) -> None:
+        queue = self._queues.get(client)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self._queued -= 1
+        if not queue:
+            del self._queues[client]
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        while self._queues:
+            client, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                # Round-robin: this client goes to the back of the line
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if not future.done():
+                return future
+        return None
+
+    def release(self, run_seconds: Optional[float] = None) -> None:
+        """Frees a slot, handing it straight to the next queued request if any."""
+        if run_seconds is not None:
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * run_seconds
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result(None)
+        else:
+            self.inflight -= 1
+
+    @asynccontextmanager
+    async def slot(self, client: str) -> AsyncIterator[None]:
+        await self.acquire(client)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "queued_clients": len(self._queues),
+            "admitted": self.admitted,
+            "admitted_after_wait": self.admitted_after_wait,
+            "shed": dict(self.shed),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "avg_run_seconds": round(self._avg_run_seconds, 3),
+            "retry_after_seconds": self.retry_after(),
+        }
@@ -1,14 +1,18 @@
 import os
 import asyncio
+import random
 import re
-from typing import List, Optional
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 from pydantic import BaseModel ,Field 
 
 
-from llama_index.core.agent.workflow import FunctionAgent  
-from llama_index.core.tools import FunctionTool
+from llama_index.core.agent.workflow import FunctionAgent, AgentStream, ToolCall, ToolCallResult
+from llama_index.core.llms import LLM, ChatMessage
+from llama_index.core.tools import BaseTool
 from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.workflow.errors import WorkflowRuntimeError
 from llama_index.llms.gemini import Gemini
 
 from config.config import get_config
@@ -16,26 +20,46 @@ from .tools.search_rextro_sessions import search_rextro_sessions_tool
 
 from .tools.get_data_from_md import get_data_from_md_tool
 from .tools.get_rextro_zones import get_zones_tool
+from .tools.search_knowledge_base import search_knowledge_base_tool
+from .gemini_rest import use_rest_async_client
+from .gemini_resilience import is_transient_error, use_resilient_client
+from .gemini_cassette import cassette_model_lookup, use_cassette_client
+from .prefetch import ToolPrefetcher
+from .tools.shaping import TokenBudget, count_tokens, request_budget
+from src.observability.metrics import AGENT_RETRIES, AGENT_RUN_SECONDS, PARSE_OUTPUT_SECONDS
+from src.observability.tracing import current_request_id
+from src.cache.prefetched_fetches import PrefetchedFetches
+from src.replay.cassette import get_cassette
+from src.resilience.circuit_breaker import CircuitOpenError
 
 load_dotenv()
 config = get_config()
 
+GEMINI_MODEL = "models/gemini-2.5-flash"
+MEMORY_TOKEN_LIMIT = 3900
+
+# How the final answer is produced: "structured" asks the LLM for a KnowledgeResponse in an
+# extra pass after the agent's last turn; "text" uses that last turn's markdown as the answer
+OUTPUT_MODE_STRUCTURED = "structured"
+OUTPUT_MODE_TEXT = "text"
+OUTPUT_MODES = (OUTPUT_MODE_STRUCTURED, OUTPUT_MODE_TEXT)
+
+RETRIES_EXHAUSTED_ANSWER = "I'm having trouble processing your request after multiple attempts. Please try again later."
+ERROR_ANSWER = "I encountered an error while processing your request. Please try again or contact support."
+BUSY_ANSWER = "I'm answering a lot of questions right now. Please try again in a few seconds."
+UNAVAILABLE_ANSWER = "I can't reach one of the services I rely on right now. Please try again in a minute."
+# Answers produced by failures rather than the agent; these must never be cached
+FALLBACK_ANSWERS = frozenset({RETRIES_EXHAUSTED_ANSWER, ERROR_ANSWER, BUSY_ANSWER, UNAVAILABLE_ANSWER})
+# Failures for which a last known good answer is better than no answer
+DEGRADABLE_ANSWERS = frozenset({RETRIES_EXHAUSTED_ANSWER, ERROR_ANSWER, UNAVAILABLE_ANSWER})
+
 
 class KnowledgeResponse(BaseModel):
     """The final structured response for the user."""
     answer: str = Field(..., description="this is the answer to the user query with markdown formatting")
 
 
-async def run_agent_async(query: str) -> KnowledgeResponse:
-    """Sets up and runs the agent asynchronously using FunctionAgent."""
-    
-    api_key = config.gemini_api_key
-    if not api_key:
-        raise ValueError("The GEMINI_API_KEY is not set in config.")
-
-    llm = Gemini(model="models/gemini-2.5-flash", api_key=api_key)
-
-    custom_system_prompt = """
+SYSTEM_PROMPT = """
 ---
 
 ## 🎯 Identity & Purpose
@@ -65,7 +89,7 @@ You act as the single trusted knowledge source for all event-related information
 ### 2. Mandatory Tool Usage
 For **every user query**:
 1. Use the most relevant internal tool first to retrieve information.  
-2. Combine results from multiple tools **only when necessary**.  
+2. Combine results from multiple tools **only when necessary**. When a query needs several tools whose inputs don't depend on each other's results, call them **together in the same turn** — they run in parallel.  
 3. Do **not** respond without retrieval — tool use is mandatory.
 
 ### 3. Data Processing
@@ -177,60 +201,315 @@ You operate **only within** the Rextro Exhibition information ecosystem.
 """
 
 
-    tools = [
-        get_data_from_md_tool ,
-        search_rextro_sessions_tool,
-        get_zones_tool
-    ]
-
-    memory = ChatMemoryBuffer.from_defaults(token_limit=3900)
-
-    agent = FunctionAgent(
-        tools=tools,
-        llm=llm,
-        memory= memory,
-        system_prompt=custom_system_prompt,
-        output_cls=KnowledgeResponse  
-    )
+def step_error(error: BaseException) -> BaseException:
+    """The exception a workflow step raised, unwrapped from the WorkflowRuntimeError around it."""
+    while isinstance(error, WorkflowRuntimeError) and error.__cause__ is not None:
+        error = error.__cause__
+    return error
+
+
+class AgentRuntime:
+    """
+    Long-lived agent runtime shared by every request.
+
+    The LLM client, the tool registry and the FunctionAgent (with its system
+    prompt) are built once. Each call to `run` gets its own memory buffer, and
+    the workflow creates a fresh Context per run, so requests stay isolated.
+    """
+
+    def __init__(
+        self,
+        llm: Optional[LLM] = None,
+        tools: Optional[List[BaseTool]] = None,
+        system_prompt: str = SYSTEM_PROMPT,
+        prefetch: Optional[bool] = None,
+        output_mode: Optional[str] = None,
+    ):
+        if llm is None:
+            api_key = config.gemini_api_key
+            if not api_key:
+                raise ValueError("The GEMINI_API_KEY is not set in config.")
+            cassette = get_cassette()
+            with cassette_model_lookup(cassette):
+                llm = Gemini(
+                    model=GEMINI_MODEL,
+                    api_key=api_key,
+                    api_base=config.gemini_api_base or None,
+                    transport=config.gemini_transport or None,
+                )
+            if config.gemini_transport == "rest":
+                use_rest_async_client(llm)
+            if cassette is not None:
+                use_cassette_client(llm, cassette)
+            use_resilient_client(
+                llm,
+                call_timeout_seconds=config.llm_call_timeout_seconds,
+                max_attempts=config.llm_max_attempts,
+                hedge_delay_seconds=config.llm_hedge_delay_seconds,
+                fallback_model=config.gemini_fallback_model or None,
+            )
 
-    max_retries = 3
-    
-    for attempt in range(max_retries):
-        try:
-            response = await asyncio.wait_for(
-                agent.run(user_msg=query), 
-                timeout=300
+        self.llm = llm
+        self.tools = tools if tools is not None else [
+            get_data_from_md_tool ,
+            search_knowledge_base_tool,
+            search_rextro_sessions_tool,
+            get_zones_tool
+        ]
+        self.system_prompt = system_prompt
+        self.system_prompt_tokens = count_tokens(system_prompt)
+
+        self.output_mode = output_mode or config.agent_output_mode
+        self._agents: Dict[str, FunctionAgent] = {}
+        self.agent = self.agent_for(self.output_mode)
+        self.prefetcher = ToolPrefetcher()
+        self.prefetch_enabled = config.tool_prefetch_enabled if prefetch is None else prefetch
+
+    def agent_for(self, output_mode: Optional[str] = None) -> FunctionAgent:
+        """The FunctionAgent for an output mode (default: the runtime's), built on first use."""
+        output_mode = output_mode or self.output_mode
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown agent output mode '{output_mode}', expected one of {OUTPUT_MODES}")
+        agent = self._agents.get(output_mode)
+        if agent is None:
+            agent = self._agents[output_mode] = FunctionAgent(
+                tools=self.tools,
+                llm=self.llm,
+                system_prompt=self.system_prompt,
+                output_cls=KnowledgeResponse if output_mode == OUTPUT_MODE_STRUCTURED else None,
+                # All tool calls of one LLM turn are dispatched at once and run concurrently
+                allow_parallel_tool_calls=True,
             )
-            
-            break
-            
-        except (ConnectionError, TimeoutError) as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # Exponential backoff
-                await asyncio.sleep(wait_time)
-                continue
-            else:
-                error_response = KnowledgeResponse(
-                    answer="I'm having trouble processing your request after multiple attempts. Please try again later."
+        return agent
+
+    def new_memory(self) -> ChatMemoryBuffer:
+        """Creates the per-request memory buffer."""
+        return ChatMemoryBuffer.from_defaults(token_limit=MEMORY_TOKEN_LIMIT)
+
+    def new_budget(self) -> TokenBudget:
+        """
+        Starts the tool-output token budget for one agent run. Tools read it
+        from the `request_budget` context variable, which the workflow's tasks
+        inherit from the caller.
+        """
+        budget = TokenBudget(config.request_tool_token_budget)
+        request_budget.set(budget)
+        return budget
+
+    def log_token_usage(self, query: str, budget: TokenBudget) -> None:
+        usage = budget.summary()
+        print(
+            f"[{current_request_id()}] Token usage: system_prompt={self.system_prompt_tokens} query={count_tokens(query)} "
+            f"tool_outputs={usage['tool_tokens']}/{usage['limit']} calls={usage['calls']} "
+            f"truncated={usage['truncated']} per_tool={usage['per_tool']}"
+        )
+
+    def restore_memory(self, memory: ChatMemoryBuffer, snapshot: Optional[List[ChatMessage]]) -> ChatMemoryBuffer:
+        """
+        Undoes a failed or abandoned turn: a per-request memory is replaced by
+        a fresh one, a conversation's memory is reset to its pre-turn history.
+        """
+        if snapshot is None:
+            return self.new_memory()
+        memory.set(list(snapshot))
+        return memory
+
+    def start_prefetch(self, query: str) -> Optional[PrefetchedFetches]:
+        """Starts the speculative tool fetches for `query` when prefetch is enabled (TOOL_PREFETCH_ENABLED)."""
+        if not self.prefetch_enabled:
+            return None
+        return self.prefetcher.start(query)
+
+    async def run(
+        self,
+        query: str,
+        memory: Optional[ChatMemoryBuffer] = None,
+        output_mode: Optional[str] = None,
+    ) -> KnowledgeResponse:
+        """
+        Runs the shared agent for a single query. Without `memory` the run is
+        isolated; with a conversation's memory, earlier turns (and their tool
+        results) are visible and the new turn is appended on success.
+        `output_mode` overrides the runtime's (AGENT_OUTPUT_MODE) for this run.
+        """
+        prefetch = self.start_prefetch(query)
+        try:
+            return await self._run(query, memory, output_mode or self.output_mode)
+        finally:
+            if prefetch is not None:
+                self.prefetcher.finish(prefetch)
+
+    async def _run(self, query: str, memory: Optional[ChatMemoryBuffer], output_mode: str) -> KnowledgeResponse:
+        agent = self.agent_for(output_mode)
+        snapshot = memory.get_all() if memory is not None else None
+        memory = memory if memory is not None else self.new_memory()
+        start = time.perf_counter()
+        deadline = start + config.agent_deadline_seconds
+
+        for attempt in range(config.agent_max_attempts):
+            budget = self.new_budget()
+            remaining = deadline - time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    agent.run(user_msg=query, memory=memory),
+                    timeout=min(config.agent_attempt_timeout_seconds, remaining)
                 )
+
+                break
+
+            except Exception as raised:
+                e = step_error(raised)
+                if isinstance(e, CircuitOpenError):
+                    # An upstream is known to be down: answer now rather than wait on it
+                    print(f"[{current_request_id()}] {e}")
+                    self.restore_memory(memory, snapshot)
+                    AGENT_RUN_SECONDS.observe(time.perf_counter() - start, mode="run", outcome="circuit_open")
+                    return KnowledgeResponse(answer=UNAVAILABLE_ANSWER)
+                if not is_transient_error(e):
+                    # Don't retry for non-transient errors
+                    import traceback
+                    traceback.print_exc()
+                    self.restore_memory(memory, snapshot)
+                    AGENT_RUN_SECONDS.observe(time.perf_counter() - start, mode="run", outcome="error")
+                    error_response = KnowledgeResponse(answer=ERROR_ANSWER)
+                    return error_response
+
+                # Exponential backoff with jitter, only while the deadline leaves room for another attempt
+                wait_time = min(2 ** attempt, 8) * (0.5 + random.random() / 2)
+                if attempt < config.agent_max_attempts - 1 and deadline - time.perf_counter() > wait_time + 1:
+                    AGENT_RETRIES.inc(error=type(e).__name__)
+                    await asyncio.sleep(wait_time)
+                    # Start the retry from a clean memory, not a half-finished turn
+                    memory = self.restore_memory(memory, snapshot)
+                    continue
+                print(f"[{current_request_id()}] Giving up after {attempt + 1} attempt(s): {type(e).__name__}: {e}")
+                self.restore_memory(memory, snapshot)
+                AGENT_RUN_SECONDS.observe(time.perf_counter() - start, mode="run", outcome="retries_exhausted")
+                error_response = KnowledgeResponse(answer=RETRIES_EXHAUSTED_ANSWER)
                 return error_response
-        except Exception as e:
-            # Don't retry for non-transient errors
+
+        self.log_token_usage(query, budget)
+        result = self._parse_output(response, output_mode)
+        AGENT_RUN_SECONDS.observe(time.perf_counter() - start, mode="run", outcome="ok")
+        return result
+
+    def _parse_output(self, response: Any, output_mode: str) -> KnowledgeResponse:
+        """Extracts the KnowledgeResponse from the agent's final output."""
+        start = time.perf_counter()
+        structured = getattr(response, "structured_response", None)
+        if output_mode == OUTPUT_MODE_TEXT:
+            # The final message is the markdown answer (an empty one is a failure, not an answer)
+            result = KnowledgeResponse(answer=str(response).strip() or ERROR_ANSWER)
+        elif isinstance(structured, KnowledgeResponse):
+            result = structured
+        elif isinstance(structured, dict) and "answer" in structured:
+            result = KnowledgeResponse(**structured)
+        else:
+            try:
+                parsed = KnowledgeResponse.parse_raw(str(response))
+                result = parsed
+            except Exception as parse_error:
+                response_text = str(response)
+                result = KnowledgeResponse(answer=response_text)
+
+        PARSE_OUTPUT_SECONDS.observe(time.perf_counter() - start)
+        return result
+
+    async def stream(
+        self,
+        query: str,
+        memory: Optional[ChatMemoryBuffer] = None,
+        output_mode: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs the agent for a single query and yields progress events as they
+        happen: `token` deltas, `tool_call` and `tool_result` notifications,
+        and finally one `answer` event with the full answer. `memory` and
+        `output_mode` are handled as in `run`.
+        """
+        output_mode = output_mode or self.output_mode
+        agent = self.agent_for(output_mode)
+        snapshot = memory.get_all() if memory is not None else None
+        memory = memory if memory is not None else self.new_memory()
+        budget = self.new_budget()
+        start = time.perf_counter()
+        outcome = "cancelled"
+        prefetch = self.start_prefetch(query)
+        handler = agent.run(user_msg=query, memory=memory)
+
+        try:
+            async with asyncio.timeout(config.agent_deadline_seconds):
+                async for event in handler.stream_events():
+                    if isinstance(event, AgentStream):
+                        if event.delta:
+                            yield {"event": "token", "data": {"delta": event.delta}}
+                    elif isinstance(event, ToolCall):
+                        yield {
+                            "event": "tool_call",
+                            "data": {"tool": event.tool_name, "id": event.tool_id},
+                        }
+                    elif isinstance(event, ToolCallResult):
+                        # Raw tool output is for the agent only, never shown to users
+                        yield {
+                            "event": "tool_result",
+                            "data": {
+                                "tool": event.tool_name,
+                                "id": event.tool_id,
+                                "is_error": event.tool_output.is_error,
+                            },
+                        }
+                response = await handler
+            self.log_token_usage(query, budget)
+            result = self._parse_output(response, output_mode)
+            outcome = "ok"
+
+        except Exception as raised:
             import traceback
             traceback.print_exc()
-            error_response = KnowledgeResponse(
-                answer="I encountered an error while processing your request. Please try again or contact support."
-            )
-            return error_response
-    
-    if hasattr(response, "structured_response") and isinstance(response.structured_response, KnowledgeResponse):
-        result = response.structured_response
-    else:
-        try:
-            parsed = KnowledgeResponse.parse_raw(str(response))
-            result = parsed
-        except Exception as parse_error:
-            response_text = str(response)
-            result = KnowledgeResponse(answer=response_text)
+            e = step_error(raised)
+            if isinstance(e, CircuitOpenError):
+                answer, outcome = UNAVAILABLE_ANSWER, "circuit_open"
+            else:
+                answer = RETRIES_EXHAUSTED_ANSWER if is_transient_error(e) else ERROR_ANSWER
+                outcome = "timeout" if isinstance(e, TimeoutError) else "error"
+            yield {"event": "error", "data": {"message": str(e) or type(e).__name__}}
+            self.restore_memory(memory, snapshot)
+            result = KnowledgeResponse(answer=answer)
+
+        finally:
+            # Stop the workflow if the client went away mid-stream
+            if not handler.done():
+                await handler.cancel_run()
+                self.restore_memory(memory, snapshot)
+            if prefetch is not None:
+                self.prefetcher.finish(prefetch)
+            AGENT_RUN_SECONDS.observe(time.perf_counter() - start, mode="stream", outcome=outcome)
+
+        yield {"event": "answer", "data": {"answer": result.answer}}
+
+
+# Process-wide runtime, created by the app's startup event
+_runtime: Optional[AgentRuntime] = None
+
+
+def init_agent_runtime() -> AgentRuntime:
+    """Builds the shared agent runtime. Called once at application startup."""
+    global _runtime
+    if _runtime is None:
+        _runtime = AgentRuntime()
+    return _runtime
+
+
+def agent_runtime_ready() -> bool:
+    """True once the shared runtime has been built."""
+    return _runtime is not None
+
+
+def get_agent_runtime() -> AgentRuntime:
+    """Returns the shared agent runtime, building it lazily if startup did not."""
+    return _runtime or init_agent_runtime()
+
 
-    return result
+async def run_agent_async(query: str, output_mode: Optional[str] = None) -> KnowledgeResponse:
+    """Runs the shared agent runtime for a single query."""
+    return await get_agent_runtime().run(query, output_mode=output_mode)
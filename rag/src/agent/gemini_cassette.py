@@ -0,0 +1,133 @@
+"""
+Cassette recording and replay of Gemini calls (CASSETTE_MODE, see src/replay/cassette.py).
+
+`use_cassette_client` wraps the async client of a Gemini LLM's GenerativeModel,
+so chat turns, streamed turns and structured-output passes are recorded or
+replayed; apply it before use_resilient_client so deadlines, retries and
+circuit breaking sit above the cassette as they sit above the network.
+`cassette_model_lookup` covers the model metadata lookup Gemini() makes when
+it is constructed, so replay needs no network at all.
+"""
+import dataclasses
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.generativeai import client as genai_client
+from llama_index.llms.gemini import Gemini
+
+from src.replay.cassette import Cassette, Interaction, request_key
+
+
+def _to_dict(message: Any) -> dict:
+    return type(message).to_dict(message)
+
+
+def _summary(request: Any) -> str:
+    """The last turn of a request in a few words: its text, or the function responses it carries."""
+    if not request.contents:
+        return request.model
+    parts = request.contents[-1].parts
+    texts = [part.text for part in parts if part.text]
+    if texts:
+        return f"{request.model}: {texts[-1][-80:]}"
+    return f"{request.model}: " + ", ".join(f"{part.function_response.name}()" for part in parts
+                                            if part.function_response.name)
+
+
+class CassetteGenerativeClient:
+    """The GenerativeServiceAsyncClient subset GenerativeModel uses, recorded to or replayed from a cassette."""
+
+    def __init__(self, inner_factory: Callable[[], Any], cassette: Cassette):
+        self._inner_factory = inner_factory
+        self._inner = None
+        self.cassette = cassette
+
+    @property
+    def inner(self) -> Any:
+        # Created on first use, and never while replaying
+        if self._inner is None:
+            self._inner = self._inner_factory()
+        return self._inner
+
+    async def generate_content(self, request: Any, **kwargs: Any) -> Any:
+        key = request_key("gemini.generate", _to_dict(request))
+        start = time.perf_counter()
+        if self.cassette.replaying:
+            interaction = self.cassette.play("gemini.generate", key, _summary(request))
+            await self.cassette.wait_until(start, interaction.timings[0] if interaction.timings else 0.0)
+            return glm.GenerateContentResponse(interaction.response)
+
+        response = await self.inner.generate_content(request, **kwargs)
+        self.cassette.record(Interaction(
+            kind="gemini.generate",
+            key=key,
+            summary=_summary(request),
+            response=_to_dict(response),
+            timings=[round(time.perf_counter() - start, 6)],
+        ))
+        return response
+
+    async def stream_generate_content(self, request: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        key = request_key("gemini.stream", _to_dict(request))
+        start = time.perf_counter()
+        if self.cassette.replaying:
+            # Looked up before the first chunk is awaited, so a miss fails the call itself
+            interaction = self.cassette.play("gemini.stream", key, _summary(request))
+            return self._replay_stream(interaction, start)
+        stream = await self.inner.stream_generate_content(request, **kwargs)
+        return self._record_stream(stream, key, _summary(request), start)
+
+    async def _replay_stream(self, interaction: Interaction, start: float) -> AsyncIterator[Any]:
+        for offset, chunk in zip(interaction.timings, interaction.response):
+            await self.cassette.wait_until(start, offset)
+            yield glm.GenerateContentResponse(chunk)
+
+    async def _record_stream(self, stream: Any, key: str, summary: str, start: float) -> AsyncIterator[Any]:
+        chunks, timings = [], []
+        async for chunk in stream:
+            timings.append(round(time.perf_counter() - start, 6))
+            chunks.append(_to_dict(chunk))
+            yield chunk
+        # Only streams read to the end are recorded
+        self.cassette.record(Interaction(kind="gemini.stream", key=key, summary=summary,
+                                         response=chunks, timings=timings))
+
+
+@contextmanager
+def cassette_model_lookup(cassette: Optional[Cassette]) -> Iterator[None]:
+    """Records or replays the genai.get_model call of Gemini() constructed inside the block."""
+    if cassette is None:
+        yield
+        return
+
+    original = genai.get_model
+
+    def get_model(name: str, **kwargs: Any) -> Any:
+        key = request_key("gemini.get_model", name)
+        if cassette.replaying:
+            return genai.types.Model(**cassette.play("gemini.get_model", key, name).response)
+        model = original(name, **kwargs)
+        cassette.record(Interaction(kind="gemini.get_model", key=key, summary=name,
+                                    response=dataclasses.asdict(model), timings=[0.0]))
+        return model
+
+    genai.get_model = get_model
+    try:
+        yield
+    finally:
+        genai.get_model = original
+
+
+def use_cassette_client(llm: Gemini, cassette: Cassette) -> CassetteGenerativeClient:
+    """Wraps the async client of `llm`'s GenerativeModel (after use_rest_async_client, before use_resilient_client)."""
+    model = llm._model
+    inner = model._async_client
+    wrapper = CassetteGenerativeClient(
+        inner_factory=(lambda: inner) if inner is not None else genai_client.get_default_generative_async_client,
+        cassette=cassette,
+    )
+    model._async_client = wrapper
+    return wrapper
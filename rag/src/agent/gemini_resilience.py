@@ -0,0 +1,258 @@
+"""
+Deadlines, retries, hedging, circuit breaking and model fallback for Gemini calls.
+
+`use_resilient_client` wraps the async client a Gemini LLM's GenerativeModel
+calls. Every chat turn and structured-output pass the agent makes goes
+through the wrapper, for both the gRPC and the REST transport:
+
+- Each attempt has a deadline (LLM_CALL_TIMEOUT_SECONDS). For streamed turns
+  it bounds the wait for the first chunk and every gap between chunks.
+- Transient failures (timeouts, connection errors, 5xx, 429) are retried up
+  to LLM_MAX_ATTEMPTS times with short backoff, but only until a stream has
+  produced its first chunk.
+- With LLM_HEDGE_DELAY_SECONDS set, an attempt that has not answered (or
+  started streaming) by then gets a second, parallel attempt. The first one
+  to succeed wins and the other is cancelled.
+- Each model has a circuit breaker. While the primary model's breaker is
+  open, or once its attempts are exhausted, the call goes to
+  GEMINI_FALLBACK_MODEL (when set) under its own breaker. If no model can be
+  called, CircuitOpenError (or the last error) is raised straight away.
+"""
+import asyncio
+import copy
+import random
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import google.api_core.exceptions as google_exceptions
+import httpx
+import requests
+from google.generativeai import client as genai_client
+from llama_index.llms.gemini import Gemini
+
+from src.observability.metrics import LLM_ATTEMPTS, LLM_HEDGES
+from src.resilience.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError, get_breaker
+
+# Upstream trouble worth a retry (and counted by the circuit breaker); anything else, such
+# as InvalidArgument, is a problem with the request and is raised as is
+TRANSIENT_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    # The REST transport's sync client (requests' errors derive from OSError, not ConnectionError)
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.RetryError,
+)
+
+_DONE = object()
+
+
+def is_transient_error(error: BaseException) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class _TimedStream:
+    """A started response stream: yields the first chunk, then the rest with an idle deadline."""
+
+    def __init__(self, first: Any, iterator: AsyncIterator[Any], idle_timeout: float, breaker: CircuitBreaker):
+        self.first = first
+        self.iterator = iterator
+        self.idle_timeout = idle_timeout
+        self.breaker = breaker
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        yield self.first
+        while True:
+            try:
+                chunk = await asyncio.wait_for(anext(self.iterator, _DONE), self.idle_timeout)
+            except Exception as e:
+                if is_transient_error(e):
+                    self.breaker.record_failure()
+                raise
+            if chunk is _DONE:
+                return
+            yield chunk
+
+    async def aclose(self) -> None:
+        aclose = getattr(self.iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class ResilientGenerativeClient:
+    """The GenerativeServiceAsyncClient subset GenerativeModel uses, with the policies above."""
+
+    def __init__(
+        self,
+        inner_factory: Callable[[], Any],
+        model: str,
+        call_timeout_seconds: float = 20.0,
+        max_attempts: int = 2,
+        hedge_delay_seconds: float = 0.0,
+        fallback_model: Optional[str] = None,
+    ):
+        self._inner_factory = inner_factory
+        self._inner = None
+        self.model = model
+        self.call_timeout_seconds = call_timeout_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.fallback_model = fallback_model or None
+
+    @property
+    def inner(self) -> Any:
+        # Created on first use: the gRPC async client binds to the running event loop
+        if self._inner is None:
+            self._inner = self._inner_factory()
+        return self._inner
+
+    def _targets(self, request: Any) -> List[Tuple[str, Any]]:
+        targets = [(self.model, request)]
+        if self.fallback_model and self.fallback_model != self.model:
+            fallback_request = copy.deepcopy(request)
+            fallback_request.model = self.fallback_model
+            targets.append((self.fallback_model, fallback_request))
+        return targets
+
+    async def generate_content(self, request: Any, **kwargs: Any) -> Any:
+        # Retries are ours: the client's own retry loop would outlive our deadline (on a
+        # worker thread, with the REST transport). A unary call can carry the deadline too.
+        kwargs.setdefault("retry", None)
+        kwargs.setdefault("timeout", self.call_timeout_seconds)
+        return await self._call(request, lambda req: self._unary_attempt(req, kwargs))
+
+    async def stream_generate_content(self, request: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        kwargs.setdefault("retry", None)
+        stream = await self._call(request, lambda req: self._stream_attempt(req, kwargs))
+        return aiter(stream)
+
+    async def _unary_attempt(self, request: Any, kwargs: dict) -> Any:
+        return await asyncio.wait_for(self.inner.generate_content(request, **kwargs), self.call_timeout_seconds)
+
+    async def _stream_attempt(self, request: Any, kwargs: dict) -> _TimedStream:
+        async with asyncio.timeout(self.call_timeout_seconds):
+            iterator = aiter(await self.inner.stream_generate_content(request, **kwargs))
+            first = await anext(iterator)
+        return _TimedStream(first, iterator, self.call_timeout_seconds, get_breaker(f"gemini:{request.model}"))
+
+    async def _call(self, request: Any, attempt: Callable[[Any], Awaitable[Any]]) -> Any:
+        last_error: Optional[BaseException] = None
+        breaker = None
+        for model, model_request in self._targets(request):
+            breaker = get_breaker(f"gemini:{model}")
+            if not breaker.allow():
+                LLM_ATTEMPTS.inc(model=model, outcome="rejected")
+                continue
+            if model != self.model:
+                print(f"Falling back to {model}: {last_error or 'primary circuit open'}")
+            try:
+                return await self._with_retries(model, model_request, breaker, attempt)
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                last_error = e
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(breaker.name, breaker.retry_after())
+
+    async def _with_retries(
+        self,
+        model: str,
+        request: Any,
+        breaker: CircuitBreaker,
+        attempt: Callable[[Any], Awaitable[Any]],
+    ) -> Any:
+        for number in range(self.max_attempts):
+            try:
+                result = await self._hedged(lambda: attempt(request))
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    # The model answered, even if with an error
+                    breaker.record_success()
+                    LLM_ATTEMPTS.inc(model=model, outcome="error")
+                    raise
+                breaker.record_failure()
+                LLM_ATTEMPTS.inc(model=model, outcome="timeout" if isinstance(e, TimeoutError) else "error")
+                if number == self.max_attempts - 1 or breaker.state == OPEN:
+                    raise
+                await asyncio.sleep(min(2.0, 0.25 * 2 ** number) * (0.5 + random.random()))
+                continue
+            breaker.record_success()
+            LLM_ATTEMPTS.inc(model=model, outcome="ok")
+            return result
+
+    async def _hedged(self, start: Callable[[], Awaitable[Any]]) -> Any:
+        if self.hedge_delay_seconds <= 0:
+            return await start()
+
+        primary = asyncio.ensure_future(start())
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay_seconds)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.ensure_future(start())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if not task.cancelled() and task.exception() is None]
+                if winners:
+                    winner = winners[0]
+                    LLM_HEDGES.inc(winner="primary" if winner is primary else "hedge")
+                    for task in winners[1:]:
+                        await _discard(task.result())
+                    return winner.result()
+                # Keep the last upstream error; a cancelled attempt has none to report
+                error = next((task.exception() for task in done if not task.cancelled()), error)
+            LLM_HEDGES.inc(winner="none")
+            raise error if error is not None else asyncio.CancelledError()
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_discard_in_background)
+
+
+async def _discard(result: Any) -> None:
+    """Closes a stream nobody will read (the losing side of a hedge)."""
+    if isinstance(result, _TimedStream):
+        await result.aclose()
+
+
+def _discard_in_background(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(_discard(task.result()))
+
+
+def use_resilient_client(
+    llm: Gemini,
+    call_timeout_seconds: float,
+    max_attempts: int,
+    hedge_delay_seconds: float = 0.0,
+    fallback_model: Optional[str] = None,
+) -> ResilientGenerativeClient:
+    """Wraps the async client of `llm`'s GenerativeModel (call after use_rest_async_client, if used)."""
+    model = llm._model
+    inner = model._async_client
+    if fallback_model and not fallback_model.startswith("models/"):
+        fallback_model = f"models/{fallback_model}"
+    wrapper = ResilientGenerativeClient(
+        inner_factory=(lambda: inner) if inner is not None else genai_client.get_default_generative_async_client,
+        model=model.model_name,
+        call_timeout_seconds=call_timeout_seconds,
+        max_attempts=max_attempts,
+        hedge_delay_seconds=hedge_delay_seconds,
+        fallback_model=fallback_model,
+    )
+    model._async_client = wrapper
+    return wrapper
@@ -0,0 +1,47 @@
+"""
+Async support for the Gemini client over the REST transport.
+
+google-generativeai only ships a synchronous REST client; with
+transport="rest" its async calls fail because the "async" client wraps the
+sync one. `use_rest_async_client` swaps in an adapter that runs the sync REST
+calls on worker threads, which lets the agent talk to any Gemini-compatible
+HTTP endpoint (for example the local stand-in used by the offline load test).
+"""
+import asyncio
+from typing import Any, AsyncIterator, Iterator
+
+from google.generativeai import client as genai_client
+from llama_index.llms.gemini import Gemini
+
+_DONE = object()
+
+
+def _next_or_done(iterator: Iterator[Any]) -> Any:
+    return next(iterator, _DONE)
+
+
+class RestAsyncGenerativeClient:
+    """The subset of GenerativeServiceAsyncClient used by GenerativeModel, on top of the sync REST client."""
+
+    def __init__(self, sync_client: Any):
+        self._client = sync_client
+
+    async def generate_content(self, request: Any, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(self._client.generate_content, request, **kwargs)
+
+    async def stream_generate_content(self, request: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        iterator = await asyncio.to_thread(self._client.stream_generate_content, request, **kwargs)
+
+        async def chunks() -> AsyncIterator[Any]:
+            while True:
+                chunk = await asyncio.to_thread(_next_or_done, iterator)
+                if chunk is _DONE:
+                    return
+                yield chunk
+
+        return chunks()
+
+
+def use_rest_async_client(llm: Gemini) -> None:
+    """Routes `llm`'s async calls through the sync REST client configured by Gemini(transport="rest")."""
+    llm._model._async_client = RestAsyncGenerativeClient(genai_client.get_default_generative_client())
@@ -0,0 +1,100 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.cache.answer_cache import normalize_query
+from src.cache.prefetched_fetches import PrefetchedFetches, prefetched_fetches
+from src.observability.metrics import TOOL_PREFETCHES
+from src.retrieval.rextro_mirror import rextro_mirror
+from .tools.get_rextro_zones import ZONES_PATH, zones_params
+from .tools.rextro_api_client import get_rextro_client
+from .tools.search_rextro_sessions import SESSIONS_SEARCH_PATH, session_search_params
+
+
+@dataclass
+class PrefetchRule:
+    """Prefetch `path` with `params` when a query matches `pattern`."""
+    tool: str
+    pattern: "re.Pattern"
+    path: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+# Only calls whose arguments are predictable from the query alone are worth
+# starting early: a prefetch is used only if the LLM asks for the same params.
+DEFAULT_RULES = [
+    # Location questions: the agent lists zones with the tool defaults
+    PrefetchRule(
+        "get_zones",
+        re.compile(r"\b(where|zones?|booths?|stalls?|halls?|map|located|location|directions?)\b"),
+        ZONES_PATH,
+        zones_params(),
+    ),
+    # Schedule overviews: the agent lists sessions without a search query
+    PrefetchRule(
+        "search_rextro_sessions",
+        re.compile(r"\b(schedule|agenda|timetable|programme|program|upcoming|whats on|what s on)\b"),
+        SESSIONS_SEARCH_PATH,
+        session_search_params(),
+    ),
+]
+
+
+class ToolPrefetcher:
+    """
+    Speculative tool prefetch (TOOL_PREFETCH_ENABLED).
+
+    Before an agent run starts, a keyword classifier over the query picks
+    the Rextro API calls the agent is likely to make and starts them, so
+    their latency overlaps with the first Gemini turn instead of following
+    it. The run's tool calls take over matching fetches (see
+    src/cache/prefetched_fetches.py); unclaimed ones are left to finish and
+    warm the tool response cache.
+    """
+
+    def __init__(self, rules: Optional[List[PrefetchRule]] = None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.started = 0
+        self.used = 0
+        self.unused = 0
+
+    def plan(self, query: str) -> List[PrefetchRule]:
+        """The rules whose pattern matches the normalized query."""
+        normalized = normalize_query(query)
+        return [rule for rule in self.rules if rule.pattern.search(normalized)]
+
+    def start(self, query: str) -> Optional[PrefetchedFetches]:
+        """
+        Starts the prefetches for `query` and makes them visible to tool
+        calls started afterwards in this context. Returns None when nothing
+        was worth prefetching.
+        """
+        # Calls the local mirror answers gain nothing from a head start
+        rules = [rule for rule in self.plan(query) if not rextro_mirror.serves_path(rule.path)]
+        if not rules:
+            return None
+        client = get_rextro_client()
+        fetches = PrefetchedFetches()
+        for rule in rules:
+            fetches.start(rule.path, rule.params, lambda rule=rule: client.get_json_with_status(rule.path, rule.params))
+        self.started += len(fetches.started)
+        prefetched_fetches.set(fetches)
+        return fetches
+
+    def finish(self, fetches: PrefetchedFetches) -> None:
+        """Records which prefetches of a finished run were used and stops offering the rest."""
+        prefetched_fetches.set(None)
+        unclaimed = fetches.unclaimed()
+        self.used += fetches.used
+        self.unused += len(unclaimed)
+        for key in fetches.started:
+            TOOL_PREFETCHES.inc(path=key[0], outcome="unused" if key in unclaimed else "used")
+
+    def stats(self) -> dict:
+        return {
+            "rules": [rule.tool for rule in self.rules],
+            "started": self.started,
+            "used": self.used,
+            "unused": self.unused,
+            "hit_ratio": round(self.used / self.started, 4) if self.started else 0.0,
+        }
@@ -0,0 +1,143 @@
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.cache.answer_cache import normalize_query
+
+# Fixed replies defined by the system prompt; these never need the LLM
+GREETING_ANSWER = (
+    "Hello! 👋 I'm **RextroBot**, the official assistant for the Rextro Exhibition at the "
+    "University of Ruhuna. Ask me about the schedule, venue, zones, sessions, speakers or "
+    "registration, and I'll find the details for you. 😊"
+)
+THANKS_ANSWER = (
+    "You're welcome! 😊 If you have any other questions about the Rextro Exhibition, just ask."
+)
+REFUSAL_ANSWER = (
+    "My purpose is to provide verified information about the Rextro Exhibition based on the "
+    "internal knowledge base. I cannot fulfill that request."
+)
+
+GREETING_WORDS = frozenset(
+    "hi hello hey heya hiya hii helo hallo howdy greetings yo ayubowan "
+    "good morning afternoon evening day".split()
+)
+THANKS_WORDS = frozenset("thanks thank you thx ty much so a lot great ok okay cheers".split())
+# Words that may accompany a greeting without turning it into a question
+FILLER_WORDS = frozenset("there all rextrobot rextro bot team everyone again".split())
+
+# Instruction-override signals: any one of these is refused
+INJECTION_PATTERNS = [
+    re.compile(pattern)
+    for pattern in (
+        r"\b(ignore|disregard|forget|override|bypass)\b.{0,40}\b(instructions?|prompts?)\b",
+        r"\b(ignore|disregard|forget|override|bypass)\b.{0,20}\b(all|any|previous|prior|above|earlier|your)\b"
+        r".{0,20}\b(rules|guidelines|restrictions)\b",
+        r"\b(reveal|show|print|repeat|tell|output|leak)\b.{0,30}\byour\s+(system\s+)?(prompt|instructions?)\b",
+        r"\b(reveal|show|print|repeat|output|leak)\b.{0,30}\b(system|initial|hidden|original)\s+(prompt|instructions?)\b",
+        r"\b(dan\s+mode|do\s+anything\s+now)\b",
+    )
+]
+
+# Persona and jailbreak phrasing that ordinary questions also use ("act as a
+# volunteer", "role play workshop", "you are now open"): each match only adds
+# WEAK_PATTERN_WEIGHT to the classifier score, so one alone goes to the agent
+WEAK_INJECTION_PATTERNS = [
+    re.compile(pattern)
+    for pattern in (
+        r"\byou\s+are\s+(now|no\s+longer)\b",
+        r"\b(pretend|roleplay|role\s+play)\b",
+        r"\bact\s+as\s+(a|an|my)\b",
+        r"\b(system|initial|hidden|original)\s+(prompt|instructions?|message)\b",
+        r"\bdeveloper\s+mode\b",
+    )
+]
+WEAK_PATTERN_WEIGHT = 2.6
+
+# Token weights of a small logistic classifier for injection attempts that
+# slip past the patterns (reworded or partial). Ordinary questions that
+# mention one of these words ("ticket system") stay well below threshold.
+INJECTION_WEIGHTS: Dict[str, float] = {
+    "ignore": 1.6, "disregard": 2.0, "override": 1.8, "bypass": 1.8, "forget": 1.2,
+    "instructions": 1.6, "instruction": 1.6, "prompt": 1.5, "rules": 1.0, "guidelines": 1.0,
+    "system": 0.8, "reveal": 1.4, "jailbreak": 3.0,
+    "unrestricted": 2.0, "uncensored": 2.0, "previous": 0.6, "above": 0.4, "persona": 1.5,
+    "restrictions": 1.2, "confidential": 0.8, "secret": 0.6,
+}
+INJECTION_BIAS = -3.2
+INJECTION_THRESHOLD = 0.8
+
+
+@dataclass
+class RouteDecision:
+    """Outcome of the pre-agent classification stage."""
+    route: str
+    answer: Optional[str] = None
+
+    @property
+    def short_circuit(self) -> bool:
+        return self.answer is not None
+
+
+class FastPathRouter:
+    """
+    Deterministic pre-agent stage for /ask. Greetings, thanks and
+    prompt-injection attempts get the fixed replies the system prompt
+    prescribes, answered in-process without an LLM call; everything else is
+    routed to the agent. Keeps per-route counts and classification latency.
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {"greeting": 0, "thanks": 0, "refusal": 0, "agent": 0}
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def classify(self, query: str) -> RouteDecision:
+        start = time.perf_counter_ns()
+        decision = self._classify(query)
+        elapsed = time.perf_counter_ns() - start
+
+        self.counts[decision.route] += 1
+        self.total_ns += elapsed
+        self.max_ns = max(self.max_ns, elapsed)
+        return decision
+
+    def _classify(self, query: str) -> RouteDecision:
+        normalized = normalize_query(query)
+        words = normalized.split()
+        if not words:
+            return RouteDecision("agent")
+
+        if self._is_injection(normalized, words):
+            return RouteDecision("refusal", REFUSAL_ANSWER)
+
+        content_words = [word for word in words if word not in FILLER_WORDS]
+        if len(words) <= 6 and content_words:
+            if all(word in GREETING_WORDS for word in content_words):
+                return RouteDecision("greeting", GREETING_ANSWER)
+            if all(word in THANKS_WORDS for word in content_words) and \
+                    any(word in ("thanks", "thank", "thx", "ty", "cheers") for word in content_words):
+                return RouteDecision("thanks", THANKS_ANSWER)
+
+        return RouteDecision("agent")
+
+    def _is_injection(self, normalized: str, words) -> bool:
+        if any(pattern.search(normalized) for pattern in INJECTION_PATTERNS):
+            return True
+        weak = sum(1 for pattern in WEAK_INJECTION_PATTERNS if pattern.search(normalized))
+        score = INJECTION_BIAS + WEAK_PATTERN_WEIGHT * weak + \
+            sum(INJECTION_WEIGHTS.get(word, 0.0) for word in set(words))
+        return 1 / (1 + math.exp(-score)) >= INJECTION_THRESHOLD
+
+    def stats(self) -> dict:
+        total = sum(self.counts.values())
+        short_circuited = total - self.counts["agent"]
+        return {
+            "routes": dict(self.counts),
+            "short_circuited": short_circuited,
+            "short_circuit_ratio": round(short_circuited / total, 4) if total else 0.0,
+            "mean_latency_us": round(self.total_ns / total / 1000, 2) if total else 0.0,
+            "max_latency_us": round(self.max_ns / 1000, 2),
+        }
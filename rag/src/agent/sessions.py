@@ -0,0 +1,338 @@
+import asyncio
+import json
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+import google.generativeai as genai
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
+
+from src.state.store import StateStore
+
+from .tools.shaping import count_tokens
+
+# Old turns are folded into a digest of at most this many question/answer lines
+DIGEST_MAX_TURNS = 8
+DIGEST_QUESTION_CHARS = 160
+DIGEST_ANSWER_CHARS = 240
+DIGEST_REQUEST = "Summarize our conversation so far."
+DIGEST_KEY = "session_digest"
+# Shared-store key of a conversation's history
+SESSION_KEY_PREFIX = "session:"
+# Random bytes in a server-issued conversation id
+SESSION_ID_BYTES = 18
+
+
+def message_tokens(message: ChatMessage) -> int:
+    """Tokens of a message's text plus any tool-call arguments it carries."""
+    text = str(message.content or "")
+    tool_calls = message.additional_kwargs.get("tool_calls")
+    if tool_calls:
+        text += str(tool_calls)
+    return count_tokens(text)
+
+
+def message_bytes(message: ChatMessage) -> int:
+    """Approximate heap footprint of a message's payload."""
+    return len(str(message.content or "").encode("utf-8")) + len(str(message.additional_kwargs))
+
+
+def encode_message(message: ChatMessage) -> dict:
+    """A JSON-ready form of a history message; Gemini tool calls are protos and go as dicts."""
+    kwargs = dict(message.additional_kwargs)
+    if kwargs.get("tool_calls"):
+        kwargs["tool_calls"] = [type(call).to_dict(call) for call in kwargs["tool_calls"]]
+    return {"role": message.role.value, "content": message.content, "additional_kwargs": kwargs}
+
+
+def decode_message(data: dict) -> ChatMessage:
+    kwargs = data["additional_kwargs"]
+    if kwargs.get("tool_calls"):
+        kwargs["tool_calls"] = [genai.protos.FunctionCall(call) for call in kwargs["tool_calls"]]
+    return ChatMessage(role=MessageRole(data["role"]), content=data["content"], additional_kwargs=kwargs)
+
+
+def split_turns(messages: List[ChatMessage]) -> List[List[ChatMessage]]:
+    """
+    Groups messages into turns, each starting at a user message and holding
+    the assistant tool calls, tool results and answer that followed it.
+    Dropping whole turns keeps every tool result next to its tool call.
+    """
+    turns: List[List[ChatMessage]] = []
+    for message in messages:
+        if message.role == MessageRole.USER or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def digest_line(turn: List[ChatMessage]) -> str:
+    question = str(turn[0].content or "")
+    answers = [
+        str(message.content) for message in turn[1:]
+        if message.role == MessageRole.ASSISTANT and message.content
+        and not message.additional_kwargs.get("tool_calls")
+    ]
+    answer = answers[-1] if answers else "(no answer)"
+    return f"- {_clip(question, DIGEST_QUESTION_CHARS)} → {_clip(answer, DIGEST_ANSWER_CHARS)}"
+
+
+class ConversationSession:
+    """One visitor's conversation: its memory buffer and bookkeeping."""
+
+    def __init__(self, session_id: str, memory_token_limit: int):
+        self.id = session_id
+        self.memory = ChatMemoryBuffer.from_defaults(token_limit=memory_token_limit)
+        # Turns of one conversation run one at a time
+        self.lock = asyncio.Lock()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.turns = 0
+        self.tokens = 0
+        self.bytes = 0
+        self.digest: List[str] = []
+        # Revision of the shared copy this history matches, None before the first load or commit
+        self.revision: Optional[str] = None
+
+
+class SessionStore:
+    """
+    Server-side conversation memory for /ask with a `conversation_id`.
+
+    Ids are issued by `start`, never chosen by clients, so one visitor
+    cannot open another's conversation by guessing a name like "kiosk";
+    `resume` refuses ids it does not know.
+
+    Each session keeps at most `session_token_budget` tokens of history:
+    after every turn, the oldest turns are folded into a short extractive
+    digest (question → answer) that replaces them at the start of the
+    history. Sessions are evicted least-recently-used first when the store
+    exceeds `max_sessions` or `max_total_tokens`, and dropped after
+    `idle_timeout_seconds` without a turn.
+
+    With a shared `store` (STATE_BACKEND shm or redis) every committed turn
+    is also written there, with the idle timeout as its TTL, and `load`
+    picks up turns another worker committed, so a conversation can move
+    between workers. The in-memory sessions are then a cache of the store;
+    a store error keeps the local history and the turn still runs. Turns
+    are serialized per worker: two turns of one conversation running at
+    the same time on different workers both land, the later write wins.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 2000,
+        max_total_tokens: int = 4_000_000,
+        session_token_budget: int = 3000,
+        idle_timeout_seconds: float = 1800.0,
+        memory_token_limit: int = 3900,
+        store: Optional[StateStore] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.session_token_budget = session_token_budget
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.memory_token_limit = memory_token_limit
+        self.store = store
+
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self.total_tokens = 0
+        self.total_bytes = 0
+
+        self.created = 0
+        self.resumed = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.trimmed_turns = 0
+        self.loaded = 0
+        self.store_errors = 0
+
+    def start(self) -> ConversationSession:
+        """Opens a conversation under a random id only the visitor it is returned to knows."""
+        return self.acquire(secrets.token_urlsafe(SESSION_ID_BYTES))
+
+    async def resume(self, session_id: str) -> Optional[ConversationSession]:
+        """
+        The session for an id `start` issued, on this worker or (with a
+        shared store) another one; None when the id is unknown or expired.
+        A store error gives the benefit of the doubt, like `load`.
+        """
+        self._expire_idle()
+        if session_id not in self._sessions and self.store is not None:
+            try:
+                if await self.store.call(self.store.get, SESSION_KEY_PREFIX + session_id) is None:
+                    return None
+            except self.store.errors as e:
+                self.store_errors += 1
+                print(f"Session store error, resuming {session_id} with this worker's history: {e}")
+        elif session_id not in self._sessions:
+            return None
+        return self.acquire(session_id)
+
+    def acquire(self, session_id: str) -> ConversationSession:
+        """Returns the session for `session_id`, creating it if unknown or expired."""
+        self._expire_idle()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = ConversationSession(session_id, self.memory_token_limit)
+            self._sessions[session_id] = session
+            self.created += 1
+            self._enforce_limits(keep=session_id)
+        else:
+            self._sessions.move_to_end(session_id)
+            self.resumed += 1
+        session.last_used = time.monotonic()
+        return session
+
+    async def load(self, session: ConversationSession) -> None:
+        """
+        Replaces the session's history with the shared copy when another
+        worker committed a turn since this one last saw it. Call it under
+        the session lock, before the turn runs.
+        """
+        if self.store is None:
+            return
+        try:
+            raw = await self.store.call(self.store.get, SESSION_KEY_PREFIX + session.id)
+        except self.store.errors as e:
+            self.store_errors += 1
+            print(f"Session store error, using this worker's history: {e}")
+            return
+        if raw is None:
+            return
+        data = json.loads(raw)
+        if data["revision"] == session.revision:
+            return
+        session.memory.set([decode_message(message) for message in data["messages"]])
+        session.digest = data["digest"]
+        session.turns = data["turns"]
+        session.revision = data["revision"]
+        # Recounts the loaded history's tokens and bytes
+        self._trim(session)
+        self.loaded += 1
+
+    async def commit(self, session: ConversationSession) -> None:
+        """Trims the session to its budget after a turn, re-applies the global limits and shares it."""
+        self._trim(session)
+        session.turns += 1
+        session.last_used = time.monotonic()
+
+        if self._sessions.get(session.id) is not session:
+            # Evicted while the turn was running; it is the most recent session again
+            self._sessions[session.id] = session
+            self.total_tokens += session.tokens
+            self.total_bytes += session.bytes
+        self._sessions.move_to_end(session.id)
+        self._enforce_limits(keep=session.id)
+
+        if self.store is not None:
+            session.revision = uuid.uuid4().hex
+            value = json.dumps({
+                "revision": session.revision,
+                "turns": session.turns,
+                "digest": session.digest,
+                "messages": [encode_message(message) for message in session.memory.get_all()],
+            }, ensure_ascii=False)
+            try:
+                await self.store.call(self.store.set, SESSION_KEY_PREFIX + session.id, value,
+                                      self.idle_timeout_seconds)
+            except self.store.errors as e:
+                self.store_errors += 1
+                print(f"Session store error, turn kept in this worker only: {e}")
+
+    def drop(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self.total_tokens -= session.tokens
+        self.total_bytes -= session.bytes
+        return True
+
+    def _trim(self, session: ConversationSession) -> None:
+        messages = session.memory.get_all()
+        digest_pair = messages[:2] if messages and messages[0].additional_kwargs.get(DIGEST_KEY) else []
+        turns = split_turns(messages[len(digest_pair):])
+
+        digest_tokens = sum(message_tokens(message) for message in digest_pair)
+        turn_tokens = [sum(message_tokens(message) for message in turn) for turn in turns]
+
+        dropped = 0
+        while turns and digest_tokens + sum(turn_tokens) > self.session_token_budget:
+            session.digest.append(digest_line(turns.pop(0)))
+            turn_tokens.pop(0)
+            dropped += 1
+            session.digest = session.digest[-DIGEST_MAX_TURNS:]
+            digest_pair = self._digest_messages(session.digest)
+            digest_tokens = sum(message_tokens(message) for message in digest_pair)
+
+        if dropped:
+            self.trimmed_turns += dropped
+            session.memory.set(digest_pair + [message for turn in turns for message in turn])
+
+        kept = session.memory.get_all()
+        old_tokens, old_bytes = session.tokens, session.bytes
+        session.tokens = digest_tokens + sum(turn_tokens)
+        session.bytes = sum(message_bytes(message) for message in kept)
+        if self._sessions.get(session.id) is session:
+            self.total_tokens += session.tokens - old_tokens
+            self.total_bytes += session.bytes - old_bytes
+
+    @staticmethod
+    def _digest_messages(digest: List[str]) -> List[ChatMessage]:
+        """A well-formed user/assistant pair carrying the digest of dropped turns."""
+        return [
+            ChatMessage(role=MessageRole.USER, content=DIGEST_REQUEST, additional_kwargs={DIGEST_KEY: True}),
+            ChatMessage(
+                role=MessageRole.ASSISTANT,
+                content="Earlier in this conversation you asked:\n" + "\n".join(digest),
+            ),
+        ]
+
+    def _expire_idle(self) -> None:
+        now = time.monotonic()
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.idle_timeout_seconds:
+                break
+            self.drop(session.id)
+            self.expirations += 1
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self.total_tokens > self.max_total_tokens
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(oldest)
+                continue
+            self.drop(oldest)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "total_tokens": self.total_tokens,
+            "max_total_tokens": self.max_total_tokens,
+            "approx_bytes": self.total_bytes,
+            "session_token_budget": self.session_token_budget,
+            "idle_timeout_seconds": self.idle_timeout_seconds,
+            "created": self.created,
+            "resumed": self.resumed,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "trimmed_turns": self.trimmed_turns,
+            "shared": self.store is not None,
+            "loaded": self.loaded,
+            "store_errors": self.store_errors,
+        }
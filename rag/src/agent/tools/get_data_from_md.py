@@ -1,39 +1,63 @@
 from llama_index.core.tools import FunctionTool
 import os
 
+from src.retrieval.markdown_index import MarkdownIndex
+from src.observability.tracing import current_request_id, instrument_tool
+from .shaping import shape_text_output
+
 # Path to your markdown file (update as needed)
 MD_FILE_PATH = "./data/md_files/sample.md"
 
-def get_data_from_md(query_text: str = None) -> str:
+# Number of sections returned per query
+TOP_K_SECTIONS = 4
+
+# Section-level BM25 index, rebuilt automatically when the file changes
+markdown_index = MarkdownIndex(MD_FILE_PATH)
+
+
+@instrument_tool("get_data_from_md")
+async def get_data_from_md(query_text: str = None) -> str:
     """
-    Reads the full content of a markdown file and returns it as a string.
-    The query_text parameter is ignored (kept only for compatibility).
+    Searches the markdown knowledge base and returns the sections most
+    relevant to query_text, each under its heading trail.
     """
-    print(f"Tool 'get_data_from_md' called")
+    print(f"[{current_request_id()}] Tool 'get_data_from_md' called with query_text={query_text}")
 
     if not os.path.exists(MD_FILE_PATH):
         return f"Error: Markdown file not found at {MD_FILE_PATH}"
 
     try:
-        with open(MD_FILE_PATH, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        return f"Full content of {MD_FILE_PATH}:\n\n{content}"
+        if query_text and query_text.strip():
+            sections = [section for _, section in markdown_index.search(query_text, TOP_K_SECTIONS)]
+        else:
+            sections = []
+
+        if not sections:
+            # Nothing matched: give the overview and the list of topics to search for
+            all_sections = markdown_index.sections
+            topics = "\n".join(f"- {section.title}" for section in all_sections)
+            overview = all_sections[0].render() if all_sections else ""
+            return shape_text_output("get_data_from_md", (
+                f"No sections of {MD_FILE_PATH} matched the query. Overview:\n\n{overview}\n\n"
+                f"Available topics (call again with a more specific query_text):\n{topics}"
+            ))
+
+        content = "\n\n".join(section.render() for section in sections)
+        return shape_text_output("get_data_from_md", f"Most relevant sections of {MD_FILE_PATH}:\n\n{content}")
 
     except Exception as e:
-        print(f"Error in get_data_from_md tool: {e}")
+        print(f"[{current_request_id()}] Error in get_data_from_md tool: {e}")
         return f"An error occurred while reading the markdown file: {e}"
 
 
-# Create FunctionTool for llama_index
 # Create FunctionTool for llama_index
 get_data_from_md_tool = FunctionTool.from_defaults(
-    fn=get_data_from_md,
+    async_fn=get_data_from_md,
     name="get_data_from_md",
     description=(
-        "This tool reads and returns the complete text content of a specified Markdown file "
-        "from the local directory. It ignores any query input and simply outputs the raw content "
-        "of the file as plain text. Useful for retrieving Markdown data for analysis, indexing, or display."
+        "Searches the Rextro Exhibition knowledge base (event details, dates, venue, schedule, "
+        "speakers, tickets, exhibitors, workshops, accommodation, transport, contacts) and returns "
+        "the most relevant sections for the given query_text. Pass a short, specific query such as "
+        "'venue address' or 'student ticket price'; call again with another query for other topics."
     )
 )
-
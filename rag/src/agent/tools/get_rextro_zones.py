@@ -1,10 +1,28 @@
 from llama_index.core.tools import FunctionTool
-import requests
-import json
+import httpx
 from typing import List, Optional
 
+from src.observability.tracing import current_request_id, instrument_tool, record_cache_status
+from src.retrieval.rextro_mirror import paged, rextro_mirror
+from .rextro_api_client import get_rextro_client
+from .shaping import shape_json_output
 
-def get_zones(
+
+ZONES_PATH = "/zones"
+
+
+def zones_params(page: int = 1, limit: int = 10, sortBy: str = "createdAt", sortOrder: str = "desc") -> dict:
+    """Query parameters of a get_zones call (the defaults match the tool's)."""
+    return {
+        "page": page,
+        "limit": limit,
+        "sortBy": sortBy,
+        "sortOrder": sortOrder
+    }
+
+
+@instrument_tool("get_zones")
+async def get_zones(
     page: int = 1, 
     limit: int = 10, 
     sortBy: str = "createdAt", 
@@ -13,43 +31,38 @@ def get_zones(
     """
     Fetches a list of zones from the Rextro API based on pagination and sorting.
     """
-    print(f"Tool 'get_zones' called with page={page}, limit={limit}, sortBy={sortBy}, sortOrder={sortOrder}")
+    print(f"[{current_request_id()}] Tool 'get_zones' called with page={page}, limit={limit}, sortBy={sortBy}, sortOrder={sortOrder}")
     
-    api_url = "https://rextro-api.internalbuildtools.online/zones"
-    headers = {"accept": "application/json"}
-    
-    # Parameters for the request, using the defaults from your curl command
-    params = {
-        "page": page,
-        "limit": limit,
-        "sortBy": sortBy,
-        "sortOrder": sortOrder
-    }
+    params = zones_params(page, limit, sortBy, sortOrder)
 
     try:
-        response = requests.get(api_url, headers=headers, params=params, verify=False)
-        response.raise_for_status() # Check for HTTP errors
-        data = response.json()
-        return json.dumps(data, indent=2)
+        if rextro_mirror.serves(rextro_mirror.zones):
+            # The same page of zones the API would return, from the local mirror
+            record_cache_status("mirror")
+            data = paged(rextro_mirror.zones.search(sort_by=sortBy, sort_order=sortOrder), page, limit)
+        else:
+            data = await get_rextro_client().get_json(ZONES_PATH, params=params)
+        return shape_json_output("get_zones", data)
 
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
+    except httpx.HTTPStatusError as http_err:
+        print(f"[{current_request_id()}] HTTP error occurred: {http_err}")
         return f"HTTP Error: {http_err.response.status_code} - {http_err.response.text}"
-    except requests.exceptions.RequestException as req_err:
-        print(f"A request error occurred: {req_err}")
+    except httpx.RequestError as req_err:
+        print(f"[{current_request_id()}] A request error occurred: {req_err}")
         return f"Request Error: An error occurred while trying to reach the API. {req_err}"
     except Exception as e:
-        print(f"An unexpected error occurred in get_zones: {e}")
+        print(f"[{current_request_id()}] An unexpected error occurred in get_zones: {e}")
         return f"An unexpected error occurred: {e}"
 
 
 get_zones_tool = FunctionTool.from_defaults(
-    fn=get_zones,
+    async_fn=get_zones,
     name="get_zones",
     description=(
         "Fetches a paginated list of zones from the Rextro Exhibition API. "
         "You may specify the page number, number of items per page (limit), "
         "the field to sort by, and the sort order (ascending or descending). "
-        "Returns the raw JSON response as a pretty-printed string."
+        "Returns the relevant fields of the JSON response as compact JSON. "
+        "pagination.total is the number of zones across all pages."
     )
 )
@@ -0,0 +1,195 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from config.config import get_config
+from src.cache.batch_memo import batch_memo
+from src.cache.prefetched_fetches import prefetched_fetches
+from src.cache.tool_cache import ToolResponseCache
+from src.observability.tracing import current_request_id, record_cache_status
+from src.replay.cassette import Cassette, CassetteTransport, get_cassette
+from src.resilience.circuit_breaker import get_breaker
+from src.state.store import shared_state_store
+
+
+class RextroApiUnavailable(httpx.RequestError):
+    """Raised instead of calling a Rextro API endpoint whose circuit breaker is open."""
+
+
+class RextroApiClient:
+    """
+    Shared async client for the Rextro API.
+
+    One pooled, keep-alive httpx.AsyncClient is reused by every tool call, so
+    calls don't block the event loop and don't pay a TCP+TLS handshake each.
+    When a ToolResponseCache is given, `get_json` is served through it.
+
+    Each endpoint path has a circuit breaker: after repeated timeouts,
+    connection errors, 5xx or 429 responses, calls to it fail fast with
+    RextroApiUnavailable, so the cache serves its last known good response
+    (or the tool reports the outage) without waiting on the timeout.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        timeout_seconds: float = 10.0,
+        connect_timeout_seconds: float = 5.0,
+        verify_ssl: bool = False,
+        cache: Optional[ToolResponseCache] = None,
+        cassette: Optional[Cassette] = None,
+    ):
+        self.cache = cache
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        transport = None
+        if cassette is not None:
+            # Records or replays every request below the cache and circuit breakers
+            transport = CassetteTransport(
+                cassette,
+                None if cassette.replaying else httpx.AsyncHTTPTransport(verify=verify_ssl, limits=limits),
+            )
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"accept": "application/json"},
+            limits=limits,
+            timeout=httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds),
+            verify=verify_ssl,
+            transport=transport,
+        )
+
+    async def get_json(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        GETs `path` and returns the decoded JSON body, from the response cache
+        when one is configured. Inside an /ask/batch request identical calls
+        share one fetch, and a fetch the agent run prefetched is taken over.
+        `timeout` overrides the client default for this call only. Raises
+        httpx.HTTPStatusError for error statuses and httpx.RequestError for
+        transport failures.
+        """
+        prefetched = prefetched_fetches.get()
+        task = prefetched.take(path, params) if prefetched is not None else None
+        if task is not None:
+            value, _ = await asyncio.shield(task)
+            status = "prefetch"
+        else:
+            value, status = await self.get_json_with_status(path, params, timeout)
+        record_cache_status(status)
+        return value
+
+    async def get_json_with_status(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[Any, str]:
+        """`get_json` without the prefetch handover, returning `(value, cache status)`."""
+        memo = batch_memo.get()
+        if memo is not None:
+            return await memo.get(path, params, lambda: self._get_json(path, params, timeout))
+        return await self._get_json(path, params, timeout)
+
+    async def _get_json(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+    ) -> Tuple[Any, str]:
+        if self.cache is None:
+            return await self.fetch_json(path, params, timeout), "disabled"
+        return await self.cache.get_with_status(path, params, lambda: self.fetch_json(path, params, timeout))
+
+    async def fetch_json(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Uncached GET of `path`, returning the decoded JSON body."""
+        breaker = get_breaker(f"rextro:{path}")
+        if not breaker.allow():
+            raise RextroApiUnavailable(f"Rextro API {path} is unavailable; retrying in {breaker.retry_after():.0f}s")
+        try:
+            response = await self._client.get(
+                path,
+                params=params,
+                # Lets upstream logs be correlated with ours
+                headers={"x-request-id": current_request_id()},
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled, or a request error that says nothing about the upstream
+            # (DecodingError, TooManyRedirects, InvalidURL): free the probe slot
+            breaker.release()
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+        else:
+            # Any other answer, 4xx included, means the endpoint is up
+            breaker.record_success()
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# Process-wide client, opened and closed with the application lifecycle
+_client: Optional[RextroApiClient] = None
+
+
+def init_rextro_client() -> RextroApiClient:
+    """Creates the shared Rextro API client from config. Called at startup."""
+    global _client
+    if _client is None:
+        config = get_config()
+        _client = RextroApiClient(
+            base_url=config.rextro_api_base_url,
+            max_connections=config.rextro_api_max_connections,
+            max_keepalive_connections=config.rextro_api_max_keepalive_connections,
+            timeout_seconds=config.rextro_api_timeout_seconds,
+            connect_timeout_seconds=config.rextro_api_connect_timeout_seconds,
+            verify_ssl=config.rextro_api_verify_ssl,
+            cache=ToolResponseCache(
+                ttls={
+                    "/zones": config.tool_cache_zones_ttl_seconds,
+                    "/sessions/search": config.tool_cache_sessions_ttl_seconds,
+                },
+                stale_seconds=config.tool_cache_stale_seconds,
+                max_entries=config.tool_cache_max_entries,
+                store=shared_state_store(),
+            ),
+            cassette=get_cassette(),
+        )
+    return _client
+
+
+def rextro_client_open() -> bool:
+    """True between init_rextro_client() and close_rextro_client()."""
+    return _client is not None
+
+
+def get_rextro_client() -> RextroApiClient:
+    """Returns the shared client, creating it lazily if startup did not."""
+    return _client or init_rextro_client()
+
+
+async def close_rextro_client() -> None:
+    """Closes the shared client and its pooled connections. Called at shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
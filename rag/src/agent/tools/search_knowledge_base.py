@@ -0,0 +1,43 @@
+from llama_index.core.tools import FunctionTool
+
+from src.retrieval.vector_index import VectorIndex
+from src.observability.tracing import current_request_id, instrument_tool
+from .shaping import shape_text_output
+
+# Number of chunks returned per query
+TOP_K_CHUNKS = 4
+
+# Memory-mapped vector index over data/md_files, loaded at startup
+vector_index = VectorIndex()
+
+
+@instrument_tool("search_knowledge_base")
+async def search_knowledge_base(query: str, top_k: int = TOP_K_CHUNKS) -> str:
+    """
+    Similarity search over every document in the knowledge base.
+    Returns the best matching chunks with their source file and headings.
+    """
+    print(f"[{current_request_id()}] Tool 'search_knowledge_base' called with query={query}, top_k={top_k}")
+
+    try:
+        results = vector_index.search(query, max(1, min(top_k, 10)))
+        if not results:
+            return f"No knowledge base documents matched the query: {query}"
+
+        return shape_text_output("search_knowledge_base", "\n\n".join(chunk.render() for _, chunk in results))
+
+    except Exception as e:
+        print(f"[{current_request_id()}] Error in search_knowledge_base tool: {e}")
+        return f"An error occurred while searching the knowledge base: {e}"
+
+
+search_knowledge_base_tool = FunctionTool.from_defaults(
+    async_fn=search_knowledge_base,
+    name="search_knowledge_base",
+    description=(
+        "Similarity search across all Rextro Exhibition knowledge-base documents. "
+        "Pass a natural-language query; returns the most relevant passages (default 4, at most 10) "
+        "labelled with their source document and section headings. "
+        "Use it when the answer may live in documents other than the main event guide."
+    )
+)
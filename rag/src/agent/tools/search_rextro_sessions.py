@@ -1,25 +1,24 @@
 from llama_index.core.tools import FunctionTool
-import requests
-import json
+import httpx
 from typing import List, Optional
 
-def search_rextro_sessions(
-    query: Optional[str] = None, 
-    tags: Optional[List[str]] = None, 
-    page: int = 1, 
-    limit: int = 10, 
-    sortBy: str = "time", 
+from src.observability.tracing import current_request_id, instrument_tool, record_cache_status
+from src.retrieval.rextro_mirror import paged, rextro_mirror
+from .rextro_api_client import get_rextro_client
+from .shaping import shape_json_output
+
+SESSIONS_SEARCH_PATH = "/sessions/search"
+
+
+def session_search_params(
+    query: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    page: int = 1,
+    limit: int = 10,
+    sortBy: str = "time",
     sortOrder: str = "desc"
-) -> str:
-    """
-    Searches for sessions on the Rextro API based on a query, tags,
-    pagination, and sorting criteria.
-    """
-    print(f"Tool 'search_rextro_sessions' called with query={query}, tags={tags}, page={page}, limit={limit}")
-    
-    api_url = "https://rextro-api.internalbuildtools.online/sessions/search"
-    headers = {"accept": "application/json"}
-    
+) -> dict:
+    """Query parameters of a search_rextro_sessions call (the defaults match the tool's)."""
     # Start with pagination and sorting params
     params = {
         "page": page,
@@ -27,43 +26,66 @@ def search_rextro_sessions(
         "sortBy": sortBy,
         "sortOrder": sortOrder
     }
-    print(f"Constructed params so far: {params}")
     # Add optional filters only if they are provided
     if query:
         params["query"] = query
-    
+
     if tags:
         # The API expects a comma-separated string for tags
         params["tags"] = ",".join(tags)
+    return params
+
+
+@instrument_tool("search_rextro_sessions")
+async def search_rextro_sessions(
+    query: Optional[str] = None, 
+    tags: Optional[List[str]] = None, 
+    page: int = 1, 
+    limit: int = 10, 
+    sortBy: str = "time", 
+    sortOrder: str = "desc"
+) -> str:
+    """
+    Searches for sessions on the Rextro API based on a query, tags,
+    pagination, and sorting criteria.
+    """
+    print(f"[{current_request_id()}] Tool 'search_rextro_sessions' called with query={query}, tags={tags}, page={page}, limit={limit}")
+    
+    params = session_search_params(query, tags, page, limit, sortBy, sortOrder)
+    print(f"[{current_request_id()}] Constructed params: {params}")
 
     try:
-        response = requests.get(api_url, headers=headers, params=params, verify=False)
-        response.raise_for_status()
-        data = response.json()
-        return json.dumps(data, indent=2)
+        if rextro_mirror.serves(rextro_mirror.sessions):
+            # The same page of matches the API would return, from the local mirror
+            record_cache_status("mirror")
+            data = paged(rextro_mirror.sessions.search(query, tags, sortBy, sortOrder), page, limit)
+        else:
+            data = await get_rextro_client().get_json(SESSIONS_SEARCH_PATH, params=params)
+        return shape_json_output("search_rextro_sessions", data)
 
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
+    except httpx.HTTPStatusError as http_err:
+        print(f"[{current_request_id()}] HTTP error occurred: {http_err}")
         return f"HTTP Error: {http_err.response.status_code} - {http_err.response.text}"
-    except requests.exceptions.RequestException as req_err:
-        print(f"A request error occurred: {req_err}")
+    except httpx.RequestError as req_err:
+        print(f"[{current_request_id()}] A request error occurred: {req_err}")
         return f"Request Error: An error occurred while trying to reach the API. {req_err}"
     except Exception as e:
-        print(f"An unexpected error occurred in search_rextro_sessions: {e}")
+        print(f"[{current_request_id()}] An unexpected error occurred in search_rextro_sessions: {e}")
         return f"An unexpected error occurred: {e}"
 
 
 from llama_index.core.tools import FunctionTool
 
 search_rextro_sessions_tool = FunctionTool.from_defaults(
-    fn=search_rextro_sessions,
+    async_fn=search_rextro_sessions,
     name="search_rextro_sessions",
     description=(
         "Searches the Rextro Exhibition sessions API. "
         "You can optionally specify a free-text 'query' to match session titles or descriptions, "
         "and/or a list of 'tags' to filter by topic. "
         "Additionally, you can control the pagination (page number, items per page) and sorting (field and order). "
-        "Returns the JSON response as a formatted string."
+        "Returns the relevant fields of the JSON response as compact JSON. "
+        "pagination.total is the number of matching sessions across all pages."
     )
 )
 
@@ -0,0 +1,167 @@
+import json
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from llama_index.core.utils import get_tokenizer
+
+from config.config import get_config
+
+# Upstream bookkeeping fields the agent never needs
+DROP_FIELDS = frozenset({
+    "_id", "__v", "createdAt", "updatedAt", "createdBy", "updatedBy", "deletedAt", "isDeleted",
+})
+MAX_STRING_CHARS = 600
+# Below this many tokens a tool call gets the "budget exhausted" note instead of data
+MIN_USEFUL_TOKENS = 40
+
+BUDGET_EXHAUSTED_NOTE = (
+    "Tool output budget for this request is exhausted. "
+    "Answer with the information already retrieved."
+)
+
+
+def count_tokens(text: str) -> int:
+    """Token count with the same tokenizer ChatMemoryBuffer uses."""
+    return len(get_tokenizer()(text))
+
+
+class TokenBudget:
+    """Per-request cap on the tokens tool outputs may add to the LLM context."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.calls = 0
+        self.truncated = 0
+        self.per_tool: Dict[str, int] = defaultdict(int)
+
+    @property
+    def remaining(self) -> int:
+        return max(self.limit - self.used, 0)
+
+    def charge(self, tool_name: str, tokens: int, truncated: bool) -> None:
+        self.used += tokens
+        self.calls += 1
+        self.truncated += int(truncated)
+        self.per_tool[tool_name] += tokens
+
+    def summary(self) -> dict:
+        return {
+            "tool_tokens": self.used,
+            "limit": self.limit,
+            "calls": self.calls,
+            "truncated": self.truncated,
+            "per_tool": dict(self.per_tool),
+        }
+
+
+# Budget of the request currently running; set by the agent runtime
+request_budget: ContextVar[Optional[TokenBudget]] = ContextVar("request_budget", default=None)
+
+
+def project(value: Any) -> Any:
+    """
+    Drops bookkeeping fields and empty values and trims very long strings,
+    recursively. Returns None for values that end up empty.
+    """
+    if isinstance(value, dict):
+        projected = {key: project(item) for key, item in value.items() if key not in DROP_FIELDS}
+        return {key: item for key, item in projected.items() if item is not None} or None
+    if isinstance(value, list):
+        return [item for item in (project(item) for item in value) if item is not None] or None
+    if isinstance(value, str):
+        value = value.strip()
+        if len(value) > MAX_STRING_CHARS:
+            value = value[:MAX_STRING_CHARS].rstrip() + "…"
+        return value or None
+    return value
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _cut_text(text: str, max_tokens: int) -> str:
+    """Cuts text to fit max_tokens, deterministically, with a truncation marker."""
+    marker = "…[truncated]"
+    if count_tokens(text) <= max_tokens:
+        return text
+    length = len(text) * max_tokens // max(count_tokens(text), 1)
+    while length > 0 and count_tokens(text[:length] + marker) > max_tokens:
+        length = length * 9 // 10
+    return text[:length] + marker
+
+
+def _largest_list(data: Any) -> Optional[str]:
+    """Key of the longest list in a dict payload (e.g. "data"), if any."""
+    if not isinstance(data, dict):
+        return None
+    lists = [(len(value), key) for key, value in data.items() if isinstance(value, list)]
+    return max(lists)[1] if lists else None
+
+
+def _fit_json(data: Any, max_tokens: int) -> str:
+    """
+    Serializes data within max_tokens. List payloads are truncated by keeping
+    the longest prefix of items that fits (binary search), with a note on how
+    many were dropped; anything still too large is cut as text.
+    """
+    items, key = (data, None) if isinstance(data, list) else (None, _largest_list(data))
+    if key is not None:
+        items = data[key]
+
+    if items:
+        def render(count: int) -> str:
+            note = f"showing {count} of {len(items)} items; request a later page or narrow the query"
+            if key is None:
+                return compact_json({"items": items[:count], "truncated": note})
+            return compact_json({**data, key: items[:count], "truncated": note})
+
+        low, high = 0, len(items) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(render(middle)) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        if low > 0 or count_tokens(render(0)) <= max_tokens:
+            return render(low)
+
+    return _cut_text(compact_json(data), max_tokens)
+
+
+def _call_cap() -> int:
+    cap = get_config().tool_output_max_tokens
+    budget = request_budget.get()
+    return min(cap, budget.remaining) if budget is not None else cap
+
+
+def _charge(tool_name: str, text: str, truncated: bool) -> str:
+    budget = request_budget.get()
+    if budget is not None:
+        budget.charge(tool_name, count_tokens(text), truncated)
+    return text
+
+
+def shape_json_output(tool_name: str, data: Any) -> str:
+    """Projects an API payload, serializes it compactly and fits it to the token caps."""
+    cap = _call_cap()
+    if cap < MIN_USEFUL_TOKENS:
+        return _charge(tool_name, BUDGET_EXHAUSTED_NOTE, True)
+
+    projected = project(data)
+    text = compact_json(projected)
+    if count_tokens(text) <= cap:
+        return _charge(tool_name, text, False)
+    return _charge(tool_name, _fit_json(projected, cap), True)
+
+
+def shape_text_output(tool_name: str, text: str) -> str:
+    """Fits plain-text tool output to the token caps."""
+    cap = _call_cap()
+    if cap < MIN_USEFUL_TOKENS:
+        return _charge(tool_name, BUDGET_EXHAUSTED_NOTE, True)
+
+    shaped = _cut_text(text, cap)
+    return _charge(tool_name, shaped, shaped is not text)
@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from src.state.store import StateStore
+
+# Directory holding the markdown knowledge base the agent answers from
+KNOWLEDGE_BASE_DIR = "./data/md_files"
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Shared-store keys: one entry per normalized query, plus the invalidation generation
+ENTRY_KEY_PREFIX = "answer:"
+GENERATION_KEY = "answer-generation"
+# Counting a shared store's entries scans its keys, so the count is refreshed at most this often
+ENTRY_COUNT_INTERVAL_SECONDS = 60.0
+
+
+class AnswerCacheUnavailable(RuntimeError):
+    """Raised when an invalidation could not reach the shared store."""
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a user query into a cache key.
+    Case, punctuation and repeated whitespace are ignored, so
+    "Where is the venue?" and "where is the  venue" share an entry.
+    """
+    query = _PUNCTUATION_RE.sub(" ", query.lower())
+    return _WHITESPACE_RE.sub(" ", query).strip()
+
+
+def knowledge_base_fingerprint(path: str = KNOWLEDGE_BASE_DIR) -> Tuple:
+    """
+    Cheap fingerprint of the knowledge base directory built from file stats.
+    Any added, removed or modified file changes the fingerprint.
+    """
+    if not os.path.isdir(path):
+        return ()
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            entries.append((os.path.join(root, name), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(entries))
+
+
+class AnswerCache:
+    """
+    Bounded LRU + TTL cache for final agent answers, with single-flight
+    coalescing: concurrent lookups of the same normalized query share one
+    agent run instead of starting one each.
+
+    Entries are dropped automatically when the knowledge base directory
+    changes (checked at most every `kb_check_interval` seconds).
+
+    With a shared `store` (STATE_BACKEND shm or redis) entries live in the
+    store instead of process memory, so every worker serves answers the
+    others computed and an invalidation reaches all of them. The store
+    expires entries by TTL rather than LRU. Coalescing stays per process,
+    and a store error is treated as a miss so requests still get answered.
+
+    Expired answers are kept for another `stale_seconds` (and survive LRU
+    eviction like any other entry). `get` ignores them, but `last_good`
+    returns them: when the agent can't answer because an upstream is down,
+    the last known good answer beats an apology.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 600.0,
+        kb_path: str = KNOWLEDGE_BASE_DIR,
+        kb_check_interval: float = 5.0,
+        store: Optional[StateStore] = None,
+        stale_seconds: float = 0.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.kb_path = kb_path
+        self.kb_check_interval = kb_check_interval
+        self.store = store
+
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._kb_fingerprint = knowledge_base_fingerprint(kb_path)
+        self._kb_checked_at = time.monotonic()
+        # False while a knowledge base change is waiting for its invalidation
+        self._kb_current = True
+        # Bumped on full invalidation so runs started before it don't store stale answers
+        self._generation = 0
+        # Last count of a shared store's entries (see count_entries)
+        self._shared_entries: Optional[int] = None
+        self._counted_at = float("-inf")
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.store_errors = 0
+        self.stale_served = 0
+
+    async def _check_knowledge_base(self) -> bool:
+        """Invalidates on a knowledge base change; False while that invalidation could not be done."""
+        now = time.monotonic()
+        if now - self._kb_checked_at < self.kb_check_interval:
+            return self._kb_current
+        self._kb_checked_at = now
+        fingerprint = knowledge_base_fingerprint(self.kb_path)
+        if fingerprint != self._kb_fingerprint:
+            print("Knowledge base changed, invalidating answer cache")
+            try:
+                await self.invalidate()
+            except AnswerCacheUnavailable as e:
+                # Fingerprint kept, so the next check retries the invalidation
+                print(f"{e}; retrying on the next check")
+                self._kb_current = False
+                return False
+            self._kb_fingerprint = fingerprint
+        self._kb_current = True
+        return True
+
+    async def get(self, query: str) -> Optional[str]:
+        """Returns the cached answer for a query, or None if missing or expired."""
+        if not await self._check_knowledge_base():
+            # Entries may predate a knowledge base change: a miss, like any store error
+            return None
+        entry = await self._entry(normalize_query(query))
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at <= time.time():
+            self.expirations += 1
+            return None
+        return answer
+
+    async def last_good(self, query: str) -> Optional[str]:
+        """Returns the cached answer for a query even if expired (within `stale_seconds`), or None."""
+        entry = await self._entry(normalize_query(query))
+        if entry is None:
+            return None
+        self.stale_served += 1
+        return entry[1]
+
+    async def _entry(self, key: str) -> Optional[Tuple[float, str]]:
+        """(expires_at wall-clock time, answer) for a key within its stale window, or None."""
+        if self.store is not None:
+            try:
+                raw = await self.store.call(self.store.get, ENTRY_KEY_PREFIX + key)
+            except self.store.errors as e:
+                self.store_errors += 1
+                print(f"Answer cache store error, treating as a miss: {e}")
+                return None
+            if raw is None:
+                return None
+            try:
+                value = json.loads(raw)
+                return value["expires_at"], value["answer"]
+            except (ValueError, KeyError, TypeError):
+                return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] + self.stale_seconds <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def lookup(self, query: str) -> Optional[str]:
+        """Like `get`, but counts the lookup as a hit or a miss."""
+        answer = await self.get(query)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    async def set(self, query: str, answer: str) -> None:
+        key = normalize_query(query)
+        expires_at = time.time() + self.ttl_seconds
+        if self.store is not None:
+            try:
+                value = json.dumps({"answer": answer, "expires_at": expires_at})
+                await self.store.call(self.store.set, ENTRY_KEY_PREFIX + key, value, self.ttl_seconds + self.stale_seconds)
+            except self.store.errors as e:
+                self.store_errors += 1
+                print(f"Answer cache store error, answer not cached: {e}")
+            return
+        self._entries[key] = (expires_at, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        query: str,
+        compute: Callable[[], Awaitable[str]],
+        cacheable: Callable[[str], bool] = lambda answer: True,
+    ) -> str:
+        """
+        Returns the cached answer for `query`, or runs `compute` to produce it.
+        Concurrent callers for the same normalized query await the same run.
+        Answers rejected by `cacheable` (e.g. error messages) are not stored.
+        """
+        answer = await self.get(query)
+        if answer is not None:
+            self.hits += 1
+            return answer
+
+        key = normalize_query(query)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, query, compute, cacheable))
+            # Mark failures as retrieved even if every waiter has gone away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+
+        # Shield the shared run so one disconnecting client doesn't cancel it for the rest
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self,
+        key: str,
+        query: str,
+        compute: Callable[[], Awaitable[str]],
+        cacheable: Callable[[str], bool],
+    ) -> str:
+        try:
+            generation = await self._current_generation()
+            answer = await compute()
+            if cacheable(answer) and generation == await self._current_generation():
+                await self.set(query, answer)
+            return answer
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _current_generation(self) -> int:
+        if self.store is None:
+            return self._generation
+        try:
+            return await self.store.call(self.store.get_int, GENERATION_KEY)
+        except self.store.errors:
+            # Store down: the answer can't be stored anyway
+            return -1
+
+    async def invalidate(self, query: Optional[str] = None) -> int:
+        """
+        Drops one query's entry, or every entry when `query` is None.
+        Returns the number of entries removed. Raises AnswerCacheUnavailable
+        when the shared store fails.
+        """
+        if self.store is not None:
+            try:
+                if query is None:
+                    # Generation first: runs in flight on any worker stop storing their answers
+                    await self.store.call(self.store.incr, GENERATION_KEY)
+                    removed = await self.store.call(self.store.delete_prefix, ENTRY_KEY_PREFIX)
+                    self._shared_entries = 0
+                else:
+                    removed = 1 if await self.store.call(self.store.delete, ENTRY_KEY_PREFIX + normalize_query(query)) else 0
+            except self.store.errors as e:
+                self.store_errors += 1
+                raise AnswerCacheUnavailable(f"Answer cache store error, not invalidated: {e}") from e
+            self.invalidations += removed
+            return removed
+        if query is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._generation += 1
+        else:
+            removed = 1 if self._entries.pop(normalize_query(query), None) else 0
+        self.invalidations += removed
+        return removed
+
+    async def count_entries(self) -> Optional[int]:
+        """
+        Recounts the shared store's entries, at most every ENTRY_COUNT_INTERVAL_SECONDS
+        (a key scan on Redis) and off the event loop. `stats` reports the last count.
+        """
+        if self.store is None or time.monotonic() - self._counted_at < ENTRY_COUNT_INTERVAL_SECONDS:
+            return self._entry_count()
+        self._counted_at = time.monotonic()
+        try:
+            self._shared_entries = await self.store.call(self.store.count_prefix, ENTRY_KEY_PREFIX)
+        except self.store.errors:
+            self._shared_entries = None
+        return self._shared_entries
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": self.store.backend if self.store is not None else "memory",
+            "entries": self._entry_count(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "store_errors": self.store_errors,
+            "stale_served": self.stale_served,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _entry_count(self) -> Optional[int]:
+        # Shared store: the last count_entries() result, None until counted
+        return len(self._entries) if self.store is None else self._shared_entries
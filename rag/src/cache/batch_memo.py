@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from .tool_cache import normalize_params
+
+# Set for the duration of an /ask/batch request; agent runs and tool calls inherit it
+batch_memo: ContextVar[Optional["BatchFetchMemo"]] = ContextVar("batch_memo", default=None)
+
+
+class BatchFetchMemo:
+    """
+    Shares Rextro API responses between the items of one batch.
+
+    Batch items run concurrently and tend to make the same tool calls, so the
+    first fetch of a path + params runs and every identical fetch in the batch
+    awaits the same task, or reuses its result once it is done. Unlike the
+    tool response cache this ignores TTLs and covers uncached endpoints, but
+    only lives as long as the batch. Failed fetches are forgotten so a later
+    item can retry them.
+    """
+
+    def __init__(self):
+        self._fetches: Dict[Tuple, asyncio.Task] = {}
+        self.fetched = 0
+        self.deduplicated = 0
+
+    async def get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Awaitable[Tuple[Any, str]]],
+    ) -> Tuple[Any, str]:
+        """
+        Returns `(value, status)` from `fetch()`, or `(value, "batch")` when
+        an identical fetch of this batch already produced (or is producing) it.
+        """
+        key = (path, normalize_params(params))
+        task = self._fetches.get(key)
+        if task is not None:
+            self.deduplicated += 1
+            value, _ = await asyncio.shield(task)
+            return value, "batch"
+
+        self.fetched += 1
+        task = asyncio.ensure_future(fetch())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._fetches[key] = task
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self._fetches.get(key) is task:
+                del self._fetches[key]
+            raise
+
+    def stats(self) -> dict:
+        return {"fetched": self.fetched, "deduplicated": self.deduplicated}
+
+
+@contextmanager
+def batch_scope() -> Iterator[BatchFetchMemo]:
+    """Activates a fresh BatchFetchMemo for the code (and tasks) started inside the block."""
+    memo = BatchFetchMemo()
+    token = batch_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        batch_memo.reset(token)
@@ -0,0 +1,345 @@
+"""
+Precomputed answers to the questions most /ask traffic asks.
+
+The store is built offline from a curated question list (one FAQ per line,
+phrasings separated by " | "):
+
+    python -m src.cache.faq_store [--questions data/faq/questions.txt] [--rebuild]
+
+The builder answers the first phrasing of each FAQ with the agent and writes
+the answers to FAQ_STORE_PATH. Each answer carries the content hashes of the
+sources it was built from: the knowledge base (data/md_files) always, and the
+mirrored Rextro sessions or zones when the run called those tools. Entries
+whose sources are unchanged are reused rather than asked again.
+
+At runtime a query is matched lexically against every phrasing (IDF-weighted
+cosine over their words). The closest FAQ's answer is served if the
+similarity reaches FAQ_MATCH_THRESHOLD and its sources still hash the
+same: an edit under data/md_files, or a mirror sync that changes sessions or
+zones, retires the entry until the next build. Entries built from Rextro data
+are only served with REXTRO_MIRROR_ENABLED, since only the mirror can tell
+whether that data changed.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config.config import get_config
+from src.observability.metrics import FAQ_LOOKUPS
+from src.observability.tracing import tools_called
+from src.retrieval.rextro_mirror import rextro_mirror
+from src.retrieval.markdown_index import tokenize
+from src.retrieval.vector_index import file_sha256, list_documents
+from .answer_cache import KNOWLEDGE_BASE_DIR, knowledge_base_fingerprint, normalize_query
+
+QUESTIONS_PATH = "./data/faq/questions.txt"
+STORE_PATH = "./data/faq/faq_store.json"
+STORE_VERSION = 1
+
+KB_SOURCE = "md"
+# The source each tool reads; an answer depends on the sources of every tool its run called
+TOOL_SOURCES = {
+    "get_data_from_md": KB_SOURCE,
+    "search_knowledge_base": KB_SOURCE,
+    "search_rextro_sessions": "rextro:sessions",
+    "get_zones": "rextro:zones",
+}
+
+
+def knowledge_base_hash(kb_dir: str = KNOWLEDGE_BASE_DIR) -> str:
+    """Content hash of every markdown file under kb_dir (names included)."""
+    digest = hashlib.sha256()
+    for source, path in list_documents(kb_dir).items():
+        digest.update(f"{source}\0{file_sha256(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_questions(path: str = QUESTIONS_PATH) -> List[List[str]]:
+    """The FAQs of a questions file, each as its list of phrasings. Blank lines and # comments are skipped."""
+    faqs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                phrasings = [phrasing.strip() for phrasing in line.split("|") if phrasing.strip()]
+                if phrasings:
+                    faqs.append(phrasings)
+    return faqs
+
+
+class SourceHashes:
+    """
+    Current content hashes of the sources answers are built from. The
+    knowledge base is re-hashed only when its file stats changed (checked at
+    most every `check_interval` seconds); Rextro hashes come from the mirror
+    and are present only while the mirror serves that collection.
+    """
+
+    def __init__(self, kb_dir: str = KNOWLEDGE_BASE_DIR, check_interval: float = 5.0):
+        self.kb_dir = kb_dir
+        self.check_interval = check_interval
+        self._kb_stat: Optional[Tuple] = None
+        self._kb_hash = ""
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Dict[str, str]:
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._checked_at = now
+                stat = knowledge_base_fingerprint(self.kb_dir)
+                if stat != self._kb_stat:
+                    self._kb_hash = knowledge_base_hash(self.kb_dir)
+                    self._kb_stat = stat
+        hashes = {KB_SOURCE: self._kb_hash}
+        for collection in rextro_mirror.collections:
+            if rextro_mirror.serves(collection):
+                hashes[f"rextro:{collection.name}"] = collection.content_hash
+        return hashes
+
+
+@dataclass
+class FaqEntry:
+    """One precomputed answer, the phrasings it answers and the source hashes it was built from."""
+    questions: List[str]
+    answer: str
+    sources: Dict[str, str] = field(default_factory=dict)
+    built_at: float = 0.0
+
+    def valid(self, current: Dict[str, str]) -> bool:
+        """True while every source still hashes as it did at build time."""
+        return all(current.get(source) == digest for source, digest in self.sources.items())
+
+
+def match_terms(text: str) -> List[str]:
+    """Words compared when matching a query to a phrasing: no stopwords or single letters, plural "s" stripped."""
+    terms = []
+    for token in tokenize(text):
+        if len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class PhrasingIndex:
+    """
+    IDF-weighted bag-of-words cosine similarity between a query and every
+    phrasing of every FAQ. Query words that no phrasing contains weigh as much
+    as the rarest known word, so a query asking for more than a FAQ covers
+    scores low.
+    """
+
+    def __init__(self, entries: List[FaqEntry]):
+        self.entries = entries
+        phrasings = [(index, match_terms(question)) for index, entry in enumerate(entries) for question in entry.questions]
+        document_frequency = Counter(term for _, terms in phrasings for term in set(terms))
+        self.idf = {term: math.log(1 + len(phrasings) / freq) for term, freq in document_frequency.items()}
+        self.unseen_idf = math.log(1 + len(phrasings))
+        # FAQ index of each phrasing
+        self.owners = [index for index, _ in phrasings]
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for row, (_, terms) in enumerate(phrasings):
+            for term, weight in self._weights(terms).items():
+                self.postings[term].append((row, weight))
+
+    @property
+    def phrasings(self) -> int:
+        return len(self.owners)
+
+    def _weights(self, terms: List[str]) -> Dict[str, float]:
+        weights = {term: count * self.idf.get(term, self.unseen_idf) for term, count in Counter(terms).items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {term: weight / norm for term, weight in weights.items()} if norm else {}
+
+    def best(self, query: str) -> Optional[Tuple[float, FaqEntry]]:
+        """(similarity, FAQ) of the phrasing closest to `query`, or None if none shares a word with it."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in self._weights(match_terms(query)).items():
+            for row, row_weight in self.postings.get(term, ()):
+                scores[row] += weight * row_weight
+        if not scores:
+            return None
+        row, score = max(scores.items(), key=lambda item: (item[1], -item[0]))
+        return score, self.entries[self.owners[row]]
+
+
+def read_entries(path: str) -> List[FaqEntry]:
+    """The entries of a store file; empty when it is missing or has another format version."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    if data.get("version") != STORE_VERSION:
+        return []
+    return [FaqEntry(**entry) for entry in data.get("entries", [])]
+
+
+def write_entries(path: str, entries: List[FaqEntry]) -> None:
+    """Writes the store atomically, so a serving process never reads a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = {"version": STORE_VERSION, "built_at": time.time(),
+            "entries": [asdict(entry) for entry in entries]}
+    tmp_path = os.path.join(os.path.dirname(path) or ".", f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class FaqStore:
+    """
+    Read side of the FAQ store: matches queries against the phrasings of the
+    loaded entries. Reloads when the store file is replaced by a newer build.
+    """
+
+    def __init__(self, path: str = STORE_PATH, threshold: float = 0.8, kb_dir: str = KNOWLEDGE_BASE_DIR):
+        self.path = path
+        self.threshold = threshold
+        self.sources = SourceHashes(kb_dir)
+        self._index = PhrasingIndex([])
+        self._mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def refresh(self) -> bool:
+        """Loads the store if the file changed since the last load. Returns True if loaded."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            index = PhrasingIndex(read_entries(self.path))
+            self._index = index
+            self._mtime = mtime
+        print(f"Loaded {len(index.entries)} FAQ answers ({index.phrasings} phrasings) from {self.path}")
+        return True
+
+    @property
+    def size(self) -> int:
+        return len(self._index.entries)
+
+    def match(self, query: str) -> Optional[Tuple[float, FaqEntry]]:
+        """The FAQ with the phrasing closest to `query`, if it reaches the threshold."""
+        match = self._index.best(query)
+        if match is None or match[0] < self.threshold:
+            return None
+        return match
+
+    def lookup(self, query: str) -> Optional[str]:
+        """The precomputed answer for `query`, or None when no current FAQ matches."""
+        self.refresh()
+        match = self.match(query)
+        if match is None:
+            self.misses += 1
+            FAQ_LOOKUPS.inc(outcome="miss")
+            return None
+        _, entry = match
+        if not entry.valid(self.sources.current()):
+            self.stale += 1
+            FAQ_LOOKUPS.inc(outcome="stale")
+            return None
+        self.hits += 1
+        FAQ_LOOKUPS.inc(outcome="hit")
+        return entry.answer
+
+    def stats(self) -> dict:
+        entries = self._index.entries
+        current = self.sources.current() if entries else {}
+        lookups = self.hits + self.misses + self.stale
+        return {
+            "entries": len(entries),
+            "valid_entries": sum(1 for entry in entries if entry.valid(current)),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+async def build_store(questions_path: str, store_path: str, rebuild: bool = False, concurrency: int = 2) -> dict:
+    """
+    Answers every FAQ of `questions_path` with the agent and writes the store.
+    FAQs whose previous entry is still valid are reused unless `rebuild`.
+    Returns build statistics.
+    """
+    from src.agent.agent import FALLBACK_ANSWERS, get_agent_runtime, init_agent_runtime
+    from src.agent.tools.rextro_api_client import close_rextro_client, init_rextro_client
+    from src.retrieval.vector_index import build_index
+
+    start = time.perf_counter()
+    faqs = load_questions(questions_path)
+    init_agent_runtime()
+    client = init_rextro_client()
+    build_index()
+    # Answers that use Rextro data are built from (and keyed by) one mirror snapshot
+    for result in await rextro_mirror.snapshot(client.fetch_json):
+        if "error" in result:
+            print(f"Rextro {result['collection']} unavailable; FAQs that need it are skipped")
+    current = SourceHashes().current()
+    previous = {} if rebuild else {normalize_query(entry.questions[0]): entry for entry in read_entries(store_path)}
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"answered": 0, "reused": 0, "failed": 0}
+
+    async def build_entry(questions: List[str]) -> Optional[FaqEntry]:
+        old = previous.get(normalize_query(questions[0]))
+        if old is not None and old.valid(current):
+            counts["reused"] += 1
+            return FaqEntry(questions, old.answer, old.sources, old.built_at)
+
+        called: List[str] = []
+        tools_called.set(called)
+        async with semaphore:
+            response = await get_agent_runtime().run(questions[0])
+        sources = {KB_SOURCE} | {TOOL_SOURCES[tool] for tool in called if tool in TOOL_SOURCES}
+        if response.answer in FALLBACK_ANSWERS or not sources <= current.keys():
+            counts["failed"] += 1
+            print(f"No FAQ answer for {questions[0]!r}: {response.answer[:80]!r}, sources {sorted(sources)}")
+            return None
+        counts["answered"] += 1
+        return FaqEntry(questions, response.answer, {source: current[source] for source in sorted(sources)}, time.time())
+
+    try:
+        entries = await asyncio.gather(*(build_entry(questions) for questions in faqs))
+    finally:
+        await close_rextro_client()
+    entries = [entry for entry in entries if entry is not None]
+    write_entries(store_path, entries)
+    return {"faqs": len(faqs), "entries": len(entries), **counts, "seconds": time.perf_counter() - start}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute FAQ answers with the agent")
+    parser.add_argument("--questions", default=QUESTIONS_PATH, help="one FAQ per line, phrasings separated by ' | '")
+    parser.add_argument("--output", default=None, help="store file (default: FAQ_STORE_PATH)")
+    parser.add_argument("--rebuild", action="store_true", help="ask the agent again even for still-valid answers")
+    parser.add_argument("--concurrency", type=int, default=2, help="agent runs at a time")
+    args = parser.parse_args()
+    args.output = args.output or get_config().faq_store_path
+
+    stats = asyncio.run(build_store(args.questions, args.output, rebuild=args.rebuild, concurrency=args.concurrency))
+    print(f"FAQ store {args.output}: {stats['entries']}/{stats['faqs']} FAQs ({stats['answered']} answered, "
+          f"{stats['reused']} reused, {stats['failed']} failed) in {stats['seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .tool_cache import normalize_params
+
+# Set for the duration of one agent run; the run's tool calls inherit it
+prefetched_fetches: ContextVar[Optional["PrefetchedFetches"]] = ContextVar("prefetched_fetches", default=None)
+
+
+class PrefetchedFetches:
+    """
+    Rextro API fetches started speculatively for one agent run, before the
+    LLM has asked for them.
+
+    A tool call for the same path + params takes over the in-flight (or
+    finished) fetch instead of starting its own, so the fetch overlaps with
+    the first LLM turn. Each prefetch is handed over at most once; later
+    identical calls go through the tool response cache, which the prefetch
+    has warmed.
+    """
+
+    def __init__(self):
+        self._fetches: Dict[Tuple, asyncio.Task] = {}
+        self.started: List[Tuple] = []
+        self.used = 0
+
+    def start(self, path: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Awaitable[Tuple[Any, str]]]) -> None:
+        key = (path, normalize_params(params))
+        if key in self._fetches:
+            return
+        task = asyncio.ensure_future(fetch())
+        # Mark failures as retrieved even if no tool call ever claims the fetch
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._fetches[key] = task
+        self.started.append(key)
+
+    def take(self, path: str, params: Optional[Dict[str, Any]]) -> Optional[asyncio.Task]:
+        """Hands over the prefetch of `path` + `params` (a task resolving to `(value, status)`), or None."""
+        task = self._fetches.pop((path, normalize_params(params)), None)
+        if task is not None:
+            self.used += 1
+        return task
+
+    def unclaimed(self) -> Dict[Tuple, asyncio.Task]:
+        return dict(self._fetches)
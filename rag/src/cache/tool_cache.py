@@ -0,0 +1,236 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from src.state.store import StateStore
+
+SHARED_KEY_PREFIX = "tool:"
+
+
+def normalize_params(params: Optional[Dict[str, Any]]) -> Tuple:
+    """
+    Normalizes API request params into a hashable cache key.
+    None values are dropped, free-text queries are case/whitespace folded and
+    tags (list or comma-separated string) are de-duplicated and sorted.
+    """
+    normalized = []
+    for name, value in (params or {}).items():
+        if value is None or value == "":
+            continue
+        if name == "tags":
+            if isinstance(value, str):
+                value = value.split(",")
+            value = ",".join(sorted({str(tag).strip().lower() for tag in value if str(tag).strip()}))
+            if not value:
+                continue
+        elif name == "query":
+            value = " ".join(str(value).lower().split())
+        elif isinstance(value, str) and value.isdigit():
+            value = int(value)
+        normalized.append((name, value))
+    return tuple(sorted(normalized))
+
+
+class ToolResponseCache:
+    """
+    TTL + stale-while-revalidate cache for Rextro API responses.
+
+    - Fresh entries (younger than the endpoint TTL) are served directly.
+    - Stale entries (within `stale_seconds` past the TTL) are served
+      immediately while one background refresh runs.
+    - Missing or fully expired entries are fetched, with concurrent fetches of
+      the same key coalesced into one upstream call.
+    - If the upstream errors, the last known good response is served, however
+      old, and the error is only raised when there is nothing to fall back to.
+
+    Endpoints without a TTL are passed through uncached.
+
+    With a shared `store`, every fetched response is also written there (for
+    TTL + `stale_seconds`), and a lookup that finds no fresh local entry
+    adopts a newer one from the store first. Workers then mostly reuse each
+    other's fetches instead of each polling the API once per TTL. Local
+    entries stay the last-known-good fallback.
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        stale_seconds: float = 600.0,
+        max_entries: int = 1024,
+        store: Optional[StateStore] = None,
+    ):
+        self.ttls = ttls
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.store = store
+
+        # key -> (fetched_at, value)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.served_after_error = 0
+        self.shared_hits = 0
+        self.store_errors = 0
+
+    async def get(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        value, _ = await self.get_with_status(endpoint, params, fetch)
+        return value
+
+    async def get_with_status(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, str]:
+        """
+        Returns `(value, status)` where status is one of "hit", "stale",
+        "miss", "error_fallback" or "bypass" (endpoint not cached).
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return await fetch(), "bypass"
+
+        key = (endpoint, normalize_params(params))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if self.store is not None and (entry is None or now - entry[0] >= ttl):
+            entry = await self._adopt_shared(key, entry, now)
+
+        if entry is not None:
+            fetched_at, value = entry
+            age = now - fetched_at
+            if age < ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, "hit"
+            if age < ttl + self.stale_seconds:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch)
+                return value, "stale"
+
+        self.misses += 1
+        try:
+            return await asyncio.shield(self._fetch(key, fetch)), "miss"
+        except Exception as e:
+            entry = self._entries.get(key)
+            if entry is None:
+                raise
+            print(f"Rextro API error for {endpoint}, serving last known good response: {e}")
+            self.served_after_error += 1
+            return entry[1], "error_fallback"
+
+    def _fetch(self, key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _fetch_and_store(self, key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            await self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: Tuple, fetch: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+
+        async def refresh():
+            try:
+                await self._fetch(key, fetch)
+            except Exception as e:
+                # Keep serving the stale value; the next lookup retries
+                self.refresh_failures += 1
+                print(f"Background refresh failed for {key[0]}: {e}")
+
+        task = asyncio.ensure_future(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    def _put_local(self, key: Tuple, entry: Tuple[float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _store(self, key: Tuple, value: Any) -> None:
+        self._put_local(key, (time.monotonic(), value))
+        if self.store is not None:
+            try:
+                await self.store.call(
+                    self.store.set,
+                    self._shared_key(key),
+                    json.dumps({"fetched_at": time.time(), "value": value}),
+                    self.ttls[key[0]] + self.stale_seconds,
+                )
+            except self.store.errors as e:
+                self.store_errors += 1
+                print(f"Tool cache store error, response kept locally only: {e}")
+
+    @staticmethod
+    def _shared_key(key: Tuple) -> str:
+        return SHARED_KEY_PREFIX + json.dumps(key, separators=(",", ":"))
+
+    async def _adopt_shared(self, key: Tuple, entry: Optional[Tuple[float, Any]], now: float) -> Optional[Tuple[float, Any]]:
+        """Replaces a missing or outdated local entry with a newer one from the shared store."""
+        try:
+            raw = await self.store.call(self.store.get, self._shared_key(key))
+        except self.store.errors as e:
+            self.store_errors += 1
+            print(f"Tool cache store error, using local entries: {e}")
+            return entry
+        if raw is None:
+            return entry
+        shared = json.loads(raw)
+        # Wall-clock age, since other processes' monotonic clocks differ
+        fetched_at = now - max(0.0, time.time() - shared["fetched_at"])
+        if entry is not None and entry[0] >= fetched_at:
+            return entry
+        self.shared_hits += 1
+        entry = (fetched_at, shared["value"])
+        self._put_local(key, entry)
+        return entry
+
+    def peek(self, endpoint: str, params: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """Returns the last stored response for a request regardless of age, or None."""
+        entry = self._entries.get((endpoint, normalize_params(params)))
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttls": self.ttls,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "served_after_error": self.served_after_error,
+            "backend": self.store.backend if self.store is not None else "memory",
+            "shared_hits": self.shared_hits,
+            "store_errors": self.store_errors,
+        }
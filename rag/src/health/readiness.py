@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class UpstreamProbe:
+    """
+    Reachability check of an upstream dependency. The result is cached for
+    `interval_seconds` and concurrent callers share one in-flight probe, so a
+    load balancer polling every instance often doesn't multiply upstream
+    traffic.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[Any]],
+        interval_seconds: float = 10.0,
+        timeout_seconds: float = 2.0,
+    ):
+        self.probe = probe
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self) -> Dict[str, Any]:
+        if self._result is not None and time.monotonic() - self._checked_at < self.interval_seconds:
+            return self._result
+
+        async with self._lock:
+            if self._result is None or time.monotonic() - self._checked_at >= self.interval_seconds:
+                start = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self.probe(), timeout=self.timeout_seconds)
+                    result = {"ok": True}
+                except Exception as e:
+                    result = {"ok": False, "error": str(e) or type(e).__name__}
+                result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                self._result = result
+                self._checked_at = time.monotonic()
+        return self._result
+
+
+class ReadinessProbe:
+    """
+    Aggregates cheap in-process checks (each a callable returning a bool) and
+    an optional cached upstream probe into one readiness report. The upstream
+    only gates readiness when `require_upstream` is set; otherwise it is
+    reported but the instance stays in rotation, since every replica shares
+    the same upstream and pulling them all would not help.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], bool]],
+        upstream: Optional[UpstreamProbe] = None,
+        require_upstream: bool = False,
+        details: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        self.checks = checks
+        self.upstream = upstream
+        self.require_upstream = require_upstream
+        self.details = details
+
+    async def report(self) -> Tuple[bool, Dict[str, Any]]:
+        """Returns (ready, body) for the /readyz response."""
+        checks: Dict[str, Any] = {}
+        for name, check in self.checks.items():
+            try:
+                checks[name] = {"ok": bool(check())}
+            except Exception as e:
+                checks[name] = {"ok": False, "error": str(e) or type(e).__name__}
+        ready = all(result["ok"] for result in checks.values())
+
+        if self.upstream is not None:
+            # Only probe the upstream once the process itself is ready
+            if ready:
+                checks["upstream"] = {**await self.upstream.check(), "required": self.require_upstream}
+                if self.require_upstream:
+                    ready = checks["upstream"]["ok"]
+            else:
+                checks["upstream"] = {"ok": False, "error": "skipped", "required": self.require_upstream}
+
+        body: Dict[str, Any] = {"status": "ready" if ready else "not_ready", "checks": checks}
+        if self.details is not None:
+            body.update(self.details())
+        return ready, body
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+PAGE_SIZE = 4096
+
+
+def burn_cpu(cpu_ms: int) -> int:
+    """Spins the calling thread for `cpu_ms` of CPU time. Returns the loop count."""
+    deadline = time.thread_time() + cpu_ms / 1000
+    iterations = 0
+    result = 0
+    while time.thread_time() < deadline:
+        for i in range(10_000):
+            result += i % 7
+        iterations += 10_000
+    return iterations
+
+
+def touch_memory(memory_mb: int) -> int:
+    """
+    Allocates `memory_mb` MiB and writes one byte per page so the pages are
+    actually resident, then releases them. Returns the number of bytes touched.
+    """
+    size = memory_mb * 1024 * 1024
+    buffer = bytearray(size)
+    for offset in range(0, size, PAGE_SIZE):
+        buffer[offset] = 1
+    del buffer
+    return size
+
+
+async def run_synthetic_load(cpu_ms: int = 0, memory_mb: int = 0, io_ms: int = 0) -> dict:
+    """
+    Runs a calibrated amount of I/O wait, CPU and memory work for one request
+    and reports how long each phase took. CPU and memory work run in a worker
+    thread, as a blocking handler would.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    if io_ms:
+        await asyncio.sleep(io_ms / 1000)
+    timings["io_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if cpu_ms:
+        await asyncio.to_thread(burn_cpu, cpu_ms)
+    timings["cpu_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if memory_mb:
+        await asyncio.to_thread(touch_memory, memory_mb)
+    timings["memory_ms"] = (time.perf_counter() - start) * 1000
+
+    return {
+        "requested": {"cpu_ms": cpu_ms, "memory_mb": memory_mb, "io_ms": io_ms},
+        "elapsed_ms": {name: round(value, 1) for name, value in timings.items()},
+    }
@@ -0,0 +1,386 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and fixed-bucket histograms keyed by label values. An
+observation is a bisect into the bucket bounds plus a few additions under a
+lock (about 2 µs), so instrumentation stays on in production.
+
+Values are per process. With several workers (METRICS_MULTIPROCESS_DIR),
+each worker writes a JSON snapshot of its registry to the shared directory
+every few seconds and at shutdown, and /metrics merges the snapshots of all
+of them: counters and histograms are summed, including those of workers that
+have exited, and gauges are reported per live worker with a `worker` label.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond cache hits up to the 300 s agent timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# How often each worker writes its snapshot to METRICS_MULTIPROCESS_DIR
+SNAPSHOT_INTERVAL_SECONDS = 5.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        """A JSON-ready copy of the metric's series, merged across workers by merge_snapshots."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            values = [[list(key), value] for key, value in self._values.items()]
+        return {"kind": self.kind, "help": self.help_text, "labelnames": list(self.labelnames), "values": values}
+
+
+class Gauge(Metric):
+    """A gauge set directly, or read from `function` at scrape time."""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _current(self) -> List[Tuple[Tuple[str, ...], float]]:
+        if self.function is not None:
+            try:
+                return [((), float(self.function()))]
+            except Exception:
+                return []
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> List[str]:
+        values = self._current()
+        if self.function is not None and not values:
+            return []
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+    def snapshot(self) -> dict:
+        values = [[list(key), value] for key, value in self._current()]
+        return {"kind": self.kind, "help": self.help_text, "labelnames": list(self.labelnames), "values": values}
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+
+        lines = self.header()
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = [[list(key), list(series[0]), series[1], series[2]] for key, series in self._series.items()]
+        return {"kind": self.kind, "help": self.help_text, "labelnames": list(self.labelnames),
+                "buckets": list(self.buckets), "series": series}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        # Re-registering returns the existing metric, so module reloads are harmless
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        gauge = self._register(Gauge(name, help_text, labelnames, function))
+        if function is not None:
+            # The latest registration reads the live objects: spawned workers import
+            # main.py twice (as __mp_main__, then as main for uvicorn)
+            gauge.function = function
+        return gauge
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Every metric's current series; take it on the event loop, scrape-time gauges read live state."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+
+def write_snapshot(directory: str, snapshot: Dict[str, dict]) -> None:
+    """Writes this process's snapshot to `directory`, replacing the previous one atomically."""
+    path = _snapshot_path(directory, os.getpid())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(temporary, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_snapshots(snapshots: Dict[int, Dict[str, dict]], live: Sequence[int]) -> str:
+    """
+    Prometheus text for the snapshots of several processes, keyed by pid.
+    Counters and histogram series with the same labels are summed over all
+    of them; gauges of the `live` processes get a `worker` label.
+    """
+    merged: Dict[str, Metric] = {}
+    for pid, snapshot in sorted(snapshots.items()):
+        for name, data in snapshot.items():
+            labelnames = tuple(data["labelnames"])
+            if data["kind"] == "counter":
+                metric = merged.setdefault(name, Counter(name, data["help"], labelnames))
+                for key, value in data["values"]:
+                    metric._values[tuple(key)] = metric._values.get(tuple(key), 0.0) + value
+            elif data["kind"] == "gauge":
+                metric = merged.setdefault(name, Gauge(name, data["help"], labelnames + ("worker",)))
+                if pid in live:
+                    for key, value in data["values"]:
+                        metric._values[tuple(key) + (str(pid),)] = value
+            elif data["kind"] == "histogram":
+                metric = merged.setdefault(name, Histogram(name, data["help"], labelnames, data["buckets"]))
+                for key, counts, total, count in data["series"]:
+                    series = metric._series.get(tuple(key))
+                    if series is None:
+                        series = metric._series[tuple(key)] = [[0] * len(counts), 0.0, 0]
+                    series[0] = [a + b for a, b in zip(series[0], counts)]
+                    series[1] += total
+                    series[2] += count
+    lines: List[str] = []
+    for metric in merged.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def render_multiprocess(directory: str, snapshot: Dict[str, dict]) -> str:
+    """
+    Writes this process's fresh `snapshot`, then merges it with the latest
+    snapshots of the other workers in `directory`. Blocking: run it in a thread.
+    """
+    write_snapshot(directory, snapshot)
+    snapshots: Dict[int, Dict[str, dict]] = {}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            pid = int(os.path.splitext(os.path.basename(path))[0])
+            with open(path, encoding="utf-8") as f:
+                snapshots[pid] = json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"Skipping metrics snapshot {path}: {e}")
+    return merge_snapshots(snapshots, [pid for pid in snapshots if _alive(pid)])
+
+
+# Process-wide registry rendered by GET /metrics
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "rag_http_request_duration_seconds", "End-to-end HTTP request latency, until the last body byte",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge("rag_http_requests_in_flight", "HTTP requests being served")
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "rag_admission_wait_seconds", "Time agent runs waited for an admission slot", ("outcome",),
+)
+ADMISSION_SHED = registry.counter(
+    "rag_admission_shed_total", "Agent runs rejected with 503 by admission control", ("reason",),
+)
+AGENT_RUN_SECONDS = registry.histogram(
+    "rag_agent_run_duration_seconds", "Agent run latency including retries", ("mode", "outcome"),
+)
+AGENT_RETRIES = registry.counter(
+    "rag_agent_retries_total", "Agent attempts retried after a transient error", ("error",),
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "rag_llm_call_duration_seconds", "LLM round-trip latency (chat turns and structured-output passes)",
+    ("kind",),
+)
+TOOL_CALL_SECONDS = registry.histogram(
+    "rag_tool_call_duration_seconds", "Tool call latency by tool and Rextro API cache result",
+    ("tool", "cache"),
+)
+PARSE_OUTPUT_SECONDS = registry.histogram(
+    "rag_agent_parse_output_seconds", "Time to extract the KnowledgeResponse from the agent output",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+CIRCUIT_BREAKER_STATE = registry.gauge(
+    "rag_circuit_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open", ("breaker",),
+)
+CIRCUIT_BREAKER_TRANSITIONS = registry.counter(
+    "rag_circuit_breaker_transitions_total", "Circuit breaker state changes", ("breaker", "state"),
+)
+CIRCUIT_BREAKER_REJECTED = registry.counter(
+    "rag_circuit_breaker_rejected_total", "Calls failed fast because their circuit breaker was open", ("breaker",),
+)
+LLM_ATTEMPTS = registry.counter(
+    "rag_llm_attempts_total", "Gemini call attempts by model and outcome (ok, error, timeout, rejected)",
+    ("model", "outcome"),
+)
+LLM_HEDGES = registry.counter(
+    "rag_llm_hedged_calls_total", "Gemini calls that started a hedged second attempt, by which attempt won",
+    ("winner",),
+)
+TOOL_PREFETCHES = registry.counter(
+    "rag_tool_prefetches_total", "Speculative Rextro API fetches by path and whether a tool call used them",
+    ("path", "outcome"),
+)
+DEGRADED_ANSWERS = registry.counter(
+    "rag_degraded_answers_total",
+    "Agent runs that failed and were answered from the last known good answer or with an apology",
+    ("source",),
+)
+REXTRO_MIRROR_ITEMS = registry.gauge(
+    "rag_rextro_mirror_items", "Items held by the local Rextro API mirror", ("collection",),
+)
+REXTRO_MIRROR_SYNCS = registry.counter(
+    "rag_rextro_mirror_syncs_total", "Rextro mirror syncs by collection, mode (full, delta) and outcome",
+    ("collection", "mode", "outcome"),
+)
+FAQ_LOOKUPS = registry.counter(
+    "rag_faq_lookups_total", "FAQ store lookups: hit, miss, or stale (matched but its sources changed)", ("outcome",),
+)
+EVENT_LOOP_LAG = registry.histogram(
+    "rag_event_loop_lag_seconds", "How late the event-loop watchdog's ticker woke up (LOOP_WATCHDOG_ENABLED)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+EVENT_LOOP_BLOCKS = registry.counter(
+    "rag_event_loop_blocks_total", "Times the event loop was blocked longer than LOOP_WATCHDOG_THRESHOLD_SECONDS",
+)
@@ -0,0 +1,327 @@
+"""
+On-demand, in-process profiling for the admin endpoints (PROFILING_ENABLED)
+and the event-loop watchdog (LOOP_WATCHDOG_ENABLED). Nothing here runs, and
+tracemalloc stays off, until an endpoint or the config starts it.
+
+- SamplingProfiler: a background thread samples every thread's Python stack
+  with sys._current_frames() for a fixed time and returns collapsed stacks
+  ("frame;frame;frame count" lines, the input of flamegraph.pl and speedscope).
+- AllocationTracker: starts and stops tracemalloc and reports the top
+  allocation sites of a snapshot, and the change since the previous one.
+- LoopWatchdog: a ticker task measures event-loop lag; a watchdog thread
+  grabs the loop thread's stack when the loop has not ticked for longer than
+  a threshold, i.e. while a coroutine blocks it.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Deque, List, Optional
+
+from src.observability.metrics import EVENT_LOOP_BLOCKS, EVENT_LOOP_LAG
+
+# Leaf frames of threads that are only waiting, dropped unless idle samples are asked for
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    # Executor threads (asyncio.to_thread) between work items
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever"),
+}
+
+_PATH_PREFIXES = sorted({p for p in sys.path if p and os.path.isdir(p)} | {os.getcwd()}, key=len, reverse=True)
+
+
+def _short_path(path: str) -> str:
+    """`path` relative to its sys.path entry (or the working directory), so frames read as module paths."""
+    for prefix in _PATH_PREFIXES:
+        if path.startswith(prefix + os.sep):
+            return path[len(prefix) + 1:]
+    return path
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+
+
+def stack_of(frame, limit: int = 64) -> List[str]:
+    """Labels of `frame` and its callers, outermost first."""
+    stack = []
+    while frame is not None and len(stack) < limit:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread at a fixed interval for a fixed time; one profile at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+
+    def _sample(self, seconds: float, interval: float, include_idle: bool) -> dict:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not include_idle and _is_idle(frame)):
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                thread = names.get(ident, f"thread-{ident}")
+                stacks[";".join([thread] + stack_of(frame))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {"stacks": stacks, "samples": samples, "seconds": round(time.perf_counter() - start, 3)}
+
+    async def profile(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> dict:
+        """
+        Samples for `seconds` from a background thread and returns the
+        collapsed stack counts, the number of sampling rounds and the time
+        it actually took. Raises ProfilerBusy if a profile is running.
+        """
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy("A profile is already running")
+            self.running = True
+        try:
+            return await asyncio.to_thread(self._sample, seconds, interval, include_idle)
+        finally:
+            self.running = False
+
+
+def collapsed(stacks: Counter) -> str:
+    """Collapsed stack text, heaviest stacks first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def top_frames(stacks: Counter, top: int = 20) -> List[dict]:
+    """The `top` leaf frames by samples (self time), with their share of all samples."""
+    leaves: Counter = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    total = sum(leaves.values()) or 1
+    return [{"frame": frame, "samples": count, "share": round(count / total, 4)}
+            for frame, count in leaves.most_common(top)]
+
+
+class AllocationTrackingOff(RuntimeError):
+    """Raised for a snapshot while tracemalloc is not tracing."""
+
+
+# Allocations made by tracemalloc itself and by imports are noise in every snapshot
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class AllocationTracker:
+    """tracemalloc control, and snapshots compared with the previous one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> dict:
+        """Starts tracing with `frames` frames per allocation (restarting it when the depth changes)."""
+        with self._lock:
+            if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+                tracemalloc.stop()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._previous = None
+        return self.status()
+
+    def stop(self) -> dict:
+        """Stops tracing and frees its memory, including the kept snapshot."""
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+        return self.status()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def snapshot(self, top: int = 20, group_by: str = "lineno") -> dict:
+        """
+        Top allocation sites now (`group_by` lineno, filename or traceback)
+        and, from the second snapshot on, the sites that grew the most since
+        the previous one. Blocking: run it in a thread.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise AllocationTrackingOff("tracemalloc is not tracing; start it first")
+            snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+            previous, self._previous = self._previous, snapshot
+
+        report = self.status()
+        report["top"] = [
+            {"site": self._site(stat.traceback, group_by), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:top]
+        ]
+        report["diff"] = None if previous is None else [
+            {
+                "site": self._site(stat.traceback, group_by),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+                "size_kb": round(stat.size / 1024, 1),
+            }
+            for stat in snapshot.compare_to(previous, group_by)[:top]
+        ]
+        return report
+
+    @staticmethod
+    def _site(traceback: tracemalloc.Traceback, group_by: str):
+        frames = [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in traceback]
+        if group_by == "traceback":
+            return frames
+        return frames[0] if group_by == "lineno" else _short_path(traceback[0].filename)
+
+
+class LoopWatchdog:
+    """
+    Event-loop lag and blocked-loop stacks. A ticker task sleeps `interval`
+    and records how late it wakes (rag_event_loop_lag_seconds); a thread
+    checks the ticker's heartbeat and, once the loop has been stuck for
+    `threshold`, records the loop thread's stack while it is still blocking.
+    """
+
+    def __init__(self, max_blocks: int = 20, max_lags: int = 2000):
+        self.interval = 0.05
+        self.threshold = 0.1
+        self.lags: Deque[float] = deque(maxlen=max_lags)
+        self.blocks: Deque[dict] = deque(maxlen=max_blocks)
+        self.blocks_total = 0
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._loop_thread: Optional[int] = None
+        self._heartbeat = 0.0
+        self._open_block: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, interval: float = 0.05, threshold: float = 0.1) -> None:
+        """Starts watching the running event loop. No-op if already running."""
+        if self._task is not None:
+            return
+        self.interval = interval
+        self.threshold = threshold
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"Event-loop watchdog: lag every {interval * 1000:.0f} ms, stacks of blocks over {threshold * 1000:.0f} ms")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            # From the previous heartbeat, so a block before the first tick counts too
+            lag = max(0.0, now - self._heartbeat - self.interval)
+            with self._lock:
+                self._heartbeat = now
+                block, self._open_block = self._open_block, None
+            self.lags.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+            if block is not None:
+                # The loop is free again: the stack was taken mid-block, the length is known now
+                block["blocked_ms"] = round(lag * 1000, 1)
+
+    def _watch(self) -> None:
+        check = min(self.threshold / 2, 0.05)
+        reported = 0.0
+        while not self._stop.wait(check):
+            # Clock first: a heartbeat read after a GIL wait can only be newer, never make the loop look stuck
+            now = time.perf_counter()
+            heartbeat = self._heartbeat
+            stuck = now - heartbeat - self.interval
+            if stuck < self.threshold or heartbeat == reported:
+                continue
+            # One stack per blocked stretch
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = stack_of(frame) if frame is not None else []
+            with self._lock:
+                if self._heartbeat != heartbeat:
+                    # The loop moved on meanwhile, so the stack may not be the blocking one
+                    continue
+                block = {"at": time.time(), "blocked_ms": None, "stack": stack}
+                self._open_block = block
+            self.blocks.append(block)
+            self.blocks_total += 1
+            EVENT_LOOP_BLOCKS.inc()
+
+    def stats(self) -> dict:
+        lags = sorted(self.lags)
+
+        def pct(q: float) -> float:
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 2) if lags else 0.0
+
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 1),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "lag_ms": {"p50": pct(0.50), "p99": pct(0.99), "max": round(lags[-1] * 1000, 2) if lags else 0.0,
+                       "samples": len(lags)},
+            "blocks_total": self.blocks_total,
+            # Most recent first
+            "blocks": list(reversed(self.blocks)),
+        }
+
+
+# Process-wide instances used by the admin endpoints and startup
+sampling_profiler = SamplingProfiler()
+allocation_tracker = AllocationTracker()
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,105 @@
+import functools
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatStartEvent,
+    LLMStructuredPredictEndEvent,
+    LLMStructuredPredictStartEvent,
+)
+
+from .metrics import LLM_CALL_SECONDS, TOOL_CALL_SECONDS
+
+# Id of the HTTP request being served; workflow tasks and tool calls inherit it
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# Filled in by the Rextro API client while a tool call is running
+_tool_call_info: ContextVar[Optional[Dict[str, str]]] = ContextVar("tool_call_info", default=None)
+# Set by callers that need to know which tools a run called (e.g. the FAQ store builder)
+tools_called: ContextVar[Optional[List[str]]] = ContextVar("tools_called", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id() -> str:
+    return request_id_var.get()
+
+
+def record_cache_status(status: str) -> None:
+    """Notes the Rextro API cache result for the tool call in progress, if any."""
+    info = _tool_call_info.get()
+    if info is not None:
+        info["cache"] = status
+
+
+def instrument_tool(tool_name: str) -> Callable:
+    """
+    Times an async tool function into rag_tool_call_duration_seconds,
+    labelled with the cache result its Rextro API call reported ("none" for
+    tools that don't call the API).
+    """
+    def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            info = {"cache": "none"}
+            called = tools_called.get()
+            if called is not None:
+                called.append(tool_name)
+            token = _tool_call_info.set(info)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                TOOL_CALL_SECONDS.observe(time.perf_counter() - start, tool=tool_name, cache=info["cache"])
+                _tool_call_info.reset(token)
+        return wrapper
+    return decorator
+
+
+class LLMTimingHandler(BaseEventHandler):
+    """
+    Times LLM round-trips from llama_index instrumentation events. Start and
+    end events of one call share a span id; streamed chats end when the last
+    chunk has been read.
+    """
+
+    _started: Dict[str, float] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMTimingHandler"
+
+    def handle(self, event: Any, **kwargs: Any) -> None:
+        if isinstance(event, (LLMChatStartEvent, LLMStructuredPredictStartEvent)):
+            if event.span_id:
+                if len(self._started) > 10_000:
+                    # Calls abandoned without an end event; don't let them accumulate
+                    self._started.clear()
+                self._started[f"{type(event).__name__}:{event.span_id}"] = time.perf_counter()
+        elif isinstance(event, LLMChatEndEvent):
+            self._finish(f"LLMChatStartEvent:{event.span_id}", "chat")
+        elif isinstance(event, LLMStructuredPredictEndEvent):
+            self._finish(f"LLMStructuredPredictStartEvent:{event.span_id}", "structured_predict")
+
+    def _finish(self, key: str, kind: str) -> None:
+        start = self._started.pop(key, None)
+        if start is not None:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, kind=kind)
+
+
+_llm_handler: Optional[LLMTimingHandler] = None
+
+
+def install_llm_instrumentation() -> None:
+    """Registers the LLM timing handler on the root llama_index dispatcher (once)."""
+    global _llm_handler
+    if _llm_handler is None:
+        _llm_handler = LLMTimingHandler()
+        get_dispatcher().add_event_handler(_llm_handler)
@@ -0,0 +1,204 @@
+"""
+Record/replay cassettes for the upstream calls an /ask makes: Gemini chat turns
+and structured-output passes, and Rextro API requests.
+
+CASSETTE_MODE=record passes every call through and appends it to
+CASSETTE_PATH (JSON lines): a key derived from the request, the response, and
+its timings (time to the response, or to each chunk of a streamed answer).
+CASSETTE_MODE=replay serves the recorded responses without any network,
+after the recorded delays (CASSETTE_LATENCY=original) or immediately
+(CASSETTE_LATENCY=zero). Identical requests recorded several times are
+replayed in order, cycling, so one recorded conversation can be replayed by
+any number of concurrent clients. A request that was never recorded raises
+CassetteMiss.
+
+The Gemini side is wired in by src/agent/gemini_cassette.py, below the
+resilience layer so deadlines and retries behave as they do live; the Rextro
+side is an httpx transport used by the shared Rextro API client.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config.config import get_config
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_OFF, MODE_RECORD, MODE_REPLAY)
+
+LATENCY_ORIGINAL = "original"
+LATENCY_ZERO = "zero"
+
+# Seconds of recorded upstream latency replayed for the current request, when a
+# caller (e.g. a benchmark) wants to subtract it; a one-item list so tasks share it
+replayed_wait: ContextVar[Optional[List[float]]] = ContextVar("replayed_wait", default=None)
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request the cassette has no recording of."""
+
+
+def request_key(kind: str, request: Any) -> str:
+    """Stable key of a request: a hash of its kind and canonical JSON form."""
+    canonical = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class Interaction:
+    """One recorded upstream call."""
+    kind: str
+    key: str
+    # Short description of the request, for people reading the cassette
+    summary: str
+    response: Any
+    # Seconds from the start of the call to the response (or to each streamed chunk)
+    timings: List[float] = field(default_factory=list)
+
+
+class Cassette:
+    """The recorded interactions of one cassette file, and the replay position of each key."""
+
+    def __init__(self, path: str, mode: str = MODE_REPLAY, latency: str = LATENCY_ORIGINAL):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected record or replay")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._interactions: Dict[str, List[Interaction]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == MODE_REPLAY:
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = Interaction(**json.loads(line))
+                    self._interactions[interaction.key].append(interaction)
+        print(f"Replaying {sum(map(len, self._interactions.values()))} recorded calls from {self.path}")
+
+    def record(self, interaction: Interaction) -> None:
+        """Appends one interaction to the cassette file."""
+        line = json.dumps(asdict(interaction), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def play(self, kind: str, key: str, summary: str = "") -> Interaction:
+        """The next recording of `key` (cycling through repeats). Raises CassetteMiss."""
+        with self._lock:
+            recordings = self._interactions.get(key)
+            if not recordings:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded {kind} call for {summary or key} in {self.path}")
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.replayed += 1
+        return recordings[position % len(recordings)]
+
+    async def wait_until(self, start: float, offset: float) -> None:
+        """Sleeps until `offset` recorded seconds after `start` (perf_counter), or just yields with zero latency."""
+        if self.latency == LATENCY_ZERO:
+            await asyncio.sleep(0)
+            return
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            waited = replayed_wait.get()
+            if waited is not None:
+                waited[0] += delay
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "latency": self.latency,
+            "path": self.path,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records through `inner`, or replays, via a cassette."""
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        summary = f"{request.method} {request.url.path}?{request.url.query.decode()}"
+        key = request_key("http", {
+            "method": request.method,
+            "path": request.url.path,
+            "params": sorted(request.url.params.multi_items()),
+        })
+        start = time.perf_counter()
+        if self.cassette.replaying:
+            interaction = self.cassette.play("http", key, summary)
+            await self.cassette.wait_until(start, interaction.timings[0] if interaction.timings else 0.0)
+            recorded = interaction.response
+            return httpx.Response(recorded["status"], headers=recorded["headers"],
+                                  content=recorded["body"].encode("utf-8"), request=request)
+
+        response = await self.inner.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        # The body was decoded above, so any content-encoding no longer applies
+        headers = {"content-type": response.headers.get("content-type", "application/json")}
+        self.cassette.record(Interaction(
+            kind="http",
+            key=key,
+            summary=summary,
+            response={"status": response.status_code, "headers": headers, "body": body.decode("utf-8", "replace")},
+            timings=[round(time.perf_counter() - start, 6)],
+        ))
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        if self.inner is not None:
+            await self.inner.aclose()
+
+
+# Process-wide cassette from CASSETTE_MODE / CASSETTE_PATH, created on first use
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The configured cassette, or None when CASSETTE_MODE is off."""
+    global _cassette
+    config = get_config()
+    if config.cassette_mode == MODE_OFF:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(config.cassette_path, mode=config.cassette_mode, latency=config.cassette_latency)
+        return _cassette
@@ -0,0 +1,139 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from config.config import get_config
+from src.observability.metrics import CIRCUIT_BREAKER_REJECTED, CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_TRANSITIONS
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, breaker: str, retry_after: float):
+        super().__init__(f"circuit breaker '{breaker}' is open; retry in {retry_after:.0f}s")
+        self.breaker = breaker
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream.
+
+    - closed: calls go through; `failure_threshold` failures in a row open it.
+    - open: calls are refused (`allow()` is False) for `reset_seconds`, so
+      requests fail fast instead of waiting on a browned-out upstream.
+    - half_open: after that, one probe call at a time is let through; a
+      success closes the breaker, a failure opens it for another period.
+
+    Callers report outcomes with `record_success` / `record_failure`. Only
+    upstream failures (timeouts, connection errors, 5xx, 429) should count:
+    a 4xx means the upstream is up. State is per process.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_inflight = False
+        self._lock = threading.Lock()
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        CIRCUIT_BREAKER_STATE.set(0, breaker=name)
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        print(f"Circuit breaker '{self.name}' is now {state}")
+        CIRCUIT_BREAKER_STATE.set(_STATE_VALUES[state], breaker=self.name)
+        CIRCUIT_BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through (0 when not open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """True when a call may go to the upstream now. Counts refusals."""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_inflight:
+                self._probe_inflight = True
+                return True
+            self.rejected += 1
+        CIRCUIT_BREAKER_REJECTED.inc(breaker=self.name)
+        return False
+
+    def check(self) -> None:
+        """Like `allow`, but raises CircuitOpenError when the call is refused."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_inflight = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._probe_inflight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def release(self) -> None:
+        """Frees a half-open probe slot when the call ended without an upstream verdict (e.g. cancelled)."""
+        with self._lock:
+            self._probe_inflight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": round(self.retry_after(), 1),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+# Process-wide breakers by upstream name, e.g. "gemini:models/gemini-2.5-flash" or "rextro:/zones"
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, failure_threshold: Optional[int] = None, reset_seconds: Optional[float] = None) -> CircuitBreaker:
+    """Returns the breaker for `name`, creating it (with config defaults) on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            config = get_config()
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=failure_threshold or config.breaker_failure_threshold,
+                reset_seconds=reset_seconds or config.breaker_reset_seconds,
+            )
+        return breaker
+
+
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        return {name: breaker.stats() for name, breaker in _breakers.items()}
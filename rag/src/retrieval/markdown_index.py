@@ -0,0 +1,154 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the this to what when where which who will with you your".split()
+)
+
+
+@dataclass
+class Section:
+    """A markdown section: one heading and the text up to the next heading."""
+    source: str
+    headings: List[str]
+    text: str
+
+    @property
+    def title(self) -> str:
+        return " > ".join(self.headings)
+
+    def render(self) -> str:
+        return f"### {self.title}\n{self.text}" if self.headings else self.text
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_markdown_sections(text: str, source: str = "") -> List[Section]:
+    """
+    Splits markdown into sections by its heading hierarchy. Each section keeps
+    the full heading trail (e.g. "Event Details > Venue") so it reads on its
+    own. Headings with no body of their own are not emitted; their titles
+    still appear in the trail of their subsections.
+    """
+    sections: List[Section] = []
+    trail: List[Tuple[int, str]] = []
+    body: List[str] = []
+    in_code_block = False
+
+    def flush():
+        content = "\n".join(body).strip()
+        if content:
+            sections.append(Section(source=source, headings=[title for _, title in trail], text=content))
+        body.clear()
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code_block = not in_code_block
+        match = None if in_code_block else _HEADING_RE.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while trail and trail[-1][0] >= level:
+                trail.pop()
+            trail.append((level, match.group(2)))
+        else:
+            body.append(line)
+    flush()
+    return sections
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over markdown sections."""
+
+    def __init__(self, sections: List[Section], k1: float = 1.5, b: float = 0.75):
+        self.sections = sections
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._doc_lengths: List[int] = []
+        for doc_id, section in enumerate(sections):
+            # Heading words describe the whole section, so they count twice
+            tokens = tokenize(section.text) + 2 * tokenize(" ".join(section.headings))
+            self._doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self._postings[term].append((doc_id, freq))
+
+        count = len(sections)
+        self._avg_length = sum(self._doc_lengths) / count if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[float, Section]]:
+        """Returns up to `top_k` (score, section) pairs with a positive score, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, freq in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / self._avg_length)
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [(score, self.sections[doc_id]) for doc_id, score in ranked]
+
+
+class MarkdownIndex:
+    """
+    BM25 section index over one markdown file that rebuilds itself when the
+    file changes. Every lookup stats the file; the content is only re-read and
+    hashed when size or mtime moved, and re-indexed only if the hash differs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index: Optional[BM25Index] = None
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._content_hash: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> BM25Index:
+        """Returns the current index, rebuilding it first if the file changed."""
+        stat = os.stat(self.path)
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        if self._index is not None and stat_key == self._stat_key:
+            return self._index
+
+        with self._lock:
+            if self._index is None or stat_key != self._stat_key:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                if self._index is None or content_hash != self._content_hash:
+                    self._index = BM25Index(split_markdown_sections(content, source=self.path))
+                    self._content_hash = content_hash
+                    print(f"Indexed {len(self._index.sections)} sections from {self.path}")
+                self._stat_key = stat_key
+        return self._index
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[float, Section]]:
+        return self.refresh().search(query, top_k)
+
+    @property
+    def sections(self) -> List[Section]:
+        return self.refresh().sections
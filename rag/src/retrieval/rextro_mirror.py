@@ -0,0 +1,374 @@
+"""
+In-memory mirror of the Rextro API sessions and zones.
+
+One exhibition's dataset is small, so a background task copies all of it
+into memory and `search_rextro_sessions` / `get_zones` are answered locally:
+an inverted index over titles and descriptions for the free-text query,
+a tag index for the tag filter, and presorted orders for the sort fields.
+A lookup takes microseconds and is paged like the API (`page`, `limit` and
+a `pagination` block with the total), so the tools answer the same shape
+whether the mirror or the API served them; a later page is another cheap
+local lookup rather than another API request.
+
+Syncing (REXTRO_MIRROR_ENABLED):
+- The first sync, and one every REXTRO_MIRROR_FULL_SYNC_SECONDS, pages
+  through the whole collection.
+- In between, every REXTRO_MIRROR_SYNC_SECONDS a delta sync reads the
+  collection newest-`updatedAt` first and stops at the first page that
+  reaches items the mirror already has, usually after a single request.
+  Changed items are merged by `_id`. When the API's total no longer matches
+  the mirror (an item was deleted), a full sync runs instead.
+- Indexes are rebuilt only when something changed and are swapped in as a
+  whole, so lookups never see a half-built index.
+
+Until the first sync succeeds, and whenever the mirror is disabled, the
+tools call the API as before.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config.config import get_config
+from src.observability.metrics import REXTRO_MIRROR_ITEMS, REXTRO_MIRROR_SYNCS
+from .markdown_index import tokenize
+
+# (path, params) -> decoded JSON body
+FetchPage = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+# Query terms at least this long also match words they prefix ("robot" finds "robotics")
+MIN_PREFIX_LENGTH = 3
+# Stops a full sync from paging forever if the API ignores `page`
+MAX_SYNC_PAGES = 1000
+
+
+def _item_key(item: dict) -> str:
+    key = item.get("_id") or item.get("id")
+    return str(key) if key is not None else json.dumps(item, sort_keys=True, default=str)
+
+
+def _sort_value(item: dict, field: str) -> str:
+    # The API compares sort fields as strings (ISO timestamps sort correctly that way)
+    value = item.get(field)
+    return "" if value is None else str(value)
+
+
+def _page_items(body: Any) -> Tuple[List[dict], Optional[int]]:
+    """The items of one API page and the collection total, when the response has one."""
+    if isinstance(body, list):
+        return body, None
+    if not isinstance(body, dict):
+        return [], None
+    items = body.get("data") or []
+    pagination = body.get("pagination") or {}
+    total = pagination.get("total", body.get("total"))
+    return list(items), int(total) if total is not None else None
+
+
+@dataclass(frozen=True)
+class _Index:
+    """Immutable search structures over one snapshot of a collection."""
+    docs: List[dict]
+    postings: Dict[str, Set[int]]
+    # Sorted indexed terms, for prefix matches by bisection
+    vocabulary: List[str]
+    tags: Dict[str, Set[int]]
+    # Doc ids in ascending order of each sort field
+    orders: Dict[str, List[int]]
+
+    @classmethod
+    def build(cls, docs: List[dict], text_fields: Iterable[str], sort_fields: Iterable[str]) -> "_Index":
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        tags: Dict[str, Set[int]] = defaultdict(set)
+        for doc_id, item in enumerate(docs):
+            text = " ".join(str(item.get(field) or "") for field in text_fields)
+            for term in set(tokenize(text)):
+                postings[term].add(doc_id)
+            for tag in item.get("tags") or []:
+                tags[str(tag).lower()].add(doc_id)
+        orders = {
+            field: sorted(range(len(docs)), key=lambda doc_id: _sort_value(docs[doc_id], field))
+            for field in sort_fields
+        }
+        return cls(docs, dict(postings), sorted(postings), dict(tags), orders)
+
+    def matching(self, term: str) -> Set[int]:
+        """Docs containing `term`, or (for longer terms) a word starting with it."""
+        if len(term) < MIN_PREFIX_LENGTH:
+            return self.postings.get(term, set())
+        matches: Set[int] = set()
+        start = bisect.bisect_left(self.vocabulary, term)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            matches |= self.postings[word]
+        return matches
+
+    def order(self, field: str) -> List[int]:
+        order = self.orders.get(field)
+        if order is None:
+            order = sorted(range(len(self.docs)), key=lambda doc_id: _sort_value(self.docs[doc_id], field))
+        return order
+
+
+class MirroredCollection:
+    """One mirrored Rextro API collection (e.g. /zones) and its indexes."""
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        text_fields: Tuple[str, ...],
+        sort_fields: Tuple[str, ...],
+        page_size: int = 100,
+    ):
+        self.name = name
+        self.path = path
+        self.text_fields = text_fields
+        self.sort_fields = sort_fields
+        self.page_size = page_size
+        self._items: Dict[str, dict] = {}
+        self._index = _Index.build([], text_fields, sort_fields)
+        # Newest `updatedAt` in the mirror; delta syncs read back to it
+        self.watermark = ""
+        # Hash of the mirrored items; answers derived from them (the FAQ store) record it
+        self.content_hash = ""
+        self.synced = False
+        self.last_sync_at = 0.0
+        self.last_full_sync_at = 0.0
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.changes = 0
+        self.requests = 0
+        self.lookups = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def _fetch(self, fetch: FetchPage, page: int, sort_by: str, sort_order: str) -> Tuple[List[dict], Optional[int]]:
+        self.requests += 1
+        body = await fetch(self.path, {"page": page, "limit": self.page_size, "sortBy": sort_by, "sortOrder": sort_order})
+        return _page_items(body)
+
+    async def sync(self, fetch: FetchPage, full: bool = False) -> dict:
+        """
+        Brings the mirror up to date with the API. Runs a full sync when asked,
+        before the first successful sync and when items carry no `updatedAt`;
+        a delta sync otherwise. Returns what the sync did.
+        """
+        mode = "full" if full or not self.synced or not self.watermark else "delta"
+        try:
+            changed = await (self._full_sync(fetch) if mode == "full" else self._delta_sync(fetch))
+        except Exception:
+            REXTRO_MIRROR_SYNCS.inc(collection=self.name, mode=mode, outcome="error")
+            raise
+        if changed is None:
+            # The delta could not account for the API's total; start over
+            mode = "full"
+            changed = await self._full_sync(fetch)
+        REXTRO_MIRROR_SYNCS.inc(collection=self.name, mode=mode, outcome="changed" if changed else "unchanged")
+        self.last_sync_at = time.time()
+        self.synced = True
+        return {"collection": self.name, "mode": mode, "changed": changed, "items": len(self._items)}
+
+    async def _full_sync(self, fetch: FetchPage) -> int:
+        items: Dict[str, dict] = {}
+        for page in range(1, MAX_SYNC_PAGES + 1):
+            batch, total = await self._fetch(fetch, page, "createdAt", "asc")
+            for item in batch:
+                items[_item_key(item)] = item
+            if len(batch) < self.page_size or (total is not None and page * self.page_size >= total):
+                break
+        changed = sum(1 for key, item in items.items() if self._items.get(key) != item)
+        changed += sum(1 for key in self._items if key not in items)
+        if changed or not self.synced:
+            self._replace(items)
+        self.full_syncs += 1
+        self.last_full_sync_at = time.time()
+        return changed
+
+    async def _delta_sync(self, fetch: FetchPage) -> Optional[int]:
+        """Merges items updated since the watermark. None when a full sync is needed."""
+        updated: Dict[str, dict] = {}
+        total = None
+        for page in range(1, MAX_SYNC_PAGES + 1):
+            batch, total = await self._fetch(fetch, page, "updatedAt", "desc")
+            for item in batch:
+                if _sort_value(item, "updatedAt") >= self.watermark and self._items.get(_item_key(item)) != item:
+                    updated[_item_key(item)] = item
+            # Items are newest first: once a page reaches the watermark, the rest are known
+            reached = any(_sort_value(item, "updatedAt") <= self.watermark for item in batch)
+            if reached or len(batch) < self.page_size:
+                break
+        self.delta_syncs += 1
+        new_keys = sum(1 for key in updated if key not in self._items)
+        if total is not None and total != len(self._items) + new_keys:
+            return None
+        if updated:
+            self._replace({**self._items, **updated})
+        return len(updated)
+
+    def _replace(self, items: Dict[str, dict]) -> None:
+        self._index = _Index.build(list(items.values()), self.text_fields, self.sort_fields)
+        self._items = items
+        self.watermark = max((_sort_value(item, "updatedAt") for item in items.values()), default="")
+        canonical = json.dumps([items[key] for key in sorted(items)], sort_keys=True, default=str)
+        self.content_hash = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        self.changes += 1
+        REXTRO_MIRROR_ITEMS.set(len(items), collection=self.name)
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        sort_by: Optional[str] = None,
+        sort_order: str = "desc",
+    ) -> List[dict]:
+        """
+        Every item matching `query` and `tags`, sorted by `sort_by`. Items must
+        contain all query terms; if none does, those matching the most terms
+        are returned. Tags match any of the given tags.
+        """
+        self.lookups += 1
+        index = self._index
+        candidates: Optional[Set[int]] = None
+        terms = tokenize(query or "")
+        if terms:
+            matches = [index.matching(term) for term in terms]
+            candidates = set.intersection(*matches)
+            if not candidates:
+                counts = Counter(doc_id for match in matches for doc_id in match)
+                best = max(counts.values(), default=0)
+                candidates = {doc_id for doc_id, count in counts.items() if count == best}
+        if tags:
+            tagged = set().union(*(index.tags.get(tag.strip().lower(), set()) for tag in tags))
+            candidates = tagged if candidates is None else candidates & tagged
+
+        order = index.order(sort_by) if sort_by else range(len(index.docs))
+        if sort_order == "desc":
+            order = reversed(order)
+        return [index.docs[doc_id] for doc_id in order if candidates is None or doc_id in candidates]
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "synced": self.synced,
+            "watermark": self.watermark or None,
+            "content_hash": self.content_hash[:12] or None,
+            "age_seconds": round(time.time() - self.last_sync_at, 1) if self.synced else None,
+            "full_syncs": self.full_syncs,
+            "delta_syncs": self.delta_syncs,
+            "changes": self.changes,
+            "requests": self.requests,
+            "lookups": self.lookups,
+        }
+
+
+def paged(items: List[dict], page: int = 1, limit: int = 10) -> dict:
+    """An API-shaped response: page `page` of `items`, `limit` per page, like the API paginates."""
+    page, limit = max(1, page), max(1, limit)
+    start = (page - 1) * limit
+    return {
+        "data": items[start:start + limit],
+        "pagination": {"page": page, "limit": limit, "total": len(items)},
+    }
+
+
+class RextroMirror:
+    """The mirrored sessions and zones, and the background task keeping them in sync."""
+
+    def __init__(self, page_size: int = 100):
+        self.sessions = MirroredCollection(
+            "sessions", "/sessions/search",
+            # Like the API, `query` matches titles and descriptions; tags have their own filter
+            text_fields=("title", "description"),
+            sort_fields=("time", "createdAt", "updatedAt", "title"),
+            page_size=page_size,
+        )
+        self.zones = MirroredCollection(
+            "zones", "/zones",
+            text_fields=("name", "description", "location"),
+            sort_fields=("createdAt", "updatedAt", "name"),
+            page_size=page_size,
+        )
+        self.enabled = False
+        self.sync_errors = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def collections(self) -> List[MirroredCollection]:
+        return [self.sessions, self.zones]
+
+    def serves(self, collection: MirroredCollection) -> bool:
+        """True when lookups in `collection` should be answered from the mirror."""
+        return self.enabled and collection.synced
+
+    async def snapshot(self, fetch: FetchPage) -> List[dict]:
+        """Syncs once and serves that snapshot without a background task (offline commands)."""
+        self.enabled = True
+        return await self.sync(fetch, full=True)
+
+    def serves_path(self, path: str) -> bool:
+        return any(collection.path == path and self.serves(collection) for collection in self.collections)
+
+    async def sync(self, fetch: FetchPage, full: bool = False) -> List[dict]:
+        """Syncs every collection once. A failing collection does not stop the others."""
+        results = []
+        for collection in self.collections:
+            try:
+                results.append(await collection.sync(fetch, full=full))
+            except Exception as e:
+                self.sync_errors += 1
+                print(f"Rextro mirror sync of {collection.name} failed: {e}")
+                results.append({"collection": collection.name, "error": str(e)})
+        return results
+
+    async def _run(self, fetch: FetchPage, interval_seconds: float, full_sync_seconds: float) -> None:
+        while True:
+            full = any(time.time() - c.last_full_sync_at >= full_sync_seconds for c in self.collections)
+            for result in await self.sync(fetch, full=full):
+                if result.get("changed"):
+                    print(f"Rextro mirror: {result['mode']} sync of {result['collection']}, "
+                          f"{result['changed']} changed, {result['items']} items")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval_seconds)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self, fetch: FetchPage, interval_seconds: float = 60.0, full_sync_seconds: float = 900.0) -> None:
+        """Starts the background sync loop on the running event loop."""
+        if self._task is None:
+            self.enabled = True
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(fetch, interval_seconds, full_sync_seconds))
+
+    def wake(self) -> None:
+        """Runs the next sync now instead of waiting for the interval (e.g. on a change notification)."""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        self.enabled = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sync_errors": self.sync_errors,
+            **{collection.name: collection.stats() for collection in self.collections},
+        }
+
+
+# Process-wide mirror; started at application startup when REXTRO_MIRROR_ENABLED
+rextro_mirror = RextroMirror(page_size=get_config().rextro_mirror_page_size)
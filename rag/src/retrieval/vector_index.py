@@ -0,0 +1,268 @@
+"""
+Persisted local vector index over the markdown knowledge base.
+
+Documents under `data/md_files` are split into heading-aware chunks and
+embedded on the CPU with a hashing embedder (unigrams + bigrams hashed into
+a fixed number of buckets, sublinear TF, corpus IDF). The index directory holds:
+
+- tf.npy       raw TF rows, reused for files whose content hash is unchanged
+- vectors.npy  IDF-weighted, L2-normalized rows, memory-mapped by the server
+- idf.npy      bucket IDF weights applied to queries
+- manifest.json  embedder settings, per-file content hashes and row ranges,
+                 and chunk metadata
+
+Builds are incremental and atomic (files are written beside the old ones and
+swapped in with os.replace), so processes that have the previous files mapped
+keep reading a consistent snapshot.
+
+Build or update the index (from the rag/ directory):
+    python -m src.retrieval.vector_index [--rebuild]
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .markdown_index import split_markdown_sections, tokenize
+
+KNOWLEDGE_BASE_DIR = "./data/md_files"
+INDEX_DIR = "./data/index"
+
+EMBEDDER_NAME = "hashing-uni-bi-v1"
+EMBEDDING_DIM = 2048
+CHUNK_MAX_WORDS = 200
+CHUNK_OVERLAP_WORDS = 40
+
+
+@dataclass
+class Chunk:
+    source: str
+    title: str
+    text: str
+
+    def render(self) -> str:
+        return f"### {self.title} ({self.source})\n{self.text}"
+
+
+def hash_features(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Sublinear term-frequency vector of hashed unigrams and bigrams (signed hashing)."""
+    tokens = tokenize(text)
+    features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return np.sign(vector) * np.log1p(np.abs(vector))
+
+
+def chunk_file(path: str, source: str) -> List[Chunk]:
+    """Splits a markdown file into heading-aware chunks of at most CHUNK_MAX_WORDS words."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    chunks = []
+    for section in split_markdown_sections(content, source=source):
+        words = section.text.split()
+        step = CHUNK_MAX_WORDS - CHUNK_OVERLAP_WORDS
+        for start in range(0, max(len(words) - CHUNK_OVERLAP_WORDS, 1), step):
+            text = section.text if len(words) <= CHUNK_MAX_WORDS else " ".join(words[start:start + CHUNK_MAX_WORDS])
+            chunks.append(Chunk(source=source, title=section.title, text=text))
+    return chunks
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def list_documents(kb_dir: str) -> Dict[str, str]:
+    """Maps each markdown file's path relative to kb_dir to its absolute path."""
+    documents = {}
+    for root, _, files in os.walk(kb_dir):
+        for name in sorted(files):
+            if name.endswith(".md"):
+                path = os.path.join(root, name)
+                documents[os.path.relpath(path, kb_dir)] = path
+    return dict(sorted(documents.items()))
+
+
+def _read_manifest(index_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(index_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get("embedder") != EMBEDDER_NAME or manifest.get("dim") != EMBEDDING_DIM:
+        return None
+    return manifest
+
+
+def _save_array(index_dir: str, name: str, array: np.ndarray) -> None:
+    tmp_path = os.path.join(index_dir, f".{name}.tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, os.path.join(index_dir, name))
+
+
+def build_index(kb_dir: str = KNOWLEDGE_BASE_DIR, index_dir: str = INDEX_DIR, rebuild: bool = False) -> dict:
+    """
+    Brings the on-disk index up to date with kb_dir, re-embedding only files
+    whose content hash changed. A file lock serializes concurrent builders
+    (e.g. several workers starting at once). Returns build statistics.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, "index.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            return _build_locked(kb_dir, index_dir, rebuild)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _build_locked(kb_dir: str, index_dir: str, rebuild: bool) -> dict:
+    start = time.perf_counter()
+    old_manifest = None if rebuild else _read_manifest(index_dir)
+    old_tf = None
+    if old_manifest is not None:
+        try:
+            old_tf = np.load(os.path.join(index_dir, "tf.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            old_manifest = None
+
+    documents = list_documents(kb_dir)
+    hashes = {source: file_sha256(path) for source, path in documents.items()}
+
+    if old_manifest is not None and {s: f["sha256"] for s, f in old_manifest["files"].items()} == hashes:
+        return {"files": len(documents), "reused": len(documents), "embedded": 0,
+                "chunks": len(old_manifest["chunks"]), "changed": False, "seconds": time.perf_counter() - start}
+
+    tf_parts: List[np.ndarray] = []
+    chunks: List[dict] = []
+    files: Dict[str, dict] = {}
+    reused = embedded = 0
+    for source, path in documents.items():
+        old_file = (old_manifest or {}).get("files", {}).get(source)
+        if old_file is not None and old_file["sha256"] == hashes[source]:
+            row_start, row_end = old_file["rows"]
+            rows = np.array(old_tf[row_start:row_end])
+            file_chunks = old_manifest["chunks"][row_start:row_end]
+            reused += 1
+        else:
+            file_chunk_objects = chunk_file(path, source)
+            rows = np.stack([hash_features(f"{c.title}\n{c.text}") for c in file_chunk_objects]) \
+                if file_chunk_objects else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+            file_chunks = [c.__dict__ for c in file_chunk_objects]
+            embedded += 1
+        files[source] = {"sha256": hashes[source], "rows": [len(chunks), len(chunks) + len(file_chunks)]}
+        tf_parts.append(rows.astype(np.float32))
+        chunks.extend(file_chunks)
+
+    tf = np.concatenate(tf_parts) if tf_parts else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    document_frequency = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(tf)) / (1 + document_frequency)).astype(np.float32) + 1.0
+    vectors = tf * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    _save_array(index_dir, "tf.npy", tf)
+    _save_array(index_dir, "vectors.npy", vectors.astype(np.float32))
+    _save_array(index_dir, "idf.npy", idf)
+    manifest = {"embedder": EMBEDDER_NAME, "dim": EMBEDDING_DIM, "built_at": time.time(),
+                "files": files, "chunks": chunks}
+    tmp_manifest = os.path.join(index_dir, ".manifest.tmp.json")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    # The manifest is swapped in last; readers reload when its mtime changes
+    os.replace(tmp_manifest, os.path.join(index_dir, "manifest.json"))
+
+    return {"files": len(documents), "reused": reused, "embedded": embedded,
+            "chunks": len(chunks), "changed": True, "seconds": time.perf_counter() - start}
+
+
+class VectorIndex:
+    """
+    Read side of the index: memory-maps vectors.npy (pages are shared between
+    worker processes through the OS page cache) and answers top-k cosine
+    similarity queries with one matrix-vector product. Reloads when the
+    manifest on disk is replaced by a newer build.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self._vectors: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._chunks: List[Chunk] = []
+        self._manifest_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Loads the index if the manifest changed since the last load. Returns True if loaded."""
+        manifest_path = os.path.join(self.index_dir, "manifest.json")
+        try:
+            mtime = os.stat(manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._manifest_mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return False
+            manifest = _read_manifest(self.index_dir)
+            if manifest is None:
+                return False
+            self._vectors = np.load(os.path.join(self.index_dir, "vectors.npy"), mmap_mode="r")
+            self._idf = np.load(os.path.join(self.index_dir, "idf.npy"))
+            self._chunks = [Chunk(**chunk) for chunk in manifest["chunks"]]
+            self._manifest_mtime = mtime
+        print(f"Loaded vector index with {len(self._chunks)} chunks from {self.index_dir}")
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return self._vectors is not None
+
+    @property
+    def size(self) -> int:
+        return len(self._chunks)
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[float, Chunk]]:
+        """Returns up to `top_k` (cosine similarity, chunk) pairs with a positive score, best first."""
+        self.refresh()
+        vectors, idf, chunks = self._vectors, self._idf, self._chunks
+        if vectors is None or not len(chunks):
+            return []
+
+        query_vector = hash_features(query) * idf
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return []
+        scores = vectors @ (query_vector / norm)
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), chunks[i]) for i in top if scores[i] > 0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or update the knowledge-base vector index")
+    parser.add_argument("--kb-dir", default=KNOWLEDGE_BASE_DIR)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="re-embed every file")
+    args = parser.parse_args()
+
+    stats = build_index(args.kb_dir, args.index_dir, rebuild=args.rebuild)
+    print(f"Indexed {stats['files']} files ({stats['embedded']} embedded, {stats['reused']} reused), "
+          f"{stats['chunks']} chunks in {stats['seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
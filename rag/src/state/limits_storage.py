@@ -0,0 +1,51 @@
+import time
+from typing import Any, Optional
+
+from limits.storage import Storage
+
+from .store import StateStore
+
+# Registered with limits by subclassing Storage
+STORAGE_URI = "ragstate://"
+
+
+class StateStoreStorage(Storage):
+    """
+    `limits` storage over a StateStore, so slowapi's rate-limit counters are
+    shared by every worker using the same backend. Supports the fixed-window
+    strategy slowapi uses by default.
+
+        Limiter(key_func=..., storage_uri=STORAGE_URI, storage_options={"store": store})
+    """
+
+    STORAGE_SCHEME = ["ragstate"]
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, store: Optional[StateStore] = None, **options: Any):
+        if store is None:
+            raise ValueError("StateStoreStorage needs a `store` storage option")
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.store = store
+
+    @property
+    def base_exceptions(self):
+        return self.store.errors or Exception
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self.store.incr(self.KEY_PREFIX + key, amount, ttl_seconds=expiry)
+
+    def get(self, key: str) -> int:
+        return self.store.get_int(self.KEY_PREFIX + key)
+
+    def get_expiry(self, key: str) -> float:
+        # limits expects an absolute wall-clock time
+        return time.time() + (self.store.ttl(self.KEY_PREFIX + key) or 0)
+
+    def check(self) -> bool:
+        return self.store.check()
+
+    def reset(self) -> Optional[int]:
+        return self.store.delete_prefix(self.KEY_PREFIX)
+
+    def clear(self, key: str) -> None:
+        self.store.delete(self.KEY_PREFIX + key)
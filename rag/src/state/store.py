@@ -0,0 +1,413 @@
+"""
+Key-value state shared by the worker processes of one deployment.
+
+The rate limiter, the answer / tool caches and conversation sessions keep
+their entries here instead of in process memory when a shared backend is
+configured (STATE_BACKEND):
+
+- memory  per-process dict; every worker has its own state (the default,
+          and the behaviour of a single-process server)
+- shm     SQLite database in /dev/shm, shared by all workers on one host
+- redis   Redis (or anything speaking its protocol), shared across hosts
+
+Values are strings (callers JSON-encode), counters are integers, and every
+key can carry a TTL. The interface is synchronous, like the limits storages
+slowapi calls; code on the event loop goes through `await store.call(...)`,
+which runs SQLite and Redis round trips on a worker thread so a slow or
+locked backend never stalls other requests.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from config.config import get_config
+
+T = TypeVar("T")
+
+
+class StateStore:
+    """Interface implemented by the state backends. Keys are namespaced by the store."""
+
+    backend = ""
+    # Exceptions the backend raises when it is unavailable
+    errors: Tuple[type, ...] = ()
+    # Whether calls wait on I/O (a database file or the network)
+    blocking = True
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = f"{namespace}:" if namespace else ""
+
+    async def call(self, method: Callable[..., T], *args: Any) -> T:
+        """Runs one of this store's methods from the event loop: on a worker thread when it blocks."""
+        if not self.blocking:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        """Removes a key; returns whether it existed."""
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Removes every key starting with `prefix`; returns how many were removed."""
+        raise NotImplementedError
+
+    def count_prefix(self, prefix: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[float] = None) -> int:
+        """
+        Adds `amount` to an integer counter and returns the new value. A
+        missing (or expired) counter starts at 0 and gets `ttl_seconds`;
+        incrementing an existing counter keeps its expiry.
+        """
+        raise NotImplementedError
+
+    def get_int(self, key: str) -> int:
+        value = self.get(key)
+        return int(value) if value is not None else 0
+
+    def ttl(self, key: str) -> Optional[float]:
+        """Seconds until the key expires, or None when it is missing or never expires."""
+        raise NotImplementedError
+
+    def check(self) -> bool:
+        """True when the backend answers."""
+        try:
+            self.get("check")
+            return True
+        except self.errors:
+            return False
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+
+class MemoryStateStore(StateStore):
+    """Process-local store. Expired keys are dropped when read and swept periodically."""
+
+    backend = "memory"
+    blocking = False
+
+    def __init__(self, namespace: str = "", sweep_interval_seconds: float = 60.0):
+        super().__init__(namespace)
+        self.sweep_interval_seconds = sweep_interval_seconds
+        # key -> (expires_at or None, value)
+        self._entries: Dict[str, Tuple[Optional[float], object]] = {}
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+
+    def _live(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _sweep(self, now: float) -> None:
+        if now - self._swept_at < self.sweep_interval_seconds:
+            return
+        self._swept_at = now
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at is not None and expires_at <= now]:
+            del self._entries[key]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._live(self.namespace + key, time.monotonic())
+        return None if entry is None else str(entry[1])
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            self._entries[self.namespace + key] = (now + ttl_seconds if ttl_seconds else None, value)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(self.namespace + key, None) is not None
+
+    def delete_prefix(self, prefix: str) -> int:
+        prefix = self.namespace + prefix
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def count_prefix(self, prefix: str) -> int:
+        prefix, now = self.namespace + prefix, time.monotonic()
+        with self._lock:
+            return sum(1 for key, (expires_at, _) in self._entries.items()
+                       if key.startswith(prefix) and (expires_at is None or expires_at > now))
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[float] = None) -> int:
+        key, now = self.namespace + key, time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            entry = self._live(key, now)
+            if entry is None:
+                entry = (now + ttl_seconds if ttl_seconds else None, 0)
+            value = int(entry[1]) + amount
+            self._entries[key] = (entry[0], value)
+        return value
+
+    def ttl(self, key: str) -> Optional[float]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(self.namespace + key, now)
+        if entry is None or entry[0] is None:
+            return None
+        return entry[0] - now
+
+
+class SqliteStateStore(StateStore):
+    """
+    SQLite-backed store for the workers of one host. Put the database on
+    tmpfs (/dev/shm) so reads and writes never touch a disk; durability is
+    off because the state is disposable. WAL mode lets readers run while a
+    worker writes, and writers wait up to `busy_timeout_seconds` for each
+    other. Expired rows are filtered on read and swept periodically.
+    """
+
+    backend = "shm"
+    errors = (sqlite3.Error,)
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "",
+        busy_timeout_seconds: float = 5.0,
+        sweep_interval_seconds: float = 60.0,
+    ):
+        super().__init__(namespace)
+        self.path = path
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=busy_timeout_seconds, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        """Runs a write and returns the number of rows it changed."""
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        # Read to the end under the lock: a RETURNING write only completes then
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return rows[0] if rows else None
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._swept_at < self.sweep_interval_seconds:
+            return
+        self._swept_at = now
+        self._execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._fetchone(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self.namespace + key, time.time()),
+        )
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        self._maybe_sweep()
+        self._execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (self.namespace + key, value, time.time() + ttl_seconds if ttl_seconds else None),
+        )
+
+    def delete(self, key: str) -> bool:
+        return self._execute("DELETE FROM state WHERE key = ?", (self.namespace + key,)) > 0
+
+    def delete_prefix(self, prefix: str) -> int:
+        prefix = self.namespace + prefix
+        # Range scan on the primary key; U+10FFFF sorts after any character a key can contain
+        return self._execute(
+            "DELETE FROM state WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff")
+        )
+
+    def count_prefix(self, prefix: str) -> int:
+        prefix = self.namespace + prefix
+        return self._fetchone(
+            "SELECT COUNT(*) FROM state WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\U0010ffff", time.time()),
+        )[0]
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[float] = None) -> int:
+        self._maybe_sweep()
+        now = time.time()
+        # One statement, so concurrent workers can't lose an increment
+        row = self._fetchone(
+            """
+            INSERT INTO state (key, value, expires_at) VALUES (?1, ?2, ?3)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= ?4 THEN ?2 ELSE CAST(value AS INTEGER) + ?2 END,
+                expires_at = CASE WHEN expires_at <= ?4 THEN ?3 ELSE expires_at END
+            RETURNING value
+            """,
+            (self.namespace + key, amount, now + ttl_seconds if ttl_seconds else None, now),
+        )
+        return int(row[0])
+
+    def ttl(self, key: str) -> Optional[float]:
+        now = time.time()
+        row = self._fetchone(
+            "SELECT expires_at FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self.namespace + key, now),
+        )
+        if row is None or row[0] is None:
+            return None
+        return row[0] - now
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "path": self.path}
+
+
+class RedisStateStore(StateStore):
+    """
+    Redis-backed store shared by every node. Needs the `redis` package; any
+    server speaking the Redis protocol works (see benchmarks/standin_redis.py
+    for a local stand-in).
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, namespace: str = "", timeout_seconds: float = 1.0):
+        super().__init__(namespace)
+        import redis
+
+        self.url = url
+        self.errors = (redis.RedisError, OSError)
+        self._redis = redis.Redis.from_url(
+            url,
+            decode_responses=True,
+            socket_timeout=timeout_seconds,
+            socket_connect_timeout=timeout_seconds,
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        return self._redis.get(self.namespace + key)
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        self._redis.set(self.namespace + key, value, px=int(ttl_seconds * 1000) if ttl_seconds else None)
+
+    def delete(self, key: str) -> bool:
+        return self._redis.delete(self.namespace + key) > 0
+
+    def _scan(self, prefix: str):
+        pattern = "".join(f"\\{c}" if c in "*?[]\\" else c for c in self.namespace + prefix) + "*"
+        return self._redis.scan_iter(match=pattern, count=500)
+
+    def delete_prefix(self, prefix: str) -> int:
+        removed, batch = 0, []
+        for key in self._scan(prefix):
+            batch.append(key)
+            if len(batch) >= 500:
+                removed += self._redis.delete(*batch)
+                batch = []
+        if batch:
+            removed += self._redis.delete(*batch)
+        return removed
+
+    def count_prefix(self, prefix: str) -> int:
+        return sum(1 for _ in self._scan(prefix))
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[float] = None) -> int:
+        key = self.namespace + key
+        # MULTI/EXEC: creating the counter with its expiry and incrementing it can't interleave
+        pipe = self._redis.pipeline(transaction=True)
+        if ttl_seconds:
+            pipe.set(key, 0, px=max(1, int(ttl_seconds * 1000)), nx=True)
+        pipe.incrby(key, amount)
+        return int(pipe.execute()[-1])
+
+    def ttl(self, key: str) -> Optional[float]:
+        milliseconds = self._redis.pttl(self.namespace + key)
+        return milliseconds / 1000 if milliseconds >= 0 else None
+
+    def check(self) -> bool:
+        try:
+            return bool(self._redis.ping())
+        except self.errors:
+            return False
+
+    def close(self) -> None:
+        self._redis.close()
+
+    def stats(self) -> dict:
+        # Hide credentials in the URL
+        return {"backend": self.backend, "url": self.url.split("@")[-1]}
+
+
+def create_state_store(backend: str, shm_path: str, redis_url: str, namespace: str = "") -> StateStore:
+    """Builds the StateStore for a STATE_BACKEND value ("memory", "shm" or "redis")."""
+    backend = (backend or "memory").lower()
+    if backend == "memory":
+        return MemoryStateStore(namespace)
+    if backend == "shm":
+        return SqliteStateStore(shm_path, namespace)
+    if backend == "redis":
+        return RedisStateStore(redis_url, namespace)
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r}; expected memory, shm or redis")
+
+
+# Process-wide store, created from config on first use
+_store: Optional[StateStore] = None
+
+
+def get_state_store() -> StateStore:
+    """Returns this process's StateStore for the configured STATE_BACKEND."""
+    global _store
+    if _store is None:
+        config = get_config()
+        _store = create_state_store(
+            config.state_backend,
+            shm_path=config.state_shm_path,
+            redis_url=config.redis_url,
+            namespace=config.state_namespace,
+        )
+    return _store
+
+
+def shared_state_store() -> Optional[StateStore]:
+    """
+    The store when STATE_BACKEND shares state between workers, else None:
+    per-process caches keep their own bounded LRU memory.
+    """
+    store = get_state_store()
+    return store if store.backend != "memory" else None
+
+
+def close_state_store() -> None:
+    """Closes the store's connections. Called at shutdown."""
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
@@ -0,0 +1,485 @@
+"""
+Analyzes locust result CSVs (load_test_results_*.csv, .csv.gz) and compares runs.
+
+Files are read in chunks of CHUNK_ROWS rows, so memory depends on the run's
+duration, not its request count. Every chunk is folded into per-second
+latency histograms with log-spaced bins 2% wide. Sliding-window percentiles,
+throughput, error rate and latency-vs-concurrency are then computed from the
+histograms with vectorized numpy operations. Percentiles are reported as the
+upper edge of their bin, i.e. within 2% of the exact value.
+
+Concurrency per second is estimated with Little's law (summed latency of the
+requests in that second / 1 s), which works on files that only record
+timestamps and latencies.
+
+Usage:
+    python analyze_results.py report load_test_results_20251008_113727.csv --out report.html
+    python analyze_results.py report results.csv.gz --window 30 --out report.md
+    python analyze_results.py compare baseline.csv candidate.csv --threshold 0.10 --out comparison.md
+
+`compare` exits with code 1 when the candidate regresses by more than the
+thresholds, so it can gate CI.
+"""
+import argparse
+import csv
+import gzip
+import html
+import math
+import sys
+
+import numpy as np
+
+CHUNK_ROWS = 50_000
+PERCENTILES = (0.50, 0.90, 0.99)
+
+# Latency histogram bins (ms): log-spaced from 1 ms to 10 min, each 2% wider than the last
+MIN_LATENCY_MS = 1.0
+BIN_GROWTH = 1.02
+NUM_BINS = int(math.ceil(math.log(600_000 / MIN_LATENCY_MS) / math.log(BIN_GROWTH))) + 1
+UPPER_EDGES = MIN_LATENCY_MS * BIN_GROWTH ** np.arange(NUM_BINS)
+
+
+def latency_bins(response_times):
+    """Histogram bin of each latency (ms); values beyond the range go to the first / last bin."""
+    with np.errstate(divide="ignore"):
+        bins = np.ceil(np.log(np.maximum(response_times, MIN_LATENCY_MS) / MIN_LATENCY_MS) / math.log(BIN_GROWTH))
+    return np.clip(bins, 0, NUM_BINS - 1).astype(np.int64)
+
+
+def percentiles(histograms, quantiles=PERCENTILES):
+    """Percentiles (ms) for each histogram along the last axis; NaN where a histogram is empty."""
+    cumulative = np.cumsum(histograms, axis=-1)
+    totals = cumulative[..., -1]
+    values = []
+    for quantile in quantiles:
+        target = np.maximum(np.ceil(quantile * totals), 1)[..., None]
+        index = np.argmax(cumulative >= target, axis=-1)
+        values.append(np.where(totals > 0, UPPER_EDGES[index], np.nan))
+    return values
+
+
+def sliding_sum(series, window):
+    """Sum over the trailing `window` buckets for every bucket (axis 0)."""
+    cumulative = np.cumsum(series, axis=0)
+    shifted = np.zeros_like(cumulative)
+    shifted[window:] = cumulative[:-window]
+    return cumulative - shifted
+
+
+# --- Reading ---
+def read_chunks(path):
+    """Yields (epoch seconds, names, response times in ms, success flags) arrays per chunk of rows."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [header.index(name) for name in ("timestamp", "name", "response_time", "success")]
+        while True:
+            rows = [[row[i] for i in columns] for _, row in zip(range(CHUNK_ROWS), reader) if row]
+            if not rows:
+                return
+            timestamps, names, response_times, success = zip(*rows)
+            epoch_us = np.array(timestamps, dtype="datetime64[us]").astype(np.int64)
+            yield (
+                epoch_us / 1e6,
+                np.array(names, dtype=object),
+                np.array(response_times, dtype=np.float64),
+                np.array(success) == "True",
+            )
+
+
+class RunStats:
+    """Per-bucket latency histograms, error counts and summed latency for one run."""
+
+    def __init__(self, bucket_seconds=1.0):
+        self.bucket_seconds = bucket_seconds
+        self.first_bucket = None
+        self.histograms = np.zeros((0, NUM_BINS), dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.latency_sum_ms = np.zeros(0, dtype=np.float64)
+        self.max_latency_ms = 0.0
+        self.by_name = {}  # name -> [histogram, errors, max latency]
+
+    def _grow(self, low, high):
+        """Extends the bucket arrays so buckets low..high (absolute indexes) exist."""
+        if self.first_bucket is None:
+            self.first_bucket = low
+        before = max(self.first_bucket - low, 0)
+        after = max(high - (self.first_bucket + len(self.errors) - 1), 0)
+        if before or after:
+            self.histograms = np.pad(self.histograms, ((before, after), (0, 0)))
+            self.errors = np.pad(self.errors, (before, after))
+            self.latency_sum_ms = np.pad(self.latency_sum_ms, (before, after))
+            self.first_bucket -= before
+
+    def add(self, timestamps, names, response_times, success):
+        buckets = np.floor(timestamps / self.bucket_seconds).astype(np.int64)
+        self._grow(int(buckets.min()), int(buckets.max()))
+        rows = buckets - self.first_bucket
+        bins = latency_bins(response_times)
+
+        size = self.histograms.size
+        self.histograms += np.bincount(rows * NUM_BINS + bins, minlength=size).reshape(self.histograms.shape)
+        self.errors += np.bincount(rows, weights=~success, minlength=len(self.errors)).astype(np.int64)
+        self.latency_sum_ms += np.bincount(rows, weights=response_times, minlength=len(self.errors))
+        self.max_latency_ms = max(self.max_latency_ms, float(response_times.max()))
+
+        unique_names, name_index = np.unique(names, return_inverse=True)
+        for i, name in enumerate(unique_names):
+            mask = name_index == i
+            entry = self.by_name.setdefault(name, [np.zeros(NUM_BINS, dtype=np.int64), 0, 0.0])
+            entry[0] += np.bincount(bins[mask], minlength=NUM_BINS)
+            entry[1] += int(np.count_nonzero(~success[mask]))
+            entry[2] = max(entry[2], float(response_times[mask].max()))
+
+    @classmethod
+    def from_file(cls, path, bucket_seconds=1.0):
+        stats = cls(bucket_seconds)
+        for chunk in read_chunks(path):
+            stats.add(*chunk)
+        if stats.first_bucket is None:
+            raise ValueError(f"{path} has no result rows")
+        return stats
+
+    @property
+    def counts(self):
+        return self.histograms.sum(axis=1)
+
+
+# --- Analysis ---
+def summarize(stats, window_seconds=10.0):
+    """Overall, per-endpoint, timeline and latency-vs-concurrency figures for one run."""
+    counts = stats.counts
+    total = int(counts.sum())
+    failures = int(stats.errors.sum())
+    duration = len(counts) * stats.bucket_seconds
+    overall = stats.histograms.sum(axis=0)
+    # A bin's upper edge can exceed the slowest request; never report more than that
+    p50, p90, p99 = (min(float(v), stats.max_latency_ms) for v in percentiles(overall))
+
+    window = max(1, int(round(window_seconds / stats.bucket_seconds)))
+    window_histograms = sliding_sum(stats.histograms, window)
+    window_counts = window_histograms.sum(axis=1)
+    window_span = np.minimum(np.arange(1, len(counts) + 1), window) * stats.bucket_seconds
+    with np.errstate(invalid="ignore", divide="ignore"):
+        window_errors = sliding_sum(stats.errors, window) / window_counts
+    w50, w90, w99 = percentiles(window_histograms)
+    throughput = window_counts / window_span
+    concurrency = sliding_sum(stats.latency_sum_ms, window) / 1000 / window_span
+
+    endpoints = []
+    for name, (histogram, errors, max_latency) in sorted(stats.by_name.items()):
+        requests = int(histogram.sum())
+        e50, e90, e99 = (min(float(v), max_latency) for v in percentiles(histogram))
+        endpoints.append({
+            "name": name, "requests": requests, "error_rate": errors / requests,
+            "p50": e50, "p90": e90, "p99": e99,
+        })
+
+    return {
+        "requests": total,
+        "failures": failures,
+        "error_rate": failures / total if total else 0.0,
+        "duration_seconds": duration,
+        "throughput": total / duration if duration else 0.0,
+        "peak_throughput": float(np.nanmax(throughput)) if len(throughput) else 0.0,
+        "p50": p50, "p90": p90, "p99": p99,
+        "max": stats.max_latency_ms,
+        "window_seconds": window * stats.bucket_seconds,
+        "endpoints": endpoints,
+        "timeline": {
+            "t": np.arange(len(counts)) * stats.bucket_seconds + stats.bucket_seconds,
+            "throughput": throughput, "error_rate": window_errors,
+            "p50": w50, "p90": w90, "p99": w99, "concurrency": concurrency,
+        },
+        "by_concurrency": latency_by_concurrency(stats),
+    }
+
+
+def latency_by_concurrency(stats, groups=8):
+    """Latency percentiles of the buckets grouped into equal-width ranges of estimated concurrency."""
+    counts = stats.counts
+    active = counts > 0
+    if not active.any():
+        return []
+    concurrency = stats.latency_sum_ms / 1000 / stats.bucket_seconds
+    low, high = float(concurrency[active].min()), float(concurrency[active].max())
+    edges = np.linspace(low, high, groups + 1) if high > low else np.array([low, low + 1])
+    group_of = np.clip(np.searchsorted(edges, concurrency, side="right") - 1, 0, len(edges) - 2)
+
+    rows = []
+    for group in range(len(edges) - 1):
+        members = active & (group_of == group)
+        if not members.any():
+            continue
+        histogram = stats.histograms[members].sum(axis=0)
+        g50, g90, g99 = (float(v) for v in percentiles(histogram))
+        rows.append({
+            "concurrency": f"{edges[group]:.1f}–{edges[group + 1]:.1f}",
+            "seconds": int(members.sum() * stats.bucket_seconds),
+            "requests": int(histogram.sum()),
+            "throughput": float(counts[members].mean() / stats.bucket_seconds),
+            "p50": g50, "p90": g90, "p99": g99,
+        })
+    return rows
+
+
+def compare(baseline, candidate, threshold, error_threshold, min_requests):
+    """Checks the candidate against the baseline; returns (rows, regressed)."""
+    rows = []
+
+    def check(scope, metric, base, new, limit, higher_is_worse=True, relative=True):
+        if base is None or new is None or math.isnan(base) or math.isnan(new):
+            return
+        if relative:
+            change = (new - base) / base if base else 0.0
+        else:
+            change = new - base
+        worse = change if higher_is_worse else -change
+        rows.append({
+            "scope": scope, "metric": metric, "baseline": base, "candidate": new,
+            "change": change, "relative": relative, "limit": limit, "regressed": worse > limit,
+        })
+
+    for quantile in ("p50", "p90", "p99"):
+        check("all", quantile, baseline[quantile], candidate[quantile], threshold)
+    check("all", "throughput", baseline["throughput"], candidate["throughput"], threshold, higher_is_worse=False)
+    check("all", "error_rate", baseline["error_rate"], candidate["error_rate"], error_threshold, relative=False)
+
+    candidate_endpoints = {e["name"]: e for e in candidate["endpoints"]}
+    for base in baseline["endpoints"]:
+        new = candidate_endpoints.get(base["name"])
+        if new is None or min(base["requests"], new["requests"]) < min_requests:
+            continue
+        for quantile in ("p50", "p90", "p99"):
+            check(base["name"], quantile, base[quantile], new[quantile], threshold)
+        check(base["name"], "error_rate", base["error_rate"], new["error_rate"], error_threshold, relative=False)
+
+    return rows, any(row["regressed"] for row in rows)
+
+
+# --- Rendering ---
+def _ms(value):
+    return "–" if value is None or math.isnan(value) else f"{value:,.0f} ms"
+
+
+def _pct(value):
+    return "–" if value is None or math.isnan(value) else f"{value:.2%}"
+
+
+def _markdown_table(headers, rows):
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join(str(cell) for cell in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _timeline_sample(timeline, max_rows=60):
+    step = max(1, math.ceil(len(timeline["t"]) / max_rows))
+    return range(step - 1, len(timeline["t"]), step)
+
+
+def render_markdown(path, summary):
+    timeline = summary["timeline"]
+    parts = [
+        f"# Load test report: `{path}`",
+        "",
+        _markdown_table(
+            ["Requests", "Failures", "Error rate", "Duration", "Throughput", "Peak throughput", "p50", "p90", "p99", "Max"],
+            [[
+                f"{summary['requests']:,}", f"{summary['failures']:,}", _pct(summary["error_rate"]),
+                f"{summary['duration_seconds']:,.0f} s", f"{summary['throughput']:.1f} req/s",
+                f"{summary['peak_throughput']:.1f} req/s", _ms(summary["p50"]), _ms(summary["p90"]),
+                _ms(summary["p99"]), _ms(summary["max"]),
+            ]],
+        ),
+        "",
+        "## Endpoints",
+        "",
+        _markdown_table(
+            ["Name", "Requests", "Error rate", "p50", "p90", "p99"],
+            [[e["name"], f"{e['requests']:,}", _pct(e["error_rate"]), _ms(e["p50"]), _ms(e["p90"]), _ms(e["p99"])]
+             for e in summary["endpoints"]],
+        ),
+        "",
+        f"## Timeline ({summary['window_seconds']:g} s sliding window)",
+        "",
+        _markdown_table(
+            ["t (s)", "Throughput", "Concurrency", "Error rate", "p50", "p90", "p99"],
+            [[
+                f"{timeline['t'][i]:g}", f"{timeline['throughput'][i]:.1f} req/s", f"{timeline['concurrency'][i]:.1f}",
+                _pct(timeline["error_rate"][i]), _ms(timeline["p50"][i]), _ms(timeline["p90"][i]), _ms(timeline["p99"][i]),
+            ] for i in _timeline_sample(timeline)],
+        ),
+        "",
+        "## Latency vs concurrency",
+        "",
+        _markdown_table(
+            ["Concurrency", "Seconds", "Requests", "Throughput", "p50", "p90", "p99"],
+            [[g["concurrency"], g["seconds"], f"{g['requests']:,}", f"{g['throughput']:.1f} req/s",
+              _ms(g["p50"]), _ms(g["p90"]), _ms(g["p99"])] for g in summary["by_concurrency"]],
+        ),
+        "",
+    ]
+    return "\n".join(parts)
+
+
+def _svg_chart(title, x, series, y_format, width=760, height=220, scatter=False):
+    """Inline SVG line (or scatter) chart; `series` maps a label to y values aligned with x."""
+    colors = ["#1f77b4", "#ff7f0e", "#d62728", "#2ca02c"]
+    pad_left, pad_right, pad_top, pad_bottom = 70, 20, 30, 30
+    x = np.asarray(x, dtype=float)
+    values = np.concatenate([np.asarray(v, dtype=float) for v in series.values()])
+    finite = values[np.isfinite(values)]
+    if not len(x) or not len(finite):
+        return f"<h3>{html.escape(title)}</h3><p>No data</p>"
+    x_low, x_high = float(np.nanmin(x)), float(np.nanmax(x))
+    y_high = float(finite.max()) or 1.0
+    x_span = (x_high - x_low) or 1.0
+
+    def px(value):
+        return pad_left + (value - x_low) / x_span * (width - pad_left - pad_right)
+
+    def py(value):
+        return height - pad_bottom - value / y_high * (height - pad_top - pad_bottom)
+
+    parts = [
+        f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg" font-size="11">',
+        f'<text x="{pad_left}" y="18" font-size="13" font-weight="bold">{html.escape(title)}</text>',
+        f'<line x1="{pad_left}" y1="{height - pad_bottom}" x2="{width - pad_right}" y2="{height - pad_bottom}" stroke="#999"/>',
+        f'<line x1="{pad_left}" y1="{pad_top}" x2="{pad_left}" y2="{height - pad_bottom}" stroke="#999"/>',
+        f'<text x="{pad_left - 5}" y="{pad_top + 4}" text-anchor="end">{html.escape(y_format(y_high))}</text>',
+        f'<text x="{pad_left - 5}" y="{height - pad_bottom}" text-anchor="end">{html.escape(y_format(0))}</text>',
+        f'<text x="{pad_left}" y="{height - 10}">{x_low:g}</text>',
+        f'<text x="{width - pad_right}" y="{height - 10}" text-anchor="end">{x_high:g}</text>',
+    ]
+    for i, (label, y) in enumerate(series.items()):
+        color = colors[i % len(colors)]
+        y = np.asarray(y, dtype=float)
+        ok = np.isfinite(y) & np.isfinite(x)
+        if scatter:
+            parts += [f'<circle cx="{px(a):.1f}" cy="{py(b):.1f}" r="2" fill="{color}"/>' for a, b in zip(x[ok], y[ok])]
+        else:
+            points = " ".join(f"{px(a):.1f},{py(b):.1f}" for a, b in zip(x[ok], y[ok]))
+            parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{points}"/>')
+        parts.append(
+            f'<text x="{width - pad_right - 90 * (len(series) - i)}" y="18" fill="{color}">{html.escape(label)}</text>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def render_html(path, summary):
+    timeline = summary["timeline"]
+    window = f"{summary['window_seconds']:g} s sliding window"
+    latency = {"p50": timeline["p50"], "p90": timeline["p90"], "p99": timeline["p99"]}
+    charts = [
+        _svg_chart(f"Throughput (req/s, {window})", timeline["t"], {"req/s": timeline["throughput"]},
+                   lambda v: f"{v:.1f}"),
+        _svg_chart(f"Latency percentiles (ms, {window})", timeline["t"], latency, lambda v: f"{v:,.0f}"),
+        _svg_chart(f"Error rate ({window})", timeline["t"], {"errors": timeline["error_rate"]}, lambda v: f"{v:.1%}"),
+        _svg_chart("Latency vs estimated concurrency (ms, per window)", timeline["concurrency"],
+                   {"p50": timeline["p50"], "p99": timeline["p99"]}, lambda v: f"{v:,.0f}", scatter=True),
+    ]
+    # The markdown tables double as the HTML tables
+    body = []
+    for block in render_markdown(path, summary).split("\n\n"):
+        lines = block.strip().splitlines()
+        if not lines:
+            continue
+        if lines[0].startswith("# "):
+            body.append(f"<h1>{html.escape(lines[0][2:])}</h1>")
+        elif lines[0].startswith("## "):
+            body.append(f"<h2>{html.escape(lines[0][3:])}</h2>")
+        elif lines[0].startswith("|"):
+            cells = [[html.escape(c.strip()) for c in line.strip("|").split("|")] for line in lines if "---|" not in line]
+            head = "".join(f"<th>{c}</th>" for c in cells[0])
+            rows = "".join("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>" for row in cells[1:])
+            body.append(f"<table><tr>{head}</tr>{rows}</table>")
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Load test report</title>"
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}"
+        "td,th{border:1px solid #ccc;padding:3px 8px;text-align:right}th{background:#f4f4f4}</style></head><body>"
+        + body[0] + body[1] + "".join(charts) + "".join(body[2:]) + "</body></html>"
+    )
+
+
+def render_comparison(baseline_path, candidate_path, rows, regressed, threshold, error_threshold):
+    def fmt(row, value):
+        return _pct(value) if row["metric"] == "error_rate" else (
+            f"{value:.1f} req/s" if row["metric"] == "throughput" else _ms(value))
+
+    table = _markdown_table(
+        ["Scope", "Metric", "Baseline", "Candidate", "Change", "Result"],
+        [[
+            row["scope"], row["metric"], fmt(row, row["baseline"]), fmt(row, row["candidate"]),
+            f"{row['change']:+.1%}" if row["relative"] else f"{row['change'] * 100:+.2f} pp",
+            "❌ regression" if row["regressed"] else "✅",
+        ] for row in rows],
+    )
+    verdict = "❌ Regression detected" if regressed else "✅ No regression"
+    return "\n".join([
+        "# Load test comparison",
+        "",
+        f"Baseline: `{baseline_path}`  ",
+        f"Candidate: `{candidate_path}`  ",
+        f"Thresholds: latency/throughput {threshold:.0%}, error rate +{error_threshold * 100:.2f} pp",
+        "",
+        table,
+        "",
+        f"**{verdict}**",
+        "",
+    ])
+
+
+def write_output(text, out):
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ Report written to: {out}")
+    else:
+        print(text)
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--bucket", type=float, default=1.0, help="seconds per time bucket")
+    common.add_argument("--window", type=float, default=10.0, help="sliding window length in seconds")
+    parser = argparse.ArgumentParser(description="Analyze and compare locust result CSVs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", parents=[common], help="summarize one run")
+    report.add_argument("results", help="load_test_results_*.csv (or .csv.gz)")
+    report.add_argument("--out", help="output file (.html or .md); markdown on stdout by default")
+
+    comparison = commands.add_parser("compare", parents=[common], help="compare a candidate run against a baseline")
+    comparison.add_argument("baseline")
+    comparison.add_argument("candidate")
+    comparison.add_argument("--threshold", type=float, default=0.10,
+                            help="max relative latency increase / throughput drop (0.10 = 10%%)")
+    comparison.add_argument("--error-threshold", type=float, default=0.01,
+                            help="max absolute error rate increase (0.01 = 1 percentage point)")
+    comparison.add_argument("--min-requests", type=int, default=100,
+                            help="skip per-endpoint checks with fewer requests in either run")
+    comparison.add_argument("--out", help="output markdown file; stdout by default")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        summary = summarize(RunStats.from_file(args.results, args.bucket), args.window)
+        if args.out and args.out.endswith(".html"):
+            write_output(render_html(args.results, summary), args.out)
+        else:
+            write_output(render_markdown(args.results, summary), args.out)
+        return 0
+
+    baseline = summarize(RunStats.from_file(args.baseline, args.bucket), args.window)
+    candidate = summarize(RunStats.from_file(args.candidate, args.bucket), args.window)
+    rows, regressed = compare(baseline, candidate, args.threshold, args.error_threshold, args.min_requests)
+    write_output(
+        render_comparison(args.baseline, args.candidate, rows, regressed, args.threshold, args.error_threshold),
+        args.out,
+    )
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+from locust import HttpUser, task, between, events
+import ipaddress
+import itertools
+import random
+import time
+
+# Streams every request to load_test_results_<timestamp>.csv (see result_recorder.py)
+import result_recorder  # noqa: F401
+
+# --- Query Mix ---
+# (weight, queries): greetings take the fast path, the rest run the agent
+QUERY_MIX = {
+    "greeting": (2, [
+        "hi",
+        "hello there",
+        "good morning",
+        "hey!",
+    ]),
+    "schedule": (3, [
+        "What is the schedule for the Rextro exhibition?",
+        "When does the exhibition open each day?",
+        "What time does the event close on the last day?",
+        "Is there an opening ceremony and when is it?",
+    ]),
+    "zones": (3, [
+        "Where is Zone A?",
+        "Which zones are there at the exhibition?",
+        "Where can I find the robotics booth?",
+        "Where are the electrical engineering exhibits?",
+    ]),
+    "sessions": (2, [
+        "Are there any workshops I can join?",
+        "What technical sessions are happening today?",
+        "Is there a talk about machine learning?",
+        "List the sessions about robotics.",
+    ]),
+}
+
+# Every user gets its own address (from the shared 100.64.0.0/10 range) in
+# X-Forwarded-For, so the per-client rate limit and fair queuing treat it as a
+# separate visitor. The app only trusts the header from a trusted proxy such as
+# 127.0.0.1, so run locust on the same host as the app.
+_FIRST_CLIENT = ipaddress.ip_address("100.64.0.0")
+_client_numbers = itertools.count(1)
+
+
+@events.init_command_line_parser.add_listener
+def add_arguments(parser):
+    group = parser.add_argument_group("Rextro /ask SLOs")
+    group.add_argument("--slo-p50-ms", type=float, default=3000, help="max median latency (ms)")
+    group.add_argument("--slo-p95-ms", type=float, default=8000, help="max 95th percentile latency (ms)")
+    group.add_argument("--slo-p99-ms", type=float, default=15000, help="max 99th percentile latency (ms)")
+    group.add_argument("--slo-error-rate", type=float, default=0.01, help="max share of failed requests")
+    group.add_argument(
+        "--uncached-share", type=float, default=0.5,
+        help="share of agent queries made unique so they miss the server's answer cache",
+    )
+    group.add_argument("--stream-share", type=float, default=0.2, help="share of agent queries sent to /ask/stream")
+
+
+class AskUser(HttpUser):
+    """
+    Simulates an exhibition visitor asking the chatbot questions.
+
+    wait_time: Think time between questions (1-3 seconds per user)
+    """
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        number = next(_client_numbers)
+        self.client.timeout = 60
+        self.client.headers["X-Forwarded-For"] = str(_FIRST_CLIENT + number)
+        self.options = self.environment.parsed_options
+
+    def _pick(self, category):
+        query = random.choice(QUERY_MIX[category][1])
+        if category != "greeting" and random.random() < self.options.uncached_share:
+            query = f"{query} (visitor {random.randint(1, 10**9)})"
+        return query
+
+    def _ask(self, category):
+        query = self._pick(category)
+        if category != "greeting" and random.random() < self.options.stream_share:
+            self._ask_stream(category, query)
+            return
+
+        with self.client.post(
+            "/ask", json={"query": query}, catch_response=True, name=f"/ask [{category}]",
+        ) as response:
+            if response.status_code != 200:
+                response.failure(f"Got status code: {response.status_code}")
+            elif not response.json().get("answer"):
+                response.failure("Empty answer")
+            else:
+                response.success()
+
+    def _ask_stream(self, category, query):
+        start = time.perf_counter()
+        with self.client.post(
+            "/ask/stream", json={"query": query}, catch_response=True, stream=True,
+            name=f"/ask/stream [{category}]",
+        ) as response:
+            if response.status_code != 200:
+                response.failure(f"Got status code: {response.status_code}")
+                return
+            body = response.text
+            # Report the time until the last event, not just the response headers
+            response.request_meta["response_time"] = (time.perf_counter() - start) * 1000
+            response.request_meta["response_length"] = len(body)
+            if "event: error" in body:
+                response.failure("Stream ended with an error event")
+            elif "event: answer" not in body:
+                response.failure("Stream ended without an answer")
+            else:
+                response.success()
+
+    @task(QUERY_MIX["greeting"][0])
+    def greeting(self):
+        self._ask("greeting")
+
+    @task(QUERY_MIX["schedule"][0])
+    def schedule(self):
+        self._ask("schedule")
+
+    @task(QUERY_MIX["zones"][0])
+    def zones(self):
+        self._ask("zones")
+
+    @task(QUERY_MIX["sessions"][0])
+    def sessions(self):
+        self._ask("sessions")
+
+
+# --- SLO Assertions ---
+@events.quitting.add_listener
+def check_slos(environment, **kwargs):
+    """Fails the run (exit code 1) when latency percentiles or the error rate miss their SLOs"""
+    options = environment.parsed_options
+    total = environment.stats.total
+    if total.num_requests == 0:
+        print("❌ SLO check: no requests were made")
+        environment.process_exit_code = 1
+        return
+
+    checks = [
+        ("p50", total.get_response_time_percentile(0.50), options.slo_p50_ms, "ms"),
+        ("p95", total.get_response_time_percentile(0.95), options.slo_p95_ms, "ms"),
+        ("p99", total.get_response_time_percentile(0.99), options.slo_p99_ms, "ms"),
+        ("error rate", total.fail_ratio, options.slo_error_rate, ""),
+    ]
+    print(f"\n📊 SLO check over {total.num_requests} requests ({total.total_rps:.1f} req/s):")
+    failed = False
+    for name, value, limit, unit in checks:
+        ok = value <= limit
+        failed = failed or not ok
+        shown = f"{value:.0f}{unit} (limit {limit:.0f}{unit})" if unit else f"{value:.2%} (limit {limit:.2%})"
+        print(f"  {'✅' if ok else '❌'} {name}: {shown}")
+
+    for entry in sorted(environment.stats.entries.values(), key=lambda e: e.name):
+        print(
+            f"  {entry.name}: {entry.num_requests} requests, p50 {entry.get_response_time_percentile(0.5):.0f}ms, "
+            f"p95 {entry.get_response_time_percentile(0.95):.0f}ms, failures {entry.num_failures}"
+        )
+
+    environment.process_exit_code = 1 if failed else 0
+    print("❌ SLOs missed" if failed else "✅ All SLOs met")
+
+
+# --- Configuration Guide ---
+"""
+HOW TO RUN (fully offline, see run_offline_ask.py):
+
+1. One command: stand-in Gemini + stand-in Rextro API + app + headless locust:
+   python run_offline_ask.py --users 50 --spawn-rate 10 --run-time 1m
+
+2. Against an app you started yourself (GEMINI_API_BASE / GEMINI_TRANSPORT=rest /
+   REXTRO_API_BASE_URL pointing at the stand-ins):
+   locust -f ask_locustfile.py --host=http://127.0.0.1:8000 \
+          --users 50 --spawn-rate 10 --run-time 1m --headless \
+          --slo-p95-ms 5000 --slo-error-rate 0.01
+
+The process exits with code 1 when any SLO is missed.
+"""
@@ -1,9 +1,7 @@
-from locust import HttpUser, task, between, events
-import time
-import csv
-import os
-from datetime import datetime
-import ssl
+from locust import HttpUser, task, between
+
+# Streams every request to load_test_results_<timestamp>.csv (see result_recorder.py)
+import result_recorder  # noqa: F401
 
 class HealthCheckUser(HttpUser):
     """
@@ -28,7 +26,6 @@ class HealthCheckUser(HttpUser):
         Task: Hit the health check endpoint
         Weight: 1 (100% of requests go here)
         """
-        start_time = time.time()
         try:
             with self.client.get(
                 "/",
@@ -36,11 +33,8 @@ class HealthCheckUser(HttpUser):
                 name="Health Check",
                 timeout=30  # Explicit timeout for this request
             ) as response:
-                response_time = (time.time() - start_time) * 1000  # ms
-                
                 if response.status_code == 200:
                     response.success()
-                    print(f"✅ Success: {response.status_code}, Time: {response_time:.0f}ms")
                 else:
                     response.failure(f"Got status code: {response.status_code}")
                     print(f"❌ Failed: Status {response.status_code}")
@@ -50,37 +44,6 @@ class HealthCheckUser(HttpUser):
             # Log the actual exception for debugging
 
 
-# --- Event Handlers for Custom Metrics ---
-results = []
-
-@events.request.add_listener
-def on_request(request_type, name, response_time, response_length, exception, **kwargs):
-    """Capture each request for detailed analysis"""
-    results.append({
-        'timestamp': datetime.now(),
-        'request_type': request_type,
-        'name': name,
-        'response_time': response_time,
-        'response_length': response_length,
-        'exception': str(exception) if exception else None,
-        'success': exception is None
-    })
-
-@events.test_stop.add_listener
-def on_test_stop(environment, **kwargs):
-    """Save results to CSV after test completes"""
-    if results:
-        filename = f'load_test_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=results[0].keys())
-            writer.writeheader()
-            writer.writerows(results)
-        print(f"\n✅ Results saved to: {filename}")
-        print(f"📊 Total requests: {len(results)}")
-        print(f"✅ Successful: {sum(1 for r in results if r['success'])}")
-        print(f"❌ Failed: {sum(1 for r in results if not r['success'])}")
-
-
 # --- Configuration Guide ---
 """
 HOW TO RUN:
@@ -115,6 +78,11 @@ HOW TO RUN:
           --csv=results \
           --headless
 
+4. Distributed (workers stream their results to the master, which writes one file):
+   locust -f locustfile.py --master --headless --users 10000 --spawn-rate 200 \
+          --run-time 5m --expect-workers 8 --results-file results.csv.gz
+   locust -f locustfile.py --worker --master-host=<master ip>   # once per CPU core
+
 PARAMETERS EXPLAINED:
 - --users: Total number of concurrent users (1000)
 - --spawn-rate: How many users to add per second (50-100)
@@ -122,4 +90,6 @@ PARAMETERS EXPLAINED:
 - --headless: Run without web UI
 - --html: Generate HTML report
 - --csv: Save results to CSV
+- --results-file: Per-request CSV, streamed to disk (.gz for gzip)
+- --results-batch-size / --results-flush-seconds: Worker -> master batching
 """
\ No newline at end of file
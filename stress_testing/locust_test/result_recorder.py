@@ -0,0 +1,171 @@
+"""
+Streams every locust request to a CSV file with constant memory.
+
+Import this module from a locustfile to enable it. Rows are written as they
+arrive and the file is flushed every --results-flush-seconds, so a crashed
+run keeps everything up to the last flush. Gzip is used when the file name
+ends in .gz (about 8x smaller for long runs).
+
+In distributed runs (--master / --worker) workers don't touch the disk:
+they buffer rows and ship them to the master in batches of
+--results-batch-size (or at least every --results-flush-seconds), and the
+master writes the single results file. A worker's last batch is sent when
+it stops; the master only closes the file when locust quits, because that
+batch can arrive after the master has already seen the test stop.
+"""
+from locust import events
+from locust.runners import MasterRunner, WorkerRunner
+import csv
+import gzip
+import time
+from datetime import datetime
+
+FIELDNAMES = ["timestamp", "request_type", "name", "response_time", "response_length", "exception", "success"]
+MESSAGE_TYPE = "result_rows"
+# Exception texts can embed whole response bodies; keep rows small
+MAX_EXCEPTION_CHARS = 200
+
+
+class ResultWriter:
+    """Appends rows to the results file, flushing it at most every `flush_seconds`."""
+
+    def __init__(self, path, flush_seconds):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.total = 0
+        self.failed = 0
+        self._file = None
+        self._writer = None
+        self._last_flush = time.monotonic()
+
+    def _open(self):
+        path = self.path or f'load_test_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        if path.endswith(".gz"):
+            self._file = gzip.open(path, "wt", newline="")
+        else:
+            self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(FIELDNAMES)
+        self.current_path = path
+
+    def write_rows(self, rows):
+        if self._writer is None:
+            self._open()
+        for timestamp, request_type, name, response_time, response_length, exception in rows:
+            self._writer.writerow([
+                datetime.fromtimestamp(timestamp), request_type, name,
+                response_time, response_length, exception or None, not exception,
+            ])
+            self.total += 1
+            if exception:
+                self.failed += 1
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._file is None or self._file.closed:
+            return
+        self._file.close()
+        print(f"\n✅ Results saved to: {self.current_path}")
+        print(f"📊 Total requests: {self.total}")
+        print(f"✅ Successful: {self.total - self.failed}")
+        print(f"❌ Failed: {self.failed}")
+
+
+class ResultRecorder:
+    """Collects request rows and routes them to a local writer or, on workers, to the master."""
+
+    def __init__(self):
+        self.environment = None
+        self.writer = None
+        self.batch_size = 500
+        self.flush_seconds = 1.0
+        self._buffer = []
+        self._last_send = time.monotonic()
+
+    def setup(self, environment):
+        self.environment = environment
+        options = environment.parsed_options
+        if options is not None:
+            self.batch_size = max(1, options.results_batch_size)
+            self.flush_seconds = options.results_flush_seconds
+        if isinstance(environment.runner, MasterRunner):
+            environment.runner.register_message(MESSAGE_TYPE, self.on_worker_rows)
+        if not isinstance(environment.runner, WorkerRunner):
+            self.writer = ResultWriter(options.results_file if options is not None else "", self.flush_seconds)
+
+    def record(self, row):
+        if self.writer is not None:
+            self.writer.write_rows((row,))
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_send >= self.flush_seconds:
+            self.send_buffer()
+
+    def send_buffer(self):
+        if self._buffer and self.environment is not None and self.environment.runner is not None:
+            self.environment.runner.send_message(MESSAGE_TYPE, self._buffer)
+        self._buffer = []
+        self._last_send = time.monotonic()
+
+    def on_worker_rows(self, environment, msg, **kwargs):
+        self.writer.write_rows(msg.data)
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+        else:
+            self.send_buffer()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+recorder = ResultRecorder()
+
+
+# --- Event Handlers ---
+@events.init_command_line_parser.add_listener
+def add_arguments(parser):
+    group = parser.add_argument_group("Result recording")
+    group.add_argument(
+        "--results-file", default="",
+        help="per-request CSV (.csv or .csv.gz); default load_test_results_<timestamp>.csv",
+    )
+    group.add_argument("--results-batch-size", type=int, default=500, help="rows per worker -> master message")
+    group.add_argument("--results-flush-seconds", type=float, default=1.0, help="max seconds before rows hit disk")
+
+
+@events.init.add_listener
+def on_init(environment, **kwargs):
+    recorder.setup(environment)
+
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, response_length, exception, start_time=None, **kwargs):
+    """Record each request as a compact row"""
+    recorder.record((
+        start_time or time.time(),
+        request_type,
+        name,
+        round(response_time, 1),
+        response_length,
+        str(exception)[:MAX_EXCEPTION_CHARS] if exception else "",
+    ))
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    """Workers send their last batch; the master / a local run flushes the results file"""
+    recorder.flush()
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    recorder.close()
@@ -0,0 +1,117 @@
+"""
+Runs the /ask load test fully offline and exits with locust's SLO verdict.
+
+Starts the stand-in Gemini API and stand-in Rextro API (from rag/benchmarks),
+then the app under uvicorn pointed at them, waits for /readyz, runs
+ask_locustfile.py headless and shuts everything down again. No API keys or
+network access are needed, and runs are reproducible.
+
+The stand-ins and the app run with --app-python (the rag environment); locust
+runs with the current interpreter (this project's environment).
+
+Usage:
+    python run_offline_ask.py --users 50 --spawn-rate 10 --run-time 1m \
+        --llm-latency 0.4 --token-latency 0.02 --slo-p95-ms 5000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RAG_DIR = os.path.normpath(os.path.join(HERE, "..", "..", "rag"))
+
+
+def wait_until_up(url, timeout_seconds, process):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} did not come up: process exited with {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout_seconds}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /ask load test with stand-in Gemini and Rextro APIs")
+    parser.add_argument("--app-python", default=sys.executable, help="interpreter with the rag dependencies")
+    parser.add_argument("--app-port", type=int, default=8000)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--gemini-port", type=int, default=9200)
+    parser.add_argument("--rextro-port", type=int, default=9100)
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="stand-in Gemini seconds per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="+/- seconds on --llm-latency")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="stand-in Gemini seconds per streamed chunk")
+    parser.add_argument("--answer-words", type=int, default=40)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of Gemini calls failing with 503")
+    parser.add_argument("--rextro-latency", type=float, default=0.05, help="stand-in Rextro API seconds per request")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--spawn-rate", type=float, default=10)
+    parser.add_argument("--run-time", default="1m")
+    args, locust_args = parser.parse_known_args()
+
+    gemini_url = f"http://127.0.0.1:{args.gemini_port}"
+    rextro_url = f"http://127.0.0.1:{args.rextro_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    app_env = dict(
+        os.environ,
+        OPENAI_API_KEY="offline",
+        GEMINI_API_KEY="offline",
+        GEMINI_API_BASE=gemini_url,
+        GEMINI_TRANSPORT="rest",
+        REXTRO_API_BASE_URL=rextro_url,
+        PYTHONUNBUFFERED="1",
+    )
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [args.app_python, "-m", "benchmarks.standin_gemini_api", "--port", str(args.gemini_port),
+             "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter),
+             "--token-latency", str(args.token_latency), "--answer-words", str(args.answer_words),
+             "--error-rate", str(args.llm_error_rate)],
+            cwd=RAG_DIR,
+        ))
+        processes.append(subprocess.Popen(
+            [args.app_python, "-m", "benchmarks.standin_rextro_api", "--port", str(args.rextro_port),
+             "--delay", str(args.rextro_latency)],
+            cwd=RAG_DIR,
+        ))
+        wait_until_up(f"{gemini_url}/v1beta/models/gemini-2.5-flash", 30, processes[0])
+        wait_until_up(f"{rextro_url}/zones", 30, processes[1])
+
+        app = subprocess.Popen(
+            [args.app_python, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.app_port),
+             "--workers", str(args.app_workers), "--log-level", "warning", "--no-access-log"],
+            cwd=RAG_DIR, env=app_env, stdout=subprocess.DEVNULL,
+        )
+        processes.append(app)
+        wait_until_up(f"{app_url}/readyz", 120, app)
+        print(f"✅ App ready at {app_url} (Gemini stand-in {gemini_url}, Rextro stand-in {rextro_url})")
+
+        locust = subprocess.run(
+            [sys.executable, "-m", "locust", "-f", os.path.join(HERE, "ask_locustfile.py"),
+             "--host", app_url, "--headless", "--users", str(args.users), "--spawn-rate", str(args.spawn_rate),
+             "--run-time", args.run_time, "--only-summary", *locust_args],
+            cwd=HERE,
+        )
+        return locust.returncode
+    finally:
+        # App first, so in-flight requests don't fail against stopped stand-ins
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    sys.exit(main())